@@ -1,47 +1,150 @@
 __all__ = [
+    'afilter_keys',
+    'afilter_values',
+    'amap_keys',
+    'amap_values',
+    'Atom',
     'caller',
+    'clear_import_cache',
     'compose',
+    'decompose',
+    'deep_freeze',
     'dichotomy',
     'dict_subtract',
     'filter_dict',
     'filter_keys',
     'filter_values',
+    'frozencounter',
     'frozendict',
+    'frozenmultimap',
+    'frozensorteddict',
     'identity',
+    'ImportTrace',
+    'iter_json_array',
+    'ilist_subtract',
     'list_subtract',
+    'load_json',
+    'loads_json',
     'map_dict',
     'map_keys',
     'map_values',
+    'memoize',
     'on_items',
+    'overlaydict',
+    'parallel_map_dict',
+    'parallel_map_values',
+    'pipeline',
     'wrap_result',
     'safe_hasattr',
+    'thaw',
     'try_import',
     'try_imports',
+    'VersionedStore',
+    'VersionHistory',
     ]
 
-from ._dict import frozendict
-from ._extras import (
-    safe_hasattr,
-    try_import,
-    try_imports,
-    )
-from ._func import (
-    caller,
-    compose,
-    dichotomy,
-    dict_subtract,
-    filter_dict,
-    filter_keys,
-    filter_values,
-    identity,
-    list_subtract,
-    map_dict,
-    map_keys,
-    map_values,
-    on_items,
-    wrap_result,
-    )
+import sys
+from importlib import import_module
+from types import ModuleType
 
+# The submodule each public name comes from.  They are only imported when
+# one of their names is first used, so that importing perfidy for a helper
+# or two doesn't pay for all the rest: trollius, which ``_async`` uses, takes
+# far longer to import than everything else put together.
+_submodules = {
+    '_async': [
+        'afilter_keys',
+        'afilter_values',
+        'amap_keys',
+        'amap_values',
+        ],
+    '_atom': ['Atom'],
+    '_counter': ['frozencounter'],
+    '_dict': ['frozendict'],
+    '_extras': [
+        'clear_import_cache',
+        'ImportTrace',
+        'safe_hasattr',
+        'try_import',
+        'try_imports',
+        ],
+    '_freeze': [
+        'deep_freeze',
+        'thaw',
+        ],
+    '_func': [
+        'caller',
+        'compose',
+        'decompose',
+        'dichotomy',
+        'dict_subtract',
+        'filter_dict',
+        'filter_keys',
+        'filter_values',
+        'identity',
+        'ilist_subtract',
+        'list_subtract',
+        'map_dict',
+        'map_keys',
+        'map_values',
+        'on_items',
+        'pipeline',
+        'wrap_result',
+        ],
+    '_history': ['VersionHistory'],
+    '_jsonio': [
+        'iter_json_array',
+        'load_json',
+        'loads_json',
+        ],
+    '_memo': ['memoize'],
+    '_multimap': ['frozenmultimap'],
+    '_overlay': ['overlaydict'],
+    '_parallel': [
+        'parallel_map_dict',
+        'parallel_map_values',
+        ],
+    '_sorted': ['frozensorteddict'],
+    '_store': ['VersionedStore'],
+    }
+
+_lazy_names = dict(
+    (name, module)
+    for module, names in _submodules.items()
+    for name in names)
+
+
+class _LazyPackage(ModuleType):
+    """The perfidy package, importing its submodules as they are needed.
+
+    Python 2 has no module-level ``__getattr__``, so the module object in
+    ``sys.modules`` is replaced with one of these when the package has been
+    imported.
+    """
+
+    def __getattr__(self, name):
+        try:
+            module = _lazy_names[name]
+        except KeyError:
+            raise AttributeError(
+                "'module' object has no attribute %r" % (name,))
+        value = getattr(import_module('.' + module, self.__name__), name)
+        # Later lookups will find it without coming back here.
+        setattr(self, name, value)
+        return value
+
+    def __dir__(self):
+        return sorted(set(self.__dict__) | set(_lazy_names))
+
+
+def _install_lazy_package():
+    package = _LazyPackage(__name__)
+    package.__dict__.update(
+        (k, v) for k, v in globals().items() if k.startswith('__'))
+    # Python 2 clears a module's globals when the module is freed, and the
+    # methods of _LazyPackage still need them.
+    package._module = sys.modules[__name__]
+    sys.modules[__name__] = package
 
 # same format as sys.version_info: "A tuple containing the five components of
 # the version number: major, minor, micro, releaselevel, and serial. All
@@ -56,3 +159,5 @@ from ._func import (
 # Otherwise it is major.minor.micro~$(revno).
 
 __version__ = (0, 0, 2, 'final', 0)
+
+_install_lazy_package()
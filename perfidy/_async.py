@@ -0,0 +1,140 @@
+"""Versions of the mapping helpers for asynchronous functions.
+
+These work with ``asyncio``, or with its Python 2 backport ``trollius``.
+They are written with futures and callbacks rather than coroutines, so the
+same code runs on both; each returns a future, which can be awaited or
+yielded from a coroutine.
+"""
+
+from ._dict import frozendict
+from ._extras import try_imports
+
+asyncio = try_imports(['asyncio', 'trollius'], None)
+
+
+def amap_values(f, d, concurrency=10, loop=None):
+    """Map the asynchronous function ``f`` across the values of ``d``.
+
+    :param f: A callable returning a coroutine or future.
+    :param concurrency: The most calls to ``f`` that may be in progress at
+        once.
+    :param loop: The event loop to run on.  Defaults to the current one.
+    :return: A future whose result is a dict, or a frozendict if ``d`` is
+        one, mapping each key ``k`` to the result of ``f(d[k])``.  If any
+        call fails, the future fails with the same exception and calls still
+        in progress are cancelled.
+    """
+    return _run(d, lambda k, v: f(v), _replace_value, concurrency, loop)
+
+
+def amap_keys(f, d, concurrency=10, loop=None):
+    """Map the asynchronous function ``f`` across the keys of ``d``.
+
+    See ``amap_values``.
+    """
+    return _run(d, lambda k, v: f(k), _replace_key, concurrency, loop)
+
+
+def afilter_values(p, d, concurrency=10, loop=None):
+    """Filter ``d`` by its values using the asynchronous predicate ``p``.
+
+    See ``amap_values``.
+    """
+    return _run(d, lambda k, v: p(v), _keep_if, concurrency, loop)
+
+
+def afilter_keys(p, d, concurrency=10, loop=None):
+    """Filter ``d`` by its keys using the asynchronous predicate ``p``.
+
+    See ``amap_values``.
+    """
+    return _run(d, lambda k, v: p(k), _keep_if, concurrency, loop)
+
+
+def _replace_value(k, v, result):
+    return (k, result)
+
+
+def _replace_key(k, v, result):
+    return (result, v)
+
+
+def _keep_if(k, v, result):
+    if result:
+        return (k, v)
+    return None
+
+
+def _run(d, call, combine, concurrency, loop):
+    if asyncio is None:
+        raise ImportError("Need asyncio or trollius")
+    if concurrency < 1:
+        raise ValueError("concurrency must be at least 1")
+    if loop is None:
+        loop = asyncio.get_event_loop()
+    runner = _BoundedRunner(
+        list(d.items()), call, combine, concurrency, loop)
+    if isinstance(d, frozendict):
+        return runner.run(frozendict)
+    return runner.run(dict)
+
+
+class _BoundedRunner(object):
+    """
+    Call ``call(k, v)`` for each pair, with at most ``concurrency`` calls in
+    progress, and collect ``combine(k, v, result)`` for each.
+    """
+
+    def __init__(self, items, call, combine, concurrency, loop):
+        self.items = items
+        self.call = call
+        self.combine = combine
+        self.concurrency = concurrency
+        self.loop = loop
+        self.results = [None] * len(items)
+        self.next = 0
+        self.running = set()
+
+    def run(self, factory):
+        self.factory = factory
+        self.future = asyncio.Future(loop=self.loop)
+        self.future.add_done_callback(self._finished)
+        self._start_more()
+        return self.future
+
+    def _start_more(self):
+        while (len(self.running) < self.concurrency
+               and self.next < len(self.items)):
+            i = self.next
+            self.next += 1
+            k, v = self.items[i]
+            try:
+                task = asyncio.ensure_future(self.call(k, v), loop=self.loop)
+            except Exception as e:
+                self.future.set_exception(e)
+                return
+            self.running.add(task)
+            task.add_done_callback(lambda t, i=i: self._done(i, t))
+        if not self.running and not self.future.done():
+            self.future.set_result(
+                self.factory(r for r in self.results if r is not None))
+
+    def _done(self, i, task):
+        self.running.discard(task)
+        if self.future.done():
+            return
+        if task.cancelled():
+            self.future.cancel()
+            return
+        exception = task.exception()
+        if exception is not None:
+            self.future.set_exception(exception)
+            return
+        k, v = self.items[i]
+        self.results[i] = self.combine(k, v, task.result())
+        self._start_more()
+
+    def _finished(self, future):
+        # Failed, or cancelled by the caller: stop anything still running.
+        for task in list(self.running):
+            task.cancel()
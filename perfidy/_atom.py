@@ -0,0 +1,139 @@
+"""A reference to an immutable value that can be shared between threads."""
+
+import sys
+import threading
+
+from ._dict import frozendict
+from ._hamt import _absent
+
+
+class Atom(object):
+    """
+    A mutable reference to an immutable value, normally a L{frozendict}.
+
+    Reading the current value never takes a lock.  Writers compute a new
+    value from the current one and publish it with a compare-and-set,
+    retrying if another writer got there first.  Since the values are
+    persistent, computing a new one is cheap and the old one stays valid for
+    any reader still holding it.
+    """
+
+    def __init__(self, value=_absent):
+        if value is _absent:
+            value = frozendict()
+        self._value = value
+        # Only held for the compare and the assignment, never while user
+        # code runs.
+        self._cas_lock = threading.Lock()
+        self._combine_lock = threading.Lock()
+        self._pending_lock = threading.Lock()
+        self._pending = []
+
+
+    def deref(self):
+        """
+        Return the current value.
+        """
+        return self._value
+
+
+    def compare_and_set(self, old, new):
+        """
+        Set the value to C{new} if it is currently C{old}.
+
+        Values are compared by identity.
+
+        @return: whether the value was set.
+        """
+        with self._cas_lock:
+            if self._value is not old:
+                return False
+            self._value = new
+            return True
+
+
+    def reset(self, new):
+        """
+        Set the value to C{new} unconditionally.
+        """
+        with self._cas_lock:
+            self._value = new
+
+
+    def swap(self, f, *args, **kwargs):
+        """
+        Set the value to C{f(value, *args, **kwargs)}.
+
+        If another writer changes the value while C{f} is running, C{f} is
+        called again with the newer value, so it should be free of side
+        effects.
+
+        @return: the new value.
+        """
+        while True:
+            old = self._value
+            new = f(old, *args, **kwargs)
+            if self.compare_and_set(old, new):
+                return new
+
+
+    def swap_batched(self, f, *args, **kwargs):
+        """
+        Like L{swap}, but coalesce concurrent writers into one update.
+
+        Each call queues C{f}.  Whichever writer next gets to run applies
+        every queued function in turn and publishes the result once, so a
+        burst of writers does one compare-and-set between them rather than
+        retrying against each other.  If C{f} raises, its change is dropped
+        and the exception is raised in the thread that called
+        C{swap_batched}; the other changes in the batch still apply.
+
+        @return: the value produced by C{f}.  Later changes in the same batch
+            may already have been applied to the value the atom holds.
+        """
+        request = _Pending(f, args, kwargs)
+        with self._pending_lock:
+            self._pending.append(request)
+        with self._combine_lock:
+            if not request.done:
+                with self._pending_lock:
+                    batch = self._pending
+                    self._pending = []
+                self._apply(batch)
+        if request.error is not None:
+            raise request.error[0], request.error[1], request.error[2]
+        return request.result
+
+
+    def _apply(self, batch):
+        while True:
+            old = value = self._value
+            for request in batch:
+                try:
+                    new = request.f(value, *request.args, **request.kwargs)
+                except Exception:
+                    request.result = None
+                    request.error = sys.exc_info()
+                else:
+                    request.result = value = new
+                    request.error = None
+            if self.compare_and_set(old, value):
+                break
+        for request in batch:
+            request.done = True
+
+
+    def __repr__(self):
+        return "Atom(%r)" % (self._value,)
+
+
+
+class _Pending(object):
+
+    def __init__(self, f, args, kwargs):
+        self.f = f
+        self.args = args
+        self.kwargs = kwargs
+        self.done = False
+        self.result = None
+        self.error = None
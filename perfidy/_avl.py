@@ -0,0 +1,215 @@
+"""Persistent AVL trees.
+
+Every update copies the path from the root to the changed node and shares
+everything else with the tree it was derived from.  An empty tree is
+C{None}.
+"""
+
+from ._hamt import _absent
+
+
+class _Node(object):
+
+    __slots__ = ('key', 'value', 'left', 'right', 'height')
+
+    def __init__(self, key, value, left, right, height):
+        self.key = key
+        self.value = value
+        self.left = left
+        self.right = right
+        self.height = height
+
+
+
+def height(node):
+    if node is None:
+        return 0
+    return node.height
+
+
+def make(key, value, left, right):
+    """
+    Create a node, calculating its height from its children.
+    """
+    return _Node(key, value, left, right, max(height(left), height(right)) + 1)
+
+
+def balance(key, value, left, right):
+    """
+    Create a node, rotating if its children differ in height by two.
+    """
+    hl = height(left)
+    hr = height(right)
+    if hl > hr + 1:
+        if height(left.left) >= height(left.right):
+            return make(left.key, left.value, left.left,
+                        make(key, value, left.right, right))
+        lr = left.right
+        return make(lr.key, lr.value,
+                    make(left.key, left.value, left.left, lr.left),
+                    make(key, value, lr.right, right))
+    if hr > hl + 1:
+        if height(right.right) >= height(right.left):
+            return make(right.key, right.value,
+                        make(key, value, left, right.left), right.right)
+        rl = right.left
+        return make(rl.key, rl.value,
+                    make(key, value, left, rl.left),
+                    make(right.key, right.value, rl.right, right.right))
+    return _Node(key, value, left, right, max(hl, hr) + 1)
+
+
+def find(node, key, default):
+    """
+    Return the value for C{key}, or C{default} if it's not in the tree.
+    """
+    while node is not None:
+        if key < node.key:
+            node = node.left
+        elif node.key < key:
+            node = node.right
+        else:
+            return node.value
+    return default
+
+
+def floor(node, key):
+    """
+    Return the node with the greatest key less than or equal to C{key}, or
+    C{None} if there isn't one.
+    """
+    best = None
+    while node is not None:
+        if key < node.key:
+            node = node.left
+        elif node.key < key:
+            best = node
+            node = node.right
+        else:
+            return node
+    return best
+
+
+def ceiling(node, key):
+    """
+    Return the node with the least key greater than or equal to C{key}, or
+    C{None} if there isn't one.
+    """
+    best = None
+    while node is not None:
+        if node.key < key:
+            node = node.right
+        elif key < node.key:
+            best = node
+            node = node.left
+        else:
+            return node
+    return best
+
+
+def assoc(node, key, value):
+    """
+    Return a new tree that has C{key} mapped to C{value}.
+
+    @return: a tuple of the new tree and whether a new key was added.  If
+        C{key} was already mapped to C{value}, the tree returned is C{node}.
+    """
+    if node is None:
+        return _Node(key, value, None, None, 1), True
+    if key < node.key:
+        left, added = assoc(node.left, key, value)
+        if left is node.left:
+            return node, False
+        return balance(node.key, node.value, left, node.right), added
+    if node.key < key:
+        right, added = assoc(node.right, key, value)
+        if right is node.right:
+            return node, False
+        return balance(node.key, node.value, node.left, right), added
+    if node.value == value:
+        return node, False
+    return _Node(node.key, value, node.left, node.right, node.height), False
+
+
+def without(node, key):
+    """
+    Return a new tree that does not have C{key}.
+
+    If C{key} is not in the tree, C{node} itself is returned.
+    """
+    if node is None:
+        return None
+    if key < node.key:
+        left = without(node.left, key)
+        if left is node.left:
+            return node
+        return balance(node.key, node.value, left, node.right)
+    if node.key < key:
+        right = without(node.right, key)
+        if right is node.right:
+            return node
+        return balance(node.key, node.value, node.left, right)
+    if node.left is None:
+        return node.right
+    if node.right is None:
+        return node.left
+    right, key, value = pop_min(node.right)
+    return balance(key, value, node.left, right)
+
+
+def pop_min(node):
+    """
+    Remove the least key from a non-empty tree.
+
+    @return: a tuple of the new tree, the removed key and its value.
+    """
+    if node.left is None:
+        return node.right, node.key, node.value
+    left, key, value = pop_min(node.left)
+    return balance(node.key, node.value, left, node.right), key, value
+
+
+def iteritems(node, start=_absent, stop=_absent, inclusive=False):
+    """
+    Iterate over the pairs in the tree in key order.
+
+    Only keys greater than or equal to C{start} and less than C{stop} are
+    included, or less than or equal to C{stop} if C{inclusive} is true.
+    Finding the first pair takes time proportional to the height of the
+    tree; each subsequent pair takes amortized constant time.
+    """
+    stack = []
+    while node is not None:
+        if start is _absent or not node.key < start:
+            stack.append(node)
+            node = node.left
+        else:
+            node = node.right
+    while stack:
+        node = stack.pop()
+        if stop is not _absent:
+            if inclusive:
+                if stop < node.key:
+                    return
+            elif not node.key < stop:
+                return
+        yield node.key, node.value
+        node = node.right
+        while node is not None:
+            stack.append(node)
+            node = node.left
+
+
+def from_sorted(keys, values):
+    """
+    Build a perfectly balanced tree from sequences of strictly increasing
+    keys and their values in linear time.
+    """
+    def build(lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        left = build(lo, mid)
+        right = build(mid + 1, hi)
+        return make(keys[mid], values[mid], left, right)
+    return build(0, len(keys))
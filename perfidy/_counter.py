@@ -0,0 +1,198 @@
+"""Immutable counter implementation."""
+
+import heapq
+from itertools import repeat
+from operator import (
+    add,
+    itemgetter,
+    )
+
+from ._dict import (
+    from_distinct,
+    frozendict,
+    )
+from ._hamt import _absent
+
+
+class frozencounter(object):
+    """
+    A count of how many times each key occurs, that will not change.
+
+    Like C{collections.Counter}, but persistent.  Only positive counts are
+    kept: a key whose count falls to zero or below is removed, and looking
+    up a key that isn't there gives 0.
+
+    The counts are held in a L{frozendict}, so updates share structure with
+    the counter they came from, and merging two counters sums them trie
+    node by trie node.
+    """
+
+    __slots__ = ('counts', 'total')
+
+    def __new__(cls, input=_absent):
+        """
+        @param input: a mapping from keys to counts to add, or an iterable
+            of keys, each of which is counted once each time it appears.
+        """
+        f = super(frozencounter, cls).__new__(cls)
+        f.counts = frozendict()
+        f.total = 0
+        if input is _absent:
+            return f
+        return f.update(input)
+
+
+    def _make(self, counts, total):
+        if counts is self.counts:
+            return self
+        f = frozencounter()
+        f.counts = counts
+        f.total = total
+        return f
+
+
+    def __len__(self):
+        return self.counts.count
+
+
+    def __getitem__(self, key):
+        return self.counts.get(key, 0)
+
+
+    def __contains__(self, key):
+        return key in self.counts
+
+
+    def __iter__(self):
+        return iter(self.counts)
+
+
+    def keys(self):
+        return self.counts.keys()
+
+
+    def items(self):
+        return self.counts.items()
+
+
+    def elements(self):
+        """
+        Iterate over the keys, repeating each as many times as its count.
+        """
+        for k, n in self.counts.iteritems():
+            for x in repeat(k, n):
+                yield x
+
+
+    def most_common(self, n=None):
+        """
+        Return a list of the C{n} most common keys and their counts, most
+        common first, or all of them if C{n} is C{None}.
+        """
+        if n is None:
+            return sorted(
+                self.counts.iteritems(), key=itemgetter(1), reverse=True)
+        return heapq.nlargest(n, self.counts.iteritems(), key=itemgetter(1))
+
+
+    def increment(self, key, n=1):
+        """
+        Return a new frozencounter with C{n} added to the count for C{key}.
+        """
+        old = self.counts.get(key, 0)
+        new = old + n
+        if new > 0:
+            counts = self.counts.with_pair(key, new)
+        else:
+            counts = self.counts.without(key)
+            new = 0
+        return self._make(counts, self.total + new - old)
+
+
+    def decrement(self, key, n=1):
+        """
+        Return a new frozencounter with C{n} taken from the count for C{key}.
+        """
+        return self.increment(key, -n)
+
+
+    def remove(self, key):
+        """
+        Return a new frozencounter without C{key}, whatever its count.
+        """
+        return self._make(
+            self.counts.without(key), self.total - self.counts.get(key, 0))
+
+
+    def update(self, input):
+        """
+        Return a new frozencounter with the counts from C{input} added.
+
+        The changes are made to the trie in one batch, using
+        L{frozendict.edit}.
+
+        @param input: a mapping from keys to counts, which may be negative,
+            or an iterable of keys to count once each time they appear.
+        """
+        if isinstance(input, frozencounter):
+            return self.merge(input)
+        keys = getattr(input, 'keys', None)
+        if keys is not None:
+            pairs = [(k, input[k]) for k in keys()]
+        else:
+            pairs = zip(input, repeat(1))
+        if not self.counts:
+            # Nothing to share, so count in a dict and build the trie once.
+            counts = {}
+            for k, n in pairs:
+                counts[k] = counts.get(k, 0) + n
+            counts = [(k, n) for k, n in counts.iteritems() if n > 0]
+            return self._make(
+                from_distinct(counts), sum(n for k, n in counts))
+        editor = self.counts.edit()
+        total = self.total
+        for k, n in pairs:
+            old = editor.get(k, 0)
+            new = old + n
+            if new > 0:
+                editor.set(k, new)
+            else:
+                editor.delete(k)
+                new = 0
+            total += new - old
+        return self._make(editor.commit(), total)
+
+
+    def merge(self, other):
+        """
+        Return a new frozencounter with the counts of this one and the
+        frozencounter C{other} added together.
+
+        Parts of either trie holding no keys of the other are shared with
+        the result rather than rebuilt.
+        """
+        return self._make(
+            self.counts.merge_with(other.counts, add),
+            self.total + other.total)
+
+
+    def to_dict(self):
+        return self.counts.to_dict()
+
+
+    def __eq__(self, other):
+        if not isinstance(other, frozencounter):
+            return False
+        return self.counts == other.counts
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+    def __hash__(self):
+        return hash(self.counts)
+
+
+    def __repr__(self):
+        return "frozencounter(%r)" % (self.counts.to_dict(),)
@@ -5,16 +5,45 @@
 # Originally from https://code.launchpad.net/~washort/+junk/perseus, copied,
 # adapted, and distributed with permission.
 
+from collections import (
+    ItemsView,
+    KeysView,
+    Mapping,
+    ValuesView,
+    )
+from itertools import (
+    imap,
+    izip,
+    )
+from operator import itemgetter
+import random
+
 from ._hamt import (
     _absent,
     _not_found,
+    build,
+    combine,
     EMPTY_BITMAP_INDEXED_NODE,
+    NodeTable,
     )
 
 
-# XXX: Add functions as supplements for methods?
+# Maps with at most this many entries are stored as parallel tuples of keys,
+# their hashes and values rather than as a trie.  A linear scan over a handful
+# of hashes is cheaper than bitmap arithmetic, and the tuples are much smaller
+# than a _BitmapIndexedNode.  Keys are matched on their hash and then by
+# equality, as in the trie, so whether a key is found doesn't depend on the
+# size of the map.  Once a map outgrows this it is upgraded to a trie and
+# stays one, so that maps hovering around the threshold don't keep converting
+# back and forth.
+_INLINE_THRESHOLD = 8
+
 
-# XXX: Add merge_with
+# The table used by frozendict.interned() when it isn't given one.
+_node_table = NodeTable()
+
+
+# XXX: Add functions as supplements for methods?
 
 # XXX: Maybe make 'assoc' alias for 'with_pair' and 'dissoc' alias for
 # 'without'?
@@ -23,8 +52,6 @@ from ._hamt import (
 
 # XXX: a zipmap would be nice
 
-# XXX: A select implementation would be very nice
-
 # XXX: Things from set that might be nice:
 # - isdisjoint
 # - issubset / <=
@@ -42,6 +69,9 @@ class frozendict(object):
         f.root = None
         f.count = 0
         f._hash = None
+        f._keys = ()
+        f._hashes = ()
+        f._values = ()
         if input is _absent:
             return f
         else:
@@ -56,11 +86,27 @@ class frozendict(object):
         If C{pairs} has a C{keys()} attribute, then adds C{(k, pairs[k])} for
         all C{k} in keys.  If not, then adds C{(k, v)} for all C{(k, v)} in
         pairs.
+
+        Merging into an empty frozendict, as the constructor does, builds the
+        result in one go rather than a pair at a time.
         """
+        keys = getattr(pairs, 'keys', None)
+        if not self.count:
+            if isinstance(pairs, frozendict):
+                result = pairs
+            elif isinstance(pairs, dict):
+                result = from_distinct(pairs.items())
+            elif keys is not None:
+                result = from_distinct([(k, pairs[k]) for k in pairs.keys()])
+            else:
+                result = from_pairs(list(pairs))
+            if not result.count:
+                # Nothing was added, so this is still the same frozendict.
+                return self
+            return result
         # XXX: It must be possible to rewrite this more efficiently, without
         # creating a new frozendict for each pair, perhaps by internally using
         # mutation.
-        keys = getattr(pairs, 'keys', None)
         result = self
         if keys is not None:
             for k in pairs.keys():
@@ -71,6 +117,45 @@ class frozendict(object):
         return result
 
 
+    def merge_with(self, other, f):
+        """
+        Return a new frozendict with the pairs of this one and the
+        frozendict C{other}.  For keys in both, the value is
+        C{f(self[k], other[k])}.
+
+        When both are tries, they are combined node by node, and parts of
+        either trie that hold no keys of the other are shared rather than
+        rebuilt.
+        """
+        if not other.count:
+            return self
+        if not self.count:
+            return other
+        if self.root is not None and other.root is not None:
+            root = combine(self.root, other.root, f)
+            if root is self.root:
+                return self
+            newf = frozendict()
+            newf.root = root
+            newf.count = root.size
+            return newf
+        if self.count >= other.count:
+            result = self
+            for k, v in other.iteritems():
+                old = result.get(k, _not_found)
+                if old is not _not_found:
+                    v = f(old, v)
+                result = result.with_pair(k, v)
+        else:
+            result = other
+            for k, v in self.iteritems():
+                old = result.get(k, _not_found)
+                if old is not _not_found:
+                    v = f(v, old)
+                result = result.with_pair(k, v)
+        return result
+
+
     def __len__(self):
         return self.count
 
@@ -85,7 +170,10 @@ class frozendict(object):
 
     def get(self, key, default=None):
         if self.root is None:
-            return default
+            idx = _find(self._hashes, self._keys, hash(key), key)
+            if idx < 0:
+                return default
+            return self._values[idx]
         val = self.root.find(0, hash(key), key)
         if val is _not_found:
             return default
@@ -95,7 +183,7 @@ class frozendict(object):
 
     def __contains__(self, key):
         if self.root is None:
-            return False
+            return _find(self._hashes, self._keys, hash(key), key) >= 0
         else:
             return self.root.find(0, hash(key), key) is not _not_found
 
@@ -105,7 +193,7 @@ class frozendict(object):
             return self._hash
         # XXX: Why 0x3039?
         hashval = 0x3039
-        for k, v in self.items():
+        for k, v in self.iteritems():
             hashval += hash(k) ^ hash(v)
         self._hash = hashval
         return hashval
@@ -116,9 +204,11 @@ class frozendict(object):
             return True
         if not self.__class__ == other.__class__:
             return False
+        if self.root is not None and self.root is other.root:
+            return True
         if len(self) != len(other) or hash(self) != hash(other):
             return False
-        for k, v in self.items():
+        for k, v in self.iteritems():
             otherV = other.get(k, _not_found)
             if otherV is _not_found or v != otherV:
                 return False
@@ -130,21 +220,126 @@ class frozendict(object):
         return not self.__eq__(other)
 
 
+    def __iter__(self):
+        if self.root is None:
+            return iter(self._keys)
+        return imap(_first, self.root.iteritems())
+
+
+    def iterkeys(self):
+        return iter(self)
+
+
+    def itervalues(self):
+        if self.root is None:
+            return iter(self._values)
+        return imap(_second, self.root.iteritems())
+
+
+    def iteritems(self):
+        if self.root is None:
+            return izip(self._keys, self._values)
+        return self.root.iteritems()
+
+
     def keys(self):
-        for (k, v) in self.items():
-            yield k
+        """
+        Return a view of the keys, which supports C{len}, fast membership
+        tests and set operations, like a Python 3 C{dict}'s.
+        """
+        return _KeysView(self)
 
 
     def values(self):
-        for (k, v) in self.items():
-            yield v
+        """
+        Return a view of the values.
+        """
+        return _ValuesView(self)
 
 
     def items(self):
+        """
+        Return a view of the C{(k, v)} pairs, which supports C{len}, fast
+        membership tests and set operations, like a Python 3 C{dict}'s.
+        """
+        return _ItemsView(self)
+
+
+    def to_dict(self):
+        """
+        Return a C{dict} with the same pairs, made in a single walk over the
+        trie.
+        """
+        if self.root is None:
+            return dict(izip(self._keys, self._values))
+        d = {}
+        self.root.update_dict(d)
+        return d
+
+
+    def nth_item(self, i):
+        """
+        Return the C{i}th C{(k, v)} pair, in iteration order.
+
+        Each trie node knows how many pairs are beneath it, so this takes
+        time proportional to the depth of the trie rather than to C{i}.
+        Negative indexes count back from the end, as for lists.
+
+        @raise IndexError: if there is no C{i}th pair.
+        """
+        if i < 0:
+            i += self.count
+        if not 0 <= i < self.count:
+            raise IndexError("frozendict index out of range")
+        if self.root is None:
+            return (self._keys[i], self._values[i])
+        return self.root.nth(i)
+
+
+    def sample(self, k, rng=random):
+        """
+        Return a list of C{k} distinct keys chosen at random.
+
+        Gives the same keys as C{rng.sample(list(self), k)} would, but finds
+        each one with L{nth_item} rather than listing all of the keys first.
+
+        @param rng: a C{random.Random}, or anything else with a compatible
+            C{sample} method.  Defaults to the C{random} module.
+        @raise ValueError: if C{k} is more than the number of keys.
+        """
+        nth_item = self.nth_item
+        return [nth_item(i)[0] for i in rng.sample(xrange(self.count), k)]
+
+
+    def split(self, i):
+        """
+        Return a tuple of a frozendict with the first C{i} pairs, in
+        iteration order, and a frozendict with the rest.
+
+        C{i} is interpreted as in the slice C{[:i]}.  Parts of the trie that
+        fall wholly on one side are shared with this frozendict, so only the
+        nodes on the path to the C{i}th pair are copied.
+        """
+        if i < 0:
+            i = max(0, i + self.count)
+        if i == 0:
+            return frozendict(), self
+        if i >= self.count:
+            return self, frozendict()
+        first = frozendict()
+        first.count = i
+        rest = frozendict()
+        rest.count = self.count - i
         if self.root is None:
-            return (x for x in ())
+            first._keys = self._keys[:i]
+            first._hashes = self._hashes[:i]
+            first._values = self._values[:i]
+            rest._keys = self._keys[i:]
+            rest._hashes = self._hashes[i:]
+            rest._values = self._values[i:]
         else:
-            return self.root.iteritems()
+            first.root, rest.root = self.root.split(i)
+        return first, rest
 
 
     # XXX: Take multiple parameters, and raise error if odd number.
@@ -152,12 +347,31 @@ class frozendict(object):
         """
         Return a new frozendict that maps 'k' to 'v'.
         """
+        keyHash = hash(k)
         if self.root is None:
-            newroot = EMPTY_BITMAP_INDEXED_NODE
+            idx = _find(self._hashes, self._keys, keyHash, k)
+            if idx >= 0:
+                if self._values[idx] == v:
+                    return self
+                newf = frozendict()
+                newf.count = self.count
+                newf._keys = self._keys
+                newf._hashes = self._hashes
+                newf._values = (
+                    self._values[:idx] + (v,) + self._values[idx + 1:])
+                return newf
+            if self.count < _INLINE_THRESHOLD:
+                newf = frozendict()
+                newf.count = self.count + 1
+                newf._keys = self._keys + (k,)
+                newf._hashes = self._hashes + (keyHash,)
+                newf._values = self._values + (v,)
+                return newf
+            newroot = _inline_to_trie(self._hashes, self._keys, self._values)
         else:
             newroot = self.root
 
-        newroot, addedLeaf = newroot.assoc(0, hash(k), k, v)
+        newroot, addedLeaf = newroot.assoc(0, keyHash, k, v)
 
         if newroot is self.root:
             return self
@@ -175,7 +389,15 @@ class frozendict(object):
         Return a new frozendict without key 'k'.
         """
         if self.root is None:
-            return self
+            idx = _find(self._hashes, self._keys, hash(k), k)
+            if idx < 0:
+                return self
+            newf = frozendict()
+            newf.count = self.count - 1
+            newf._keys = self._keys[:idx] + self._keys[idx + 1:]
+            newf._hashes = self._hashes[:idx] + self._hashes[idx + 1:]
+            newf._values = self._values[:idx] + self._values[idx + 1:]
+            return newf
         newroot = self.root.without(0, hash(k), k)
         if newroot is _absent:
             return frozendict()
@@ -188,8 +410,217 @@ class frozendict(object):
             return newf
 
 
-    # XXX: Implement this perhaps more efficiently
+    def edit(self):
+        """
+        Return an L{Editor} for making a series of changes to this
+        frozendict more cheaply than with L{with_pair} and L{without}.
+
+            editor = d.edit()
+            for k in keys:
+                editor.set(k, editor.get(k, 0) + 1)
+            d = editor.commit()
+        """
+        from ._edit import Editor
+        return Editor(self)
+
+
+    def map_values(self, f):
+        """
+        Return a new frozendict with the same keys, mapping each key C{k} to
+        C{f(self[k])}.
+
+        The new frozendict has the same shape as this one, so no keys are
+        rehashed, and parts in which C{f} returns every value unchanged (by
+        identity) are shared with this one.
+        """
+        if self.root is None:
+            values = tuple(f(v) for v in self._values)
+            if all(new is old for new, old in izip(values, self._values)):
+                return self
+            newf = frozendict()
+            newf.count = self.count
+            newf._keys = self._keys
+            newf._hashes = self._hashes
+            newf._values = values
+            return newf
+        newroot = self.root.map_values(f)
+        if newroot is self.root:
+            return self
+        newf = frozendict()
+        newf.count = self.count
+        newf.root = newroot
+        return newf
+
+
+    def select(self, p):
+        """
+        Return a new frozendict with only the pairs for which C{p(k, v)} is
+        true.
+
+        Parts of the trie in which every pair is kept are shared with this
+        frozendict, and parts in which none are are dropped whole.
+        """
+        if self.root is None:
+            keep = [p(k, v) for k, v in izip(self._keys, self._values)]
+            if all(keep):
+                return self
+            newf = frozendict()
+            newf._keys = tuple(k for k, x in izip(self._keys, keep) if x)
+            newf._hashes = tuple(
+                h for h, x in izip(self._hashes, keep) if x)
+            newf._values = tuple(v for v, x in izip(self._values, keep) if x)
+            newf.count = len(newf._keys)
+            return newf
+        newroot, removed = self.root.select(p)
+        if not removed:
+            return self
+        if newroot is _absent:
+            return frozendict()
+        newf = frozendict()
+        newf.count = self.count - removed
+        newf.root = newroot
+        return newf
+
+
+    def interned(self, table=None):
+        """
+        Return an equal frozendict whose trie nodes are shared with those of
+        any other interned frozendict.
+
+        Frozendicts built separately from similar data end up with equal but
+        distinct nodes.  Interning them makes equal subtrees the same objects,
+        saving memory, and lets equality checks between equal interned
+        frozendicts return as soon as they see the roots are identical.
+        Pairs added afterwards are not interned until this is called again.
+
+        Small frozendicts that don't use a trie are returned unchanged.
+
+        @param table: the L{NodeTable} to intern into.  Defaults to one shared
+            by the whole process.
+        """
+        if self.root is None:
+            return self
+        if table is None:
+            table = _node_table
+        newroot = self.root.interned(table)
+        if newroot is self.root:
+            return self
+        newf = frozendict()
+        newf.count = self.count
+        newf.root = newroot
+        newf._hash = self._hash
+        return newf
+
+
     def __repr__(self):
-        #for today, we're straight up cheatin'
-        d = dict(self)
-        return "frozendict(%r)" % (d,)
+        return "frozendict(%r)" % (self.to_dict(),)
+
+
+Mapping.register(frozendict)
+
+
+_first = itemgetter(0)
+_second = itemgetter(1)
+
+
+# The views iterate over the frozendict's pairs directly, rather than looking
+# up each key in turn as the standard ones do.
+
+class _KeysView(KeysView):
+
+    def __iter__(self):
+        return iter(self._mapping)
+
+
+class _ValuesView(ValuesView):
+
+    def __iter__(self):
+        return self._mapping.itervalues()
+
+
+class _ItemsView(ItemsView):
+
+    def __iter__(self):
+        return self._mapping.iteritems()
+
+
+
+def from_distinct(pairs):
+    """
+    Build a frozendict from a list of C{(k, v)} pairs with distinct keys.
+
+    This builds the trie directly, rather than by adding one pair at a time.
+    """
+    f = frozendict()
+    f.count = len(pairs)
+    if f.count <= _INLINE_THRESHOLD:
+        f._keys = tuple(k for k, v in pairs)
+        f._hashes = tuple(hash(k) for k in f._keys)
+        f._values = tuple(v for k, v in pairs)
+    else:
+        f.root = build([(hash(k), k, v) for k, v in pairs])
+    return f
+
+
+def from_pairs(pairs):
+    """
+    Build a frozendict from a list of C{(k, v)} pairs, in which keys may
+    repeat.
+
+    As with with_pair, later values replace earlier ones but the first key
+    object is kept.  Small frozendicts are made with L{_distinct}.  Larger
+    ones are built directly by L{build}, which finds the repeated keys as
+    it sorts the pairs into the trie, so no dict of the keys is made.
+    """
+    if len(pairs) <= _INLINE_THRESHOLD:
+        return from_distinct(_distinct(pairs))
+    f = frozendict()
+    f.root = build([(hash(k), k, v) for k, v in pairs])
+    f.count = f.root.size
+    return f
+
+
+def _distinct(pairs):
+    """
+    Return a list of C{pairs} with one pair per key, in order of each key's
+    first appearance.
+
+    As with with_pair, later values replace earlier ones but the first key
+    object is kept.
+    """
+    positions = {}
+    result = []
+    for k, v in pairs:
+        i = positions.get(k)
+        if i is None:
+            positions[k] = len(result)
+            result.append((k, v))
+        else:
+            result[i] = (result[i][0], v)
+    return result
+
+
+def _find(hashes, keys, h, k):
+    """
+    Return the position of the key C{k}, whose hash is C{h}, among the
+    C{keys} of an inline frozendict, or -1 if it isn't there.
+    """
+    if h in hashes:
+        i = hashes.index(h)
+        if keys[i] == k:
+            return i
+        # Another key with the same hash; look at the rest.
+        for i in xrange(i + 1, len(hashes)):
+            if hashes[i] == h and keys[i] == k:
+                return i
+    return -1
+
+
+def _inline_to_trie(hashes, keys, values):
+    """
+    Build a trie holding the pairs of an inline frozendict.
+    """
+    root = EMPTY_BITMAP_INDEXED_NODE
+    for h, k, v in izip(hashes, keys, values):
+        root, _ = root.assoc(0, h, k, v)
+    return root
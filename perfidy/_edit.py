@@ -0,0 +1,328 @@
+"""Making many changes to a frozendict at once."""
+
+from . import _dict
+from ._hamt import (
+    _absent,
+    _ArrayNode,
+    _BITS,
+    _BitmapIndexedNode,
+    _MASK,
+    _HashCollisionNode,
+    _not_found,
+    _SIZE,
+    bitcount,
+    bitpos,
+    createNode,
+    EMPTY_BITMAP_INDEXED_NODE,
+    index,
+    mask,
+    )
+
+
+_BITMAP = _BitmapIndexedNode.kind
+
+
+class Editor(object):
+    """
+    A cursor for making a series of changes to a L{frozendict} cheaply.
+
+    Get one from L{frozendict.edit}.  Changing a frozendict one pair at a
+    time copies every node on the path to the pair each time.  An editor
+    copies each node once, the first time a change reaches it, and changes
+    its copies in place after that.  It also remembers the path it took to
+    the last key it changed, and starts from as far down that path as the
+    next key's hash allows, so changes to keys near each other in the trie
+    don't descend from the root each time.
+
+    L{commit} returns the result as a new frozendict; the frozendict the
+    editor started from is never changed.  The editor can go on being used
+    after a commit, and copies nodes afresh for the changes that follow.
+    """
+
+    def __init__(self, d):
+        self._reset(d)
+
+
+    def _reset(self, d):
+        self._frozen = d
+        self.count = d.count
+        if d.root is None:
+            self._keys = list(d._keys)
+            self._hashes = list(d._hashes)
+            self._values = list(d._values)
+        else:
+            self._keys = self._hashes = self._values = None
+        self._root = d.root
+        # Nodes this editor has copied, and so may change, by id.  Holding
+        # them keeps their ids from being reused.
+        self._owned = {}
+        # Owned nodes from the root down towards _pathHash, each the child of
+        # the one before.
+        self._path = []
+        self._pathHash = None
+
+
+    def __len__(self):
+        return self.count
+
+
+    def get(self, key, default=None):
+        if self._root is None:
+            idx = _dict._find(self._hashes, self._keys, hash(key), key)
+            if idx < 0:
+                return default
+            return self._values[idx]
+        val = self._root.find(0, hash(key), key)
+        if val is _not_found:
+            return default
+        return val
+
+
+    def __contains__(self, key):
+        return self.get(key, _not_found) is not _not_found
+
+
+    def set(self, key, val):
+        """
+        Map C{key} to C{val}.
+        """
+        keyHash = hash(key)
+        if self._root is None:
+            idx = _dict._find(self._hashes, self._keys, keyHash, key)
+            if idx >= 0:
+                if self._values[idx] != val:
+                    self._values[idx] = val
+                    self._frozen = None
+                return
+            if self.count < _dict._INLINE_THRESHOLD:
+                self._keys.append(key)
+                self._hashes.append(keyHash)
+                self._values.append(val)
+                self.count += 1
+                self._frozen = None
+                return
+            self._root = _dict._inline_to_trie(
+                self._hashes, self._keys, self._values)
+            self._keys = self._hashes = self._values = None
+
+        path = self._descend(keyHash)
+        node = path[-1]
+        shift = (len(path) - 1) * _BITS
+        array = node.array
+        if type(node) is _BitmapIndexedNode:
+            bit = 1 << ((keyHash >> shift) & _MASK)
+            idx = 2 * bitcount(node.bitmap & (bit - 1))
+            if node.bitmap & bit:
+                someKey = array[idx]
+                someVal = array[idx + 1]
+                if someKey is _absent:
+                    # a hash collision node, which we don't own
+                    n, addedLeaf = someVal.assoc(
+                        shift + _BITS, keyHash, key, val)
+                    if n is someVal:
+                        return
+                    array[idx + 1] = n
+                elif someKey == key:
+                    if someVal == val:
+                        return
+                    array[idx + 1] = val
+                    addedLeaf = False
+                else:
+                    array[idx] = _absent
+                    array[idx + 1] = createNode(
+                        shift + _BITS, someKey, someVal, keyHash, key, val)
+                    addedLeaf = True
+            elif bitcount(node.bitmap) < _SIZE // 2:
+                array[idx:idx] = [key, val]
+                node.bitmap |= bit
+                addedLeaf = True
+            else:
+                # full, so it becomes an array node, which already counts
+                # the new pair
+                n, addedLeaf = node.assoc(shift, keyHash, key, val)
+                self._replace(n)
+        else:
+            idx = mask(keyHash, shift)
+            child = array[idx]
+            if child is _absent:
+                array[idx], _ = EMPTY_BITMAP_INDEXED_NODE.assoc(
+                    shift + _BITS, keyHash, key, val)
+                node.count += 1
+                addedLeaf = True
+            else:
+                n, addedLeaf = child.assoc(shift + _BITS, keyHash, key, val)
+                if n is child:
+                    return
+                array[idx] = n
+        self._frozen = None
+        if addedLeaf:
+            for node in path:
+                node.size += 1
+            self.count += 1
+
+
+    def delete(self, key):
+        """
+        Remove C{key}, if it is present.
+        """
+        keyHash = hash(key)
+        if self._root is None:
+            idx = _dict._find(self._hashes, self._keys, keyHash, key)
+            if idx < 0:
+                return
+            del self._keys[idx]
+            del self._hashes[idx]
+            del self._values[idx]
+            self.count -= 1
+            self._frozen = None
+            return
+
+        path = self._descend(keyHash)
+        node = path[-1]
+        shift = (len(path) - 1) * _BITS
+        array = node.array
+        if node.kind == _BITMAP:
+            bit = bitpos(keyHash, shift)
+            if not node.bitmap & bit:
+                return
+            idx = 2 * index(node.bitmap, bit)
+            someKey = array[idx]
+            if someKey is _absent:
+                child = array[idx + 1]
+                n = child.without(shift + _BITS, keyHash, key)
+                if n is child:
+                    return
+                if n is _absent:
+                    del array[idx:idx + 2]
+                    node.bitmap ^= bit
+                else:
+                    array[idx + 1] = n
+            elif someKey == key:
+                del array[idx:idx + 2]
+                node.bitmap ^= bit
+            else:
+                return
+        else:
+            idx = mask(keyHash, shift)
+            child = array[idx]
+            if child is _absent:
+                return
+            n = child.without(shift + _BITS, keyHash, key)
+            if n is child:
+                return
+            array[idx] = n
+            if n is _absent:
+                node.count -= 1
+        self._frozen = None
+        for node in path:
+            node.size -= 1
+        self.count -= 1
+        # Emptied nodes are removed from their parents, except for the root.
+        while len(path) > 1 and path[-1].size == 0:
+            path.pop()
+            parent = path[-1]
+            parentShift = (len(path) - 1) * _BITS
+            if parent.kind == _BITMAP:
+                bit = bitpos(keyHash, parentShift)
+                idx = 2 * index(parent.bitmap, bit)
+                del parent.array[idx:idx + 2]
+                parent.bitmap ^= bit
+            else:
+                parent.array[mask(keyHash, parentShift)] = _absent
+                parent.count -= 1
+
+
+    def commit(self):
+        """
+        Return a frozendict with the changes made so far.
+
+        If nothing has changed, the frozendict the editor started from (or
+        last committed) is returned.
+        """
+        if self._frozen is not None:
+            return self._frozen
+        f = _dict.frozendict()
+        if self.count:
+            f.count = self.count
+            if self._root is None:
+                f._keys = tuple(self._keys)
+                f._hashes = tuple(self._hashes)
+                f._values = tuple(self._values)
+            else:
+                f.root = self._root
+        self._reset(f)
+        return f
+
+
+    def _own(self, node):
+        """
+        Return C{node} if this editor owns it, or else an owned copy of it.
+        """
+        if id(node) in self._owned:
+            return node
+        if node.kind == _BITMAP:
+            copy = _BitmapIndexedNode(node.bitmap, node.array[:], node.size)
+        else:
+            copy = _ArrayNode(node.count, node.array[:], node.size)
+        self._owned[id(copy)] = copy
+        return copy
+
+
+    def _descend(self, keyHash):
+        """
+        Return the path of owned nodes from the root to the last bitmap or
+        array node on the way to C{keyHash}, copying nodes as needed.
+        """
+        path = self._path
+        if path:
+            # Keep as much of the path as the two hashes have in common.
+            different = keyHash ^ self._pathHash
+            depth = 1
+            while (depth < len(path)
+                   and not (different >> ((depth - 1) * _BITS)) & _MASK):
+                depth += 1
+            del path[depth:]
+        else:
+            self._root = self._own(self._root)
+            path.append(self._root)
+        self._pathHash = keyHash
+        node = path[-1]
+        shift = (len(path) - 1) * _BITS
+        while True:
+            slot = (keyHash >> shift) & _MASK
+            if type(node) is _BitmapIndexedNode:
+                bit = 1 << slot
+                if not node.bitmap & bit:
+                    return path
+                slot = 2 * bitcount(node.bitmap & (bit - 1))
+                if node.array[slot] is not _absent:
+                    return path
+                slot += 1
+            child = node.array[slot]
+            if child is _absent or type(child) is _HashCollisionNode:
+                return path
+            if id(child) not in self._owned:
+                child = node.array[slot] = self._own(child)
+            path.append(child)
+            node = child
+            shift += _BITS
+
+
+    def _replace(self, new):
+        """
+        Put C{new} in place of the last node on the path, and drop that node
+        from the path.
+        """
+        path = self._path
+        path.pop()
+        self._owned[id(new)] = new
+        if not path:
+            self._root = new
+            return
+        parent = path[-1]
+        shift = (len(path) - 1) * _BITS
+        if parent.kind == _BITMAP:
+            bit = bitpos(self._pathHash, shift)
+            parent.array[2 * index(parent.bitmap, bit) + 1] = new
+        else:
+            parent.array[mask(self._pathHash, shift)] = new
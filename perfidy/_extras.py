@@ -2,9 +2,13 @@
 
 """Extensions to the Python standard library."""
 
+from collections import namedtuple
 import sys
+import time
 
 __all__ = [
+    'clear_import_cache',
+    'ImportTrace',
     'safe_hasattr',
     'try_import',
     'try_imports',
@@ -25,7 +29,8 @@ __all__ = [
 __version__ = (0, 0, 3, 'final', 0)
 
 
-def try_import(name, alternative=None, error_callback=None):
+def try_import(name, alternative=None, error_callback=None, cache=False,
+               lazy=False):
     """Attempt to import ``name``.  If it fails, return ``alternative``.
 
     When supporting multiple versions of Python or optional dependencies, it
@@ -37,6 +42,73 @@ def try_import(name, alternative=None, error_callback=None):
         Defaults to None.
     :param error_callback: If non-None, a callable that is passed the ImportError
         when the module cannot be loaded.
+    :param cache: If true, remember the outcome, whether success or failure,
+        and reuse it for later calls with ``cache=True``, rather than
+        searching for the module again.  The cache is forgotten whenever
+        ``sys.path`` or ``sys.meta_path`` change, or when
+        ``clear_import_cache`` is called.
+    :param lazy: If true, don't import anything yet.  Instead, return a
+        proxy that does the import the first time one of its attributes is
+        used, or it is called, or tested for truth, and stands in for the
+        result from then on.  ``error_callback`` is called at that point, if
+        at all.
+    """
+    if lazy:
+        return _LazyImport(name, alternative, error_callback, cache)
+    if _tracers:
+        module, last_error = _traced_resolve(name, cache)
+    elif cache:
+        module, last_error = _resolve_cached(name)
+    else:
+        module, last_error = _resolve(name)
+    if module is _nonexistent:
+        if last_error is not None and error_callback is not None:
+            error_callback(last_error)
+        return alternative
+    return module
+
+
+_nonexistent = object()
+
+
+class _LazyImport(object):
+    """A stand-in for the result of a ``try_import`` that hasn't run yet."""
+
+    def __init__(self, name, alternative, error_callback, cache):
+        self._lazy_args = (name, alternative, error_callback, cache)
+        self._lazy_target = _nonexistent
+
+    def _lazy_resolve(self):
+        target = self._lazy_target
+        if target is _nonexistent:
+            name, alternative, error_callback, cache = self._lazy_args
+            target = self._lazy_target = try_import(
+                name, alternative, error_callback, cache)
+        return target
+
+    def __getattr__(self, attr):
+        # Only called for attributes the proxy itself doesn't have.
+        return getattr(self._lazy_resolve(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self._lazy_resolve()(*args, **kwargs)
+
+    def __nonzero__(self):
+        return bool(self._lazy_resolve())
+
+    def __repr__(self):
+        if self._lazy_target is _nonexistent:
+            return '<lazy import of %r>' % (self._lazy_args[0],)
+        return repr(self._lazy_target)
+
+
+def _resolve(name, attempts=None):
+    """Import ``name``.
+
+    :param attempts: If given, a list to append ``(module_name, imported)``
+        to for each module we try to import.
+    :return: A tuple of the object, or ``_nonexistent`` if it couldn't be
+        imported, and the last ImportError raised along the way, if any.
     """
     module_segments = name.split('.')
     last_error = None
@@ -46,26 +118,147 @@ def try_import(name, alternative=None, error_callback=None):
             module = __import__(module_name)
         except ImportError:
             last_error = sys.exc_info()[1]
+            if attempts is not None:
+                attempts.append((module_name, False))
             module_segments.pop()
             continue
         else:
+            if attempts is not None:
+                attempts.append((module_name, True))
             break
     else:
-        if last_error is not None and error_callback is not None:
-            error_callback(last_error)
-        return alternative
-    nonexistent = object()
+        return _nonexistent, last_error
     for segment in name.split('.')[1:]:
-        module = getattr(module, segment, nonexistent)
-        if module is nonexistent:
-            if last_error is not None and error_callback is not None:
-                error_callback(last_error)
-            return alternative
-    return module
+        module = getattr(module, segment, _nonexistent)
+        if module is _nonexistent:
+            break
+    return module, last_error
+
+
+# Results of _resolve, by name, and the import path they were found with.
+_import_cache = {}
+_import_cache_path = None
+
+
+def _resolve_cached(name, attempts=None):
+    global _import_cache_path
+    path = (tuple(sys.path), tuple(sys.meta_path))
+    if path != _import_cache_path:
+        _import_cache.clear()
+        _import_cache_path = path
+    try:
+        return _import_cache[name]
+    except KeyError:
+        result = _import_cache[name] = _resolve(name, attempts)
+        return result
+
+
+def clear_import_cache():
+    """Forget the outcomes remembered by ``try_import(..., cache=True)``.
+
+    Call this after installing a package or otherwise changing what can be
+    imported without changing ``sys.path``.
+    """
+    _import_cache.clear()
+
+
+class ImportRecord(namedtuple(
+        'ImportRecord', 'name attempts found cached seconds')):
+    """What a single ``try_import`` call did.
+
+    :ivar name: The name that was asked for.
+    :ivar attempts: A tuple of ``(module_name, imported)`` pairs, one for
+        each module import tried, in order.  Empty if the result came from
+        the cache.
+    :ivar found: Whether ``name`` was found.
+    :ivar cached: Whether the result came from the import cache.
+    :ivar seconds: The wall time the call took.
+    """
+
+    __slots__ = ()
+
+
+# The ImportTraces that are currently recording.
+_tracers = []
+
+
+class ImportTrace(object):
+    """A record of the imports tried by ``try_import`` and ``try_imports``.
+
+    While a trace is running, each call to ``try_import`` made by anything,
+    including each of the names ``try_imports`` goes through, adds an
+    ``ImportRecord`` to ``records``.  Lazy imports are recorded when they are
+    resolved.  Use it as a context manager, or call ``start`` and ``stop``::
+
+        with ImportTrace() as trace:
+            import mytool
+        print(trace.summary())
+    """
+
+    def __init__(self):
+        self.records = []
+
+    def start(self):
+        _tracers.append(self)
+
+    def stop(self):
+        _tracers.remove(self)
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def total_seconds(self):
+        return sum(record.seconds for record in self.records)
+
+    def summary(self):
+        """Return a report of the time spent on each name, slowest first."""
+        by_name = {}
+        for record in self.records:
+            calls, seconds, _ = by_name.get(record.name, (0, 0.0, None))
+            by_name[record.name] = (
+                calls + 1, seconds + record.seconds, record)
+        lines = []
+        for name, (calls, seconds, last) in sorted(
+                by_name.items(), key=lambda item: -item[1][1]):
+            if last.found:
+                outcome = 'found'
+            else:
+                outcome = 'missing'
+            line = '%10.3f ms %5d x  %-7s  %s' % (
+                seconds * 1000, calls, outcome, name)
+            tried = [module for module, imported in last.attempts
+                     if not imported]
+            if tried:
+                line += ' (could not import %s)' % (', '.join(tried),)
+            lines.append(line)
+        lines.append('%10.3f ms %5d x  total' % (
+            self.total_seconds() * 1000, len(self.records)))
+        return '\n'.join(lines)
+
+
+def _traced_resolve(name, cache):
+    attempts = []
+    start = time.time()
+    if cache:
+        module, last_error = _resolve_cached(name, attempts)
+    else:
+        module, last_error = _resolve(name, attempts)
+    record = ImportRecord(
+        name, tuple(attempts), module is not _nonexistent,
+        # A miss always tries at least one import.
+        cache and not attempts, time.time() - start)
+    for tracer in list(_tracers):
+        tracer.records.append(record)
+    return module, last_error
 
 
 _RAISE_EXCEPTION = object()
-def try_imports(module_names, alternative=_RAISE_EXCEPTION, error_callback=None):
+def try_imports(module_names, alternative=_RAISE_EXCEPTION, error_callback=None,
+                cache=False):
     """Attempt to import modules.
 
     Tries to import the first module in ``module_names``.  If it can be
@@ -79,12 +272,14 @@ def try_imports(module_names, alternative=_RAISE_EXCEPTION, error_callback=None)
         If unspecified, we raise an ImportError.
     :param error_callback: If None, called with the ImportError for *each*
         module that fails to load.
+    :param cache: As for ``try_import``.
     :raises ImportError: If none of the modules can be imported and no
         alternative value was specified.
     """
     module_names = list(module_names)
     for module_name in module_names:
-        module = try_import(module_name, error_callback=error_callback)
+        module = try_import(
+            module_name, error_callback=error_callback, cache=cache)
         if module:
             return module
     if alternative is _RAISE_EXCEPTION:
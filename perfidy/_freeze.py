@@ -0,0 +1,98 @@
+"""Converting nested data to and from immutable equivalents."""
+
+from ._dict import (
+    from_distinct,
+    frozendict,
+    )
+
+
+def deep_freeze(obj, intern_keys=False):
+    """Return an immutable, hashable copy of the nested structure ``obj``.
+
+    Dicts become frozendicts, lists and tuples become tuples, and sets
+    become frozensets, all the way down.  Anything else is left as it is.
+    Parts of ``obj`` that are already frozen are reused rather than copied.
+
+    The structure is converted in a single traversal, and each dict is
+    built straight into a frozendict rather than a pair at a time.  A
+    container that appears more than once in ``obj`` is only converted
+    once, and the copy shares one frozen version of it.
+
+    :param intern_keys: If true, equal string keys of different dicts are
+        replaced by a single string object, which saves memory for documents
+        that repeat the same keys many times.
+    """
+    return _Freezer(intern_keys).freeze(obj)
+
+
+def thaw(obj):
+    """Return a mutable copy of the nested structure ``obj``.
+
+    The inverse of ``deep_freeze``: frozendicts become dicts, tuples become
+    lists and frozensets become sets, all the way down.  Dict keys and the
+    members of sets are left frozen, since they must stay hashable.  As with
+    ``deep_freeze``, shared containers are only converted once.
+    """
+    return _thaw(obj, {})
+
+
+class _Freezer(object):
+
+    def __init__(self, intern_keys):
+        # id -> (original, frozen).  Holding the original keeps its id from
+        # being reused while we're still going.
+        self.seen = {}
+        self.keys = {} if intern_keys else None
+
+    def freeze(self, obj):
+        if isinstance(obj, (dict, list, tuple, set, frozenset, frozendict)):
+            seen = self.seen.get(id(obj))
+            if seen is not None:
+                return seen[1]
+            frozen = self._convert(obj)
+            self.seen[id(obj)] = (obj, frozen)
+            return frozen
+        return obj
+
+    def _convert(self, obj):
+        freeze = self.freeze
+        if isinstance(obj, frozendict):
+            return obj.map_values(freeze)
+        if isinstance(obj, dict):
+            keys = self.keys
+            if keys is None:
+                pairs = [(k, freeze(v)) for k, v in obj.iteritems()]
+            else:
+                pairs = [
+                    (keys.setdefault(k, k) if isinstance(k, basestring) else k,
+                     freeze(v))
+                    for k, v in obj.iteritems()]
+            return from_distinct(pairs)
+        if isinstance(obj, list):
+            return tuple([freeze(x) for x in obj])
+        if isinstance(obj, tuple):
+            items = [freeze(x) for x in obj]
+            if all(new is old for new, old in zip(items, obj)):
+                return obj
+            return tuple(items)
+        items = [freeze(x) for x in obj]
+        if isinstance(obj, frozenset) and all(
+                new is old for new, old in zip(items, obj)):
+            return obj
+        return frozenset(items)
+
+
+def _thaw(obj, seen):
+    if not isinstance(obj, (frozendict, tuple, frozenset)):
+        return obj
+    thawed = seen.get(id(obj))
+    if thawed is not None:
+        return thawed[1]
+    if isinstance(obj, frozendict):
+        thawed = dict((k, _thaw(v, seen)) for k, v in obj.items())
+    elif isinstance(obj, tuple):
+        thawed = [_thaw(x, seen) for x in obj]
+    else:
+        thawed = set(obj)
+    seen[id(obj)] = (obj, thawed)
+    return thawed
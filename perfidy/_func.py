@@ -1,19 +1,76 @@
+from collections import deque
 from functools import partial, wraps
-from itertools import ifilter, imap
+from itertools import ifilter, imap, islice, izip
 from operator import not_
+from weakref import WeakKeyDictionary
+
+from ._dict import frozendict
 
 
 def list_subtract(a, b):
     """Return a list ``a`` without the elements of ``b``.
 
     If a particular value is in ``a`` twice and ``b`` once then the returned
-    list then that value will appear once in the returned list.
+    list then that value will appear once in the returned list.  It is the
+    first occurrence that is removed, and otherwise the order of ``a`` is
+    kept.
+
+    Takes time proportional to ``len(a) + len(b)`` when the elements are
+    hashable.
+    """
+    return list(ilist_subtract(a, b))
+
+
+def ilist_subtract(a, b):
+    """Like ``list_subtract``, but return an iterator.
+
+    ``b`` is read in full when iteration starts, but ``a`` is only read as
+    the iterator is consumed, so it can be a stream too long to hold in
+    memory.
     """
-    a_only = list(a)
+    counts = {}
+    unhashable = []
     for x in b:
-        if x in a_only:
-            a_only.remove(x)
-    return a_only
+        try:
+            counts[x] = counts.get(x, 0) + 1
+        except TypeError:
+            unhashable.append(x)
+    for x in a:
+        try:
+            n = counts.get(x, 0)
+        except TypeError:
+            # Fall back to comparing with everything left in b.
+            if _remove_equal(unhashable, x) or _discount_equal(counts, x):
+                continue
+        else:
+            if n:
+                if n == 1:
+                    del counts[x]
+                else:
+                    counts[x] = n - 1
+                continue
+            if unhashable and _remove_equal(unhashable, x):
+                continue
+        yield x
+
+
+def _remove_equal(xs, x):
+    for i, y in enumerate(xs):
+        if y == x:
+            del xs[i]
+            return True
+    return False
+
+
+def _discount_equal(counts, x):
+    for y, n in counts.iteritems():
+        if y == x:
+            if n == 1:
+                del counts[y]
+            else:
+                counts[y] = n - 1
+            return True
+    return False
 
 
 def identity(x):
@@ -26,19 +83,63 @@ def caller(method_name, *args, **kwargs):
     return call_obj
 
 
+# Maps each function made by compose to the functions it composes, so they
+# can be flattened when composed again.  Kept out of the functions' own
+# attributes because functools.wraps copies those.
+_compositions = WeakKeyDictionary()
+
+
 def compose(*functions):
+    """Compose ``functions``, so that ``compose(f, g)(x)`` is ``f(g(x))``.
+
+    The last function may take any arguments; the others must take one.
+    Functions that were themselves made by ``compose`` are flattened into
+    the new chain rather than called through.
+    """
     if not functions:
         raise ValueError("Must specify functions to compose")
-    def composed(*args, **kwargs):
-        fs = list(functions)
-        y = fs.pop()(*args, **kwargs)
-        while fs:
-            f = fs.pop()
-            y = f(y)
-        return y
+    stages = []
+    for f in functions:
+        stages.extend(decompose(f))
+    stages = tuple(stages)
+    if len(stages) == 1:
+        f, = stages
+        def composed(*args, **kwargs):
+            return f(*args, **kwargs)
+    elif len(stages) == 2:
+        f, g = stages
+        def composed(*args, **kwargs):
+            return f(g(*args, **kwargs))
+    elif len(stages) == 3:
+        f, g, h = stages
+        def composed(*args, **kwargs):
+            return f(g(h(*args, **kwargs)))
+    else:
+        first = stages[-1]
+        rest = stages[-2::-1]
+        def composed(*args, **kwargs):
+            y = first(*args, **kwargs)
+            for f in rest:
+                y = f(y)
+            return y
+    _compositions[composed] = stages
     return composed
 
 
+def decompose(f):
+    """Return the functions that ``compose`` combined to make ``f``.
+
+    :return: A tuple of functions, in the order they would be passed to
+        ``compose``, with nested compositions flattened.  If ``f`` was not
+        made by ``compose``, ``(f,)``.
+    """
+    try:
+        return _compositions.get(f, (f,))
+    except TypeError:
+        # Not hashable, or can't be weakly referenced.
+        return (f,)
+
+
 def wrap_result(wrapper):
     return lambda f: wraps(f)(compose(wrapper, f))
 
@@ -47,11 +148,54 @@ negate = wrap_result(not_)
 
 
 def on_items(f, d):
-    return compose(dict, f, caller('items'))(d)
+    return dict(f(d.items()))
+
+
+def dichotomy(p, xs, chunksize=None):
+    """Split ``xs`` into the items for which ``p`` is false and true.
 
+    ``p`` is called once per item, and ``xs`` is only iterated once, so it
+    can be any iterable.  Both halves are lazy: reading one of them buffers
+    the items that belong to the other until they are read.  If the halves
+    are consumed at a similar rate, little is buffered.
 
-def dichotomy(p, xs):
-    return ifilter(negate(p), xs), ifilter(p, xs)
+    :param chunksize: If given, ``p`` is instead called with lists of up to
+        this many items, and must return a sequence of truth values, one for
+        each item.  This allows vectorised predicates, such as one returning
+        a NumPy boolean mask.
+    :return: A tuple of two iterators, ``(falses, trues)``.
+    """
+    source = iter(xs)
+    buffers = (deque(), deque())
+
+    if chunksize is None:
+        def fill():
+            for x in source:
+                buffers[bool(p(x))].append(x)
+                return True
+            return False
+    else:
+        def fill():
+            chunk = list(islice(source, chunksize))
+            if not chunk:
+                return False
+            mask = p(chunk)
+            if len(mask) != len(chunk):
+                raise ValueError(
+                    "Predicate returned %d results for %d items"
+                    % (len(mask), len(chunk)))
+            for x, t in izip(chunk, mask):
+                buffers[bool(t)].append(x)
+            return True
+
+    def side(buffer):
+        while True:
+            while not buffer:
+                if not fill():
+                    return
+            yield buffer.popleft()
+
+    return side(buffers[0]), side(buffers[1])
 
 
 def map_dict(f, d):
@@ -59,6 +203,13 @@ def map_dict(f, d):
 
 
 def filter_dict(p, d):
+    """Filter ``d`` by calling ``p`` with each ``(key, value)`` pair.
+
+    If ``d`` is a ``frozendict``, so is the result, and it shares
+    structure with ``d``.
+    """
+    if isinstance(d, frozendict):
+        return d.select(lambda k, v: p((k, v)))
     return on_items(partial(ifilter, p), d)
 
 
@@ -67,6 +218,13 @@ def map_keys(f, d):
 
 
 def filter_keys(f, d):
+    """Filter ``d`` by its keys using ``f``.
+
+    If ``d`` is a ``frozendict``, so is the result, and it shares
+    structure with ``d``.
+    """
+    if isinstance(d, frozendict):
+        return d.select(lambda k, v: f(k))
     return filter_dict(lambda (k, v): f(k), d)
 
 
@@ -74,16 +232,122 @@ def map_values(f, d):
     """Map ``f`` across the values of ``d``.
 
     :return: A dict with the same keys as ``d``, where the value
-        of each key ``k`` is ``f(d[k])``.
+        of each key ``k`` is ``f(d[k])``.  If ``d`` is a ``frozendict``, a
+        ``frozendict`` with the same shape as ``d``, so that no keys are
+        rehashed.
     """
+    if isinstance(d, frozendict):
+        return d.map_values(f)
     return map_dict(lambda (k, v): (k, f(v)), d)
 
 
 def filter_values(f, d):
-    """Filter ``dictionary`` by its values using ``function``."""
+    """Filter ``dictionary`` by its values using ``function``.
+
+    If ``d`` is a ``frozendict``, so is the result, and it shares
+    structure with ``d``.
+    """
+    if isinstance(d, frozendict):
+        return d.select(lambda k, v: f(v))
     return filter_dict(lambda (k, v): f(v), d)
 
 
 def dict_subtract(a, b):
     """Return the part of ``a`` that's not in ``b``."""
     return dict((k, a[k]) for k in set(a) - set(b))
+
+
+_MAP_ITEMS, _MAP_KEYS, _MAP_VALUES = range(3)
+_FILTER_ITEMS, _FILTER_KEYS, _FILTER_VALUES = range(3, 6)
+
+
+def pipeline(d):
+    """Start a lazy pipeline of dict transformations over ``d``.
+
+    Each stage method returns a new pipeline; nothing runs until a sink such
+    as ``to_dict`` or ``items`` is called, and then every stage is applied to
+    each item in a single pass, with no intermediate dicts::
+
+        pipeline(d).map_values(f).filter_keys(p).to_dict()
+
+    is the same as ``filter_keys(p, map_values(f, d))``.
+
+    :param d: A mapping, or an iterable of ``(key, value)`` pairs.
+    """
+    return _Pipeline(d, ())
+
+
+class _Pipeline(object):
+
+    def __init__(self, source, stages):
+        self._source = source
+        self._stages = stages
+
+    def _then(self, kind, f):
+        return _Pipeline(self._source, self._stages + ((kind, f),))
+
+    def map_dict(self, f):
+        """Replace each ``(key, value)`` pair with ``f((key, value))``."""
+        return self._then(_MAP_ITEMS, f)
+
+    def map_keys(self, f):
+        return self._then(_MAP_KEYS, f)
+
+    def map_values(self, f):
+        return self._then(_MAP_VALUES, f)
+
+    def filter_dict(self, p):
+        """Keep the ``(key, value)`` pairs for which ``p((key, value))``."""
+        return self._then(_FILTER_ITEMS, p)
+
+    def filter_keys(self, p):
+        return self._then(_FILTER_KEYS, p)
+
+    def filter_values(self, p):
+        return self._then(_FILTER_VALUES, p)
+
+    def items(self):
+        """Return an iterator over the resulting ``(key, value)`` pairs.
+
+        Pairs are produced as they are read from the source, so the results
+        never have to be held in memory all at once.  Unlike a dict, the
+        iterator may yield the same key more than once if ``map_keys`` or
+        ``map_dict`` produce duplicates.
+        """
+        source = getattr(self._source, 'iteritems', None)
+        if source is None:
+            source = getattr(self._source, 'items', None)
+        if source is None:
+            pairs = iter(self._source)
+        else:
+            pairs = source()
+        return self._run(pairs, self._stages)
+
+    __iter__ = items
+
+    @staticmethod
+    def _run(pairs, stages):
+        for k, v in pairs:
+            for kind, f in stages:
+                if kind == _MAP_VALUES:
+                    v = f(v)
+                elif kind == _MAP_KEYS:
+                    k = f(k)
+                elif kind == _MAP_ITEMS:
+                    k, v = f((k, v))
+                elif kind == _FILTER_KEYS:
+                    if not f(k):
+                        break
+                elif kind == _FILTER_VALUES:
+                    if not f(v):
+                        break
+                elif not f((k, v)):
+                    break
+            else:
+                yield k, v
+
+    def to_dict(self):
+        return dict(self.items())
+
+    def to_frozendict(self):
+        return frozendict(self.items())
@@ -3,6 +3,8 @@
 # Originally from https://code.launchpad.net/~washort/+junk/perseus, copied,
 # adapted, and distributed with permission.
 
+import weakref
+
 _absent = object()
 _not_found = object()
 
@@ -16,6 +18,9 @@ class _TrieNode(object):
 
     kind = None
 
+    # The number of pairs in this node and all sub-nodes.
+    size = 0
+
     def iteritems(self):
         """
         Iterate over all of the items in this node and all sub-nodes.
@@ -24,6 +29,16 @@ class _TrieNode(object):
         """
         raise NotImplementedError(self.iteritems)
 
+    def update_dict(self, d):
+        """
+        Store all of the items in this node and all sub-nodes in the dict
+        C{d}.
+
+        Cheaper than C{d.update(self.iteritems())}, which passes every item
+        up through a generator for each level of the trie.
+        """
+        raise NotImplementedError(self.update_dict)
+
     def find(self, shift, keyHash, key):
         """
         Return the value for C{key}.
@@ -61,14 +76,66 @@ class _TrieNode(object):
         """
         raise NotImplementedError(self.without)
 
+    def interned(self, table):
+        """
+        Return a node equal to this one, shared with any equal node already
+        in C{table}.
+
+        Sub-nodes are interned first, so equal subtrees end up shared too.
+
+        @param table: a L{NodeTable}
+        """
+        raise NotImplementedError(self.interned)
+
+    def map_values(self, f):
+        """
+        Return a node with the same keys and shape as this one, with each
+        value C{v} replaced by C{f(v)}.
+
+        Sub-nodes in which C{f} returns every value unchanged (by identity)
+        are shared rather than copied, and no keys are rehashed.
+        """
+        raise NotImplementedError(self.map_values)
+
+    def select(self, p):
+        """
+        Return a node with only the pairs for which C{p(key, value)} is true.
+
+        @return: a tuple of the new node, or C{_absent} if no pairs are left,
+            and the number of pairs removed.  If none are removed, the node
+            returned is this one.
+        """
+        raise NotImplementedError(self.select)
+
+    def nth(self, i):
+        """
+        Return the C{i}th C{(key, value)} pair in the order L{iteritems}
+        yields them, where C{0 <= i < self.size}.
+        """
+        raise NotImplementedError(self.nth)
+
+    def split(self, i):
+        """
+        Split this node into one holding the first C{i} pairs, in the order
+        L{iteritems} yields them, and one holding the rest.
+
+        Sub-nodes that fall wholly on one side are shared.
+
+        @param i: the number of pairs to put in the first node, where
+            C{0 < i < self.size}.
+        @return: a tuple of the two nodes.
+        """
+        raise NotImplementedError(self.split)
+
 
 class _BitmapIndexedNode(_TrieNode):
 
     kind = 'BitmapIndexedNode'
 
-    def __init__(self, bitmap, array):
+    def __init__(self, bitmap, array, size):
         self.bitmap = bitmap
         self.array = array
+        self.size = size
 
 
     def iteritems(self):
@@ -80,6 +147,16 @@ class _BitmapIndexedNode(_TrieNode):
                 yield (self.array[i], self.array[i + 1])
 
 
+    def update_dict(self, d):
+        array = self.array
+        for i in range(0, len(array), 2):
+            k = array[i]
+            if k is _absent:
+                array[i + 1].update_dict(d)
+            else:
+                d[k] = array[i + 1]
+
+
     def find(self, shift, keyHash, key):
         bit = bitpos(keyHash, shift)
         if (self.bitmap & bit) == 0:
@@ -114,21 +191,25 @@ class _BitmapIndexedNode(_TrieNode):
                 else:
                     newArray = self.array[:]
                     newArray[2 * idx + 1] = n
-                    return _BitmapIndexedNode(self.bitmap, newArray), addedLeaf
+                    return _BitmapIndexedNode(
+                        self.bitmap, newArray,
+                        self.size + addedLeaf), addedLeaf
             if key == someKey:
                 if val == someVal:
                     return self, False
                 else:
                     newArray = self.array[:]
                     newArray[2 * idx + 1] = val
-                    return _BitmapIndexedNode(self.bitmap, newArray), False
+                    return _BitmapIndexedNode(
+                        self.bitmap, newArray, self.size), False
             else:
                 #there was a hash collision in the local _BITS bits of the bitmap
                 newArray = self.array[:]
                 newArray[2 * idx] = _absent
                 newArray[2 * idx + 1] = createNode(shift + _BITS, someKey,
                                                    someVal, keyHash, key, val)
-                newNode = _BitmapIndexedNode(self.bitmap, newArray)
+                newNode = _BitmapIndexedNode(
+                    self.bitmap, newArray, self.size + 1)
                 return newNode, True
         else:
             #spot for this hash is open
@@ -150,14 +231,15 @@ class _BitmapIndexedNode(_TrieNode):
                                 self.array[j], self.array[j + 1])
                             addedLeaf = True
                         j += 2
-                return _ArrayNode(n + 1, nodes), addedLeaf
+                return _ArrayNode(n + 1, nodes, self.size + 1), addedLeaf
             else:
                 newArray = [_absent] * (2 * (n + 1))
                 newArray[:2 * idx] =  self.array[:2 * idx]
                 newArray[2 * idx] = key
                 newArray[2 * idx + 1] = val
                 newArray[2 * (idx + 1):2 * (n + 1)] = self.array[2 * idx:2 * n]
-                return _BitmapIndexedNode(self.bitmap | bit, newArray), True
+                return _BitmapIndexedNode(
+                    self.bitmap | bit, newArray, self.size + 1), True
 
 
     def without(self, shift, keyHash, key):
@@ -175,34 +257,153 @@ class _BitmapIndexedNode(_TrieNode):
             if n is not _absent:
                 newArray = self.array[:]
                 newArray[2 * idx + 1] = n
-                return _BitmapIndexedNode(self.bitmap, newArray)
+                return _BitmapIndexedNode(
+                    self.bitmap, newArray, self.size - 1)
             if self.bitmap == bit:
                 return _absent
             newArray = self.array[:]
             del newArray[2 * idx:2 * idx + 2]
-            return _BitmapIndexedNode(self.bitmap ^ bit, newArray)
+            return _BitmapIndexedNode(
+                self.bitmap ^ bit, newArray, self.size - 1)
         if someKey == key:
             if len(self.array) == 2:
                 #last pair in this node
                 return _absent
             newArray = self.array[:]
             del newArray[2 * idx:2 * idx + 2]
-            return _BitmapIndexedNode(self.bitmap ^ bit, newArray)
+            return _BitmapIndexedNode(
+                self.bitmap ^ bit, newArray, self.size - 1)
         else:
             return self
 
 
+    def interned(self, table):
+        newArray = None
+        for i in range(0, len(self.array), 2):
+            if self.array[i] is _absent:
+                child = self.array[i + 1]
+                newChild = child.interned(table)
+                if newChild is not child:
+                    if newArray is None:
+                        newArray = self.array[:]
+                    newArray[i + 1] = newChild
+        node = self
+        if newArray is not None:
+            node = _BitmapIndexedNode(self.bitmap, newArray, self.size)
+        return table.canonical(
+            node, (self.kind, self.bitmap) + contents(node.array))
+
+
+    def map_values(self, f):
+        newArray = None
+        for i in range(0, len(self.array), 2):
+            val = self.array[i + 1]
+            if self.array[i] is _absent:
+                newVal = val.map_values(f)
+            else:
+                newVal = f(val)
+            if newVal is not val:
+                if newArray is None:
+                    newArray = self.array[:]
+                newArray[i + 1] = newVal
+        if newArray is None:
+            return self
+        return _BitmapIndexedNode(self.bitmap, newArray, self.size)
+
+
+    def select(self, p):
+        newArray = []
+        bitmap = 0
+        removed = 0
+        remaining = self.bitmap
+        for i in range(0, len(self.array), 2):
+            # pairs are stored in bit order, lowest first
+            bit = remaining & -remaining
+            remaining ^= bit
+            key = self.array[i]
+            val = self.array[i + 1]
+            if key is _absent:
+                n, r = val.select(p)
+                removed += r
+                if n is not _absent:
+                    newArray.extend((_absent, n))
+                    bitmap |= bit
+            elif p(key, val):
+                newArray.extend((key, val))
+                bitmap |= bit
+            else:
+                removed += 1
+        if not removed:
+            return self, 0
+        if not newArray:
+            return _absent, removed
+        return _BitmapIndexedNode(
+            bitmap, newArray, self.size - removed), removed
+
+
+    def nth(self, i):
+        array = self.array
+        for j in range(0, len(array), 2):
+            if array[j] is _absent:
+                child = array[j + 1]
+                if i < child.size:
+                    return child.nth(i)
+                i -= child.size
+            elif i == 0:
+                return (array[j], array[j + 1])
+            else:
+                i -= 1
+        raise IndexError(i)
+
+
+    def split(self, i):
+        size = self.size
+        left = []
+        right = []
+        leftBitmap = rightBitmap = 0
+        remaining = self.bitmap
+        firstSize = i
+        for j in range(0, len(self.array), 2):
+            # pairs are stored in bit order, lowest first
+            bit = remaining & -remaining
+            remaining ^= bit
+            key = self.array[j]
+            val = self.array[j + 1]
+            if key is _absent:
+                n = val.size
+            else:
+                n = 1
+            if i >= n:
+                left.extend((key, val))
+                leftBitmap |= bit
+                i -= n
+            elif i == 0:
+                right.extend((key, val))
+                rightBitmap |= bit
+            else:
+                first, rest = val.split(i)
+                left.extend((_absent, first))
+                leftBitmap |= bit
+                right.extend((_absent, rest))
+                rightBitmap |= bit
+                i = 0
+        return (_BitmapIndexedNode(leftBitmap, left, firstSize),
+                _BitmapIndexedNode(rightBitmap, right, size - firstSize))
+
+
 
-EMPTY_BITMAP_INDEXED_NODE = _BitmapIndexedNode(0, [])
+EMPTY_BITMAP_INDEXED_NODE = _BitmapIndexedNode(0, [], 0)
 
 
 class _ArrayNode(_TrieNode):
 
     kind = "ArrayNode"
 
-    def __init__(self, count, array):
+    def __init__(self, count, array, size):
+        # count is the number of sub-nodes, not pairs
         self.count = count
         self.array = array
+        self.size = size
 
 
     def iteritems(self):
@@ -212,6 +413,12 @@ class _ArrayNode(_TrieNode):
                     yield item
 
 
+    def update_dict(self, d):
+        for node in self.array:
+            if node is not _absent:
+                node.update_dict(d)
+
+
     def find(self, shift, keyHash, key):
         idx = mask(keyHash, shift)
         node = self.array[idx]
@@ -227,14 +434,15 @@ class _ArrayNode(_TrieNode):
         if node is _absent:
             newArray = self.array[:]
             newArray[idx], _ = EMPTY_BITMAP_INDEXED_NODE.assoc(shift + _BITS, keyHash, key, val)
-            return _ArrayNode(self.count + 1, newArray), True
+            return _ArrayNode(self.count + 1, newArray, self.size + 1), True
         else:
             n, addedLeaf = node.assoc(shift + _BITS, keyHash, key, val)
             if n is node:
                 return self, False
             newArray = self.array[:]
             newArray[idx] = n
-            return _ArrayNode(self.count, newArray), addedLeaf
+            return _ArrayNode(
+                self.count, newArray, self.size + addedLeaf), addedLeaf
 
 
     def without(self, shift, keyHash, key):
@@ -251,9 +459,90 @@ class _ArrayNode(_TrieNode):
             # XXX: What does 8 mean?
             if self.count <= 8:
                 return self.pack(idx)
-            return _ArrayNode(self.count - 1, newArray)
+            return _ArrayNode(self.count - 1, newArray, self.size - 1)
         else:
-            return _ArrayNode(self.count, newArray)
+            return _ArrayNode(self.count, newArray, self.size - 1)
+
+
+    def interned(self, table):
+        newArray = None
+        for i, child in enumerate(self.array):
+            if child is not _absent:
+                newChild = child.interned(table)
+                if newChild is not child:
+                    if newArray is None:
+                        newArray = self.array[:]
+                    newArray[i] = newChild
+        node = self
+        if newArray is not None:
+            node = _ArrayNode(self.count, newArray, self.size)
+        return table.canonical(node, (self.kind,) + tuple(node.array))
+
+
+    def map_values(self, f):
+        newArray = None
+        for i, child in enumerate(self.array):
+            if child is not _absent:
+                newChild = child.map_values(f)
+                if newChild is not child:
+                    if newArray is None:
+                        newArray = self.array[:]
+                    newArray[i] = newChild
+        if newArray is None:
+            return self
+        return _ArrayNode(self.count, newArray, self.size)
+
+
+    def select(self, p):
+        newArray = self.array[:]
+        count = self.count
+        removed = 0
+        for i, child in enumerate(self.array):
+            if child is not _absent:
+                n, r = child.select(p)
+                if r:
+                    removed += r
+                    newArray[i] = n
+                    if n is _absent:
+                        count -= 1
+        if not removed:
+            return self, 0
+        if count == 0:
+            return _absent, removed
+        return fromChildren(count, newArray, self.size - removed), removed
+
+
+    def nth(self, i):
+        for child in self.array:
+            if child is not _absent:
+                if i < child.size:
+                    return child.nth(i)
+                i -= child.size
+        raise IndexError(i)
+
+
+    def split(self, i):
+        left = [_absent] * _SIZE
+        right = [_absent] * _SIZE
+        leftCount = rightCount = 0
+        firstSize = i
+        for j, child in enumerate(self.array):
+            if child is _absent:
+                continue
+            if i >= child.size:
+                left[j] = child
+                leftCount += 1
+                i -= child.size
+            elif i == 0:
+                right[j] = child
+                rightCount += 1
+            else:
+                left[j], right[j] = child.split(i)
+                leftCount += 1
+                rightCount += 1
+                i = 0
+        return (fromChildren(leftCount, left, firstSize),
+                fromChildren(rightCount, right, self.size - firstSize))
 
 
     def pack(self, idx):
@@ -265,7 +554,8 @@ class _ArrayNode(_TrieNode):
                 newArray[j] = self.array[i]
                 bitmap |= 1 << i
                 j += 2
-        return _BitmapIndexedNode(bitmap, newArray)
+        return _BitmapIndexedNode(
+            bitmap, newArray, self.size - self.array[idx].size)
 
 
 
@@ -277,6 +567,7 @@ class _HashCollisionNode(_TrieNode):
         self.hash = hash
         self.count = count
         self.array = array
+        self.size = count
 
 
     def iteritems(self):
@@ -284,6 +575,10 @@ class _HashCollisionNode(_TrieNode):
             yield (self.array[i], self.array[i + 1])
 
 
+    def update_dict(self, d):
+        d.update(zip(self.array[::2], self.array[1::2]))
+
+
     def find(self, shift, keyHash, key):
         try:
             idx = 2 * self.array[::2].index(key)
@@ -308,7 +603,7 @@ class _HashCollisionNode(_TrieNode):
                 return _HashCollisionNode(self.hash, self.count, newArray), False
         else:
             # nest it in a bitmap node
-            return _BitmapIndexedNode(bitpos(self.hash, shift), [_absent, self]).assoc(shift, keyHash, key, val)
+            return _BitmapIndexedNode(bitpos(self.hash, shift), [_absent, self], self.count).assoc(shift, keyHash, key, val)
 
 
     def without(self, shift, keyHash, key):
@@ -325,9 +620,341 @@ class _HashCollisionNode(_TrieNode):
                 return _HashCollisionNode(self.hash, self.count - 1, newArray)
 
 
+    def interned(self, table):
+        return table.canonical(
+            self, (self.kind, self.hash) + contents(self.array))
+
+
+    def map_values(self, f):
+        newArray = None
+        for i in range(1, len(self.array), 2):
+            val = self.array[i]
+            newVal = f(val)
+            if newVal is not val:
+                if newArray is None:
+                    newArray = self.array[:]
+                newArray[i] = newVal
+        if newArray is None:
+            return self
+        return _HashCollisionNode(self.hash, self.count, newArray)
+
+
+    def select(self, p):
+        newArray = []
+        for i in range(0, len(self.array), 2):
+            if p(self.array[i], self.array[i + 1]):
+                newArray.extend(self.array[i:i + 2])
+        removed = self.count - len(newArray) // 2
+        if not removed:
+            return self, 0
+        if not newArray:
+            return _absent, removed
+        return _HashCollisionNode(
+            self.hash, self.count - removed, newArray), removed
+
+
+    def nth(self, i):
+        return (self.array[2 * i], self.array[2 * i + 1])
+
+
+    def split(self, i):
+        return (_HashCollisionNode(self.hash, i, self.array[:2 * i]),
+                _HashCollisionNode(
+                    self.hash, self.count - i, self.array[2 * i:]))
+
+
+
+class NodeTable(object):
+    """
+    A table of canonical trie nodes, used to share equal subtrees between
+    frozendicts that were built separately.
+
+    Nodes are only held weakly, so a node leaves the table once nothing else
+    refers to it.
+    """
+
+    def __init__(self):
+        self._nodes = weakref.WeakValueDictionary()
+
+
+    def __len__(self):
+        return len(self._nodes)
+
+
+    def canonical(self, node, key):
+        """
+        Return the node stored under C{key}, storing C{node} there first if
+        there isn't one.
+
+        If C{key} can't be hashed, because some value in the node can't,
+        C{node} is returned and not stored.
+        """
+        try:
+            return self._nodes.setdefault(key, node)
+        except TypeError:
+            return node
+
+
 
 ## implementation crap
 
+def build(entries, shift=0):
+    """
+    Build a node holding C{entries} directly, without the intermediate
+    nodes that adding them one at a time would create.
+
+    The node has the same shape as one built by L{_TrieNode.assoc}: bitmap
+    nodes with up to half of their slots in use, array nodes above that, and
+    collision nodes for keys with equal hashes.
+
+    Keys may repeat, in which case the node holds the first key object and
+    the last value, as adding the entries in order would.  Equal keys have
+    equal hashes, so they end up in the same bucket at every level and are
+    only compared with each other once they are the only entries left in
+    it, without a table of the keys seen.
+
+    @param entries: a non-empty list of C{(hash, key, value)} tuples.
+    @param shift: the depth of the node in the trie, in bits
+    """
+    buckets = {}
+    for entry in entries:
+        buckets.setdefault(mask(entry[0], shift), []).append(entry)
+    if len(buckets) > _SIZE // 2:
+        array = [_absent] * _SIZE
+        size = 0
+        for i, bucket in buckets.iteritems():
+            child = array[i] = build(bucket, shift + _BITS)
+            size += child.size
+        return _ArrayNode(len(buckets), array, size)
+    bitmap = 0
+    array = []
+    size = 0
+    for i in sorted(buckets):
+        bucket = buckets[i]
+        bitmap |= 1 << i
+        if len(bucket) == 1:
+            array.extend(bucket[0][1:])
+            size += 1
+            continue
+        keyHash = bucket[0][0]
+        for h, k, v in bucket:
+            if h != keyHash:
+                child = build(bucket, shift + _BITS)
+                array.extend((_absent, child))
+                size += child.size
+                break
+        else:
+            pairs = _collisionPairs(bucket)
+            if len(pairs) == 2:
+                array.extend(pairs)
+                size += 1
+            else:
+                count = len(pairs) // 2
+                array.extend(
+                    (_absent, _HashCollisionNode(keyHash, count, pairs)))
+                size += count
+    return _BitmapIndexedNode(bitmap, array, size)
+
+
+def _collisionPairs(entries):
+    """
+    Return a flat list of the keys and values of C{entries}, which all
+    have the same hash, with one pair for each distinct key.
+    """
+    pairs = []
+    for h, k, v in entries:
+        for i in xrange(0, len(pairs), 2):
+            if pairs[i] == k:
+                pairs[i + 1] = v
+                break
+        else:
+            pairs.extend((k, v))
+    return pairs
+
+
+def diff(old, new, updates, deletions):
+    """
+    Find the changes that turn the trie C{old} into the trie C{new}.
+
+    Sub-nodes that the two tries share are skipped without being looked at,
+    so for tries derived from one another this takes time proportional to
+    the size of the changes rather than of the tries.
+
+    @param updates: a list to append the C{(key, value)} pairs that are new
+        or changed in C{new} to.
+    @param deletions: a list to append the keys of C{old} that are missing
+        from C{new} to.
+    """
+    if old is new:
+        return
+    oldSlots = slots(old)
+    newSlots = slots(new)
+    if oldSlots is None or newSlots is None:
+        diffItems(old.iteritems(), new.iteritems(), updates, deletions)
+        return
+    for i in set(oldSlots) | set(newSlots):
+        a = oldSlots.get(i)
+        b = newSlots.get(i)
+        if a is None:
+            updates.extend(entryItems(b))
+        elif b is None:
+            deletions.extend(k for k, v in entryItems(a))
+        elif a[0] is _absent and b[0] is _absent:
+            diff(a[1], b[1], updates, deletions)
+        elif a[0] is _absent or b[0] is _absent:
+            diffItems(entryItems(a), entryItems(b), updates, deletions)
+        elif a[0] == b[0]:
+            if a[1] is not b[1] and a[1] != b[1]:
+                updates.append(b)
+        else:
+            deletions.append(a[0])
+            updates.append(b)
+
+
+def diffItems(oldItems, newItems, updates, deletions):
+    """
+    Like L{diff}, but comparing two iterables of pairs with distinct keys.
+    """
+    remaining = dict(oldItems)
+    for k, v in newItems:
+        old = remaining.pop(k, _absent)
+        if old is _absent or (old is not v and old != v):
+            updates.append((k, v))
+    deletions.extend(remaining)
+
+
+def combine(a, b, f, shift=0):
+    """
+    Return a node with the pairs of both C{a} and C{b}.  For keys in both,
+    the value is C{f(aValue, bValue)}.
+
+    The two tries are walked together, and subtrees in slots that only one
+    of them uses are taken over whole, without looking at their contents.
+
+    @param shift: the depth of C{a} and C{b} in the trie, in bits
+    """
+    aSlots = slots(a)
+    bSlots = slots(b)
+    if aSlots is None or bSlots is None:
+        return combineByAssoc(a, b, f, shift)
+    entries = []
+    size = 0
+    for i in sorted(set(aSlots) | set(bSlots)):
+        x = aSlots.get(i)
+        y = bSlots.get(i)
+        if y is None:
+            entry = x
+        elif x is None:
+            entry = y
+        elif x[0] is not _absent and y[0] is not _absent and x[0] == y[0]:
+            entry = (x[0], f(x[1], y[1]))
+        elif y[0] is not _absent:
+            entry = (_absent, addPair(
+                asNode(x, shift + _BITS), y[0], y[1], f, shift + _BITS))
+        elif x[0] is not _absent:
+            entry = (_absent, addPair(
+                y[1], x[0], x[1], lambda old, new: f(new, old),
+                shift + _BITS))
+        else:
+            entry = (_absent, combine(x[1], y[1], f, shift + _BITS))
+        if entry[0] is _absent:
+            size += entry[1].size
+        else:
+            size += 1
+        entries.append((i, entry))
+    if len(entries) > _SIZE // 2:
+        array = [_absent] * _SIZE
+        for i, entry in entries:
+            array[i] = asNode(entry, shift + _BITS)
+        return _ArrayNode(len(entries), array, size)
+    bitmap = 0
+    array = []
+    for i, entry in entries:
+        bitmap |= 1 << i
+        array.extend(entry)
+    return _BitmapIndexedNode(bitmap, array, size)
+
+
+def combineByAssoc(a, b, f, shift):
+    """
+    Like L{combine}, but adding the pairs of C{b} to C{a} one at a time.
+    """
+    for k, v in b.iteritems():
+        a = addPair(a, k, v, f, shift)
+    return a
+
+
+def addPair(node, k, v, f, shift):
+    """
+    Return C{node} with C{k} mapped to C{v}, or to C{f(node's value, v)} if
+    C{node} already has C{k}.
+    """
+    keyHash = hash(k)
+    old = node.find(shift, keyHash, k)
+    if old is not _not_found:
+        v = f(old, v)
+    return node.assoc(shift, keyHash, k, v)[0]
+
+
+def asNode(entry, shift):
+    """
+    Return the sub-node in the slot entry C{entry}, or a node holding it if
+    it is a single pair.
+    """
+    if entry[0] is _absent:
+        return entry[1]
+    k, v = entry
+    return EMPTY_BITMAP_INDEXED_NODE.assoc(shift, hash(k), k, v)[0]
+
+
+def slots(node):
+    """
+    Return a dict mapping the slots in use in C{node} to their contents: a
+    C{(key, value)} pair, or C{(_absent, subnode)}.
+
+    Bitmap and array nodes at the same depth put the same hashes in the same
+    slots, so they can be compared slot by slot.  Returns C{None} for hash
+    collision nodes, which have no slots.
+    """
+    if node.kind == _ArrayNode.kind:
+        return dict((i, (_absent, child))
+                    for i, child in enumerate(node.array)
+                    if child is not _absent)
+    if node.kind == _BitmapIndexedNode.kind:
+        result = {}
+        remaining = node.bitmap
+        for j in range(0, len(node.array), 2):
+            bit = remaining & -remaining
+            remaining ^= bit
+            result[bitcount(bit - 1)] = (node.array[j], node.array[j + 1])
+        return result
+    return None
+
+
+def entryItems(entry):
+    if entry[0] is _absent:
+        return entry[1].iteritems()
+    return [entry]
+
+
+def fromChildren(count, array, size):
+    """
+    Make a node holding the C{count} sub-nodes in the C{_SIZE}-long
+    C{array}, which hold C{size} pairs between them.
+
+    As in L{_ArrayNode.without}, sparse arrays are packed into bitmap nodes.
+    """
+    if count >= 8:
+        return _ArrayNode(count, array, size)
+    packed = []
+    bitmap = 0
+    for i, child in enumerate(array):
+        if child is not _absent:
+            packed.extend((_absent, child))
+            bitmap |= 1 << i
+    return _BitmapIndexedNode(bitmap, packed, size)
+
+
 def createNode(shift, oldKey, oldVal, newHash, newKey, newVal):
     oldHash = hash(oldKey)
     if oldHash == newHash:
@@ -338,6 +965,44 @@ def createNode(shift, oldKey, oldVal, newHash, newKey, newVal):
                                      )[0].assoc(shift, newHash, newKey, newVal)[0]
 
 
+# Types whose values are equal only when they are interchangeable, so long as
+# their types are the same too.  Floats aren't among them, since -0.0 == 0.0.
+_EXACT_TYPES = frozenset([bool, int, long, str, unicode, type(None)])
+
+
+def contents(array):
+    """
+    Return a hashable summary of a node's array for use as a L{NodeTable} key.
+
+    Sub-nodes are compared by identity, which is enough once they have been
+    interned.  See L{summary} for keys and values.
+    """
+    return tuple(x if x is _absent or isinstance(x, _TrieNode)
+                 else summary(x)
+                 for x in array)
+
+
+def summary(x):
+    """
+    Return a hashable summary of C{x}, equal to the summary of another
+    object only if the two can be used in place of each other.
+
+    Values of the types in C{_EXACT_TYPES} are paired with their types, so
+    that C{1} and C{True} have different summaries, and tuples are
+    summarised element by element.  Anything else is summarised by its
+    identity: C{Decimal('1.0')} and C{Decimal('1.00')} are equal, but not
+    interchangeable.  The node holding C{x} keeps it alive, so its id isn't
+    reused while the node is in a L{NodeTable}.
+    """
+    t = type(x)
+    if t in _EXACT_TYPES:
+        return (t, x)
+    if t is tuple:
+        return (t, tuple(summary(y) for y in x))
+    # A string can't be confused with the types above.
+    return ('id', id(x))
+
+
 def mask(h, sh):
     return (h >> sh) & _MASK
 
@@ -0,0 +1,187 @@
+"""A long history of versions of a frozendict, kept compactly."""
+
+from collections import deque
+import threading
+
+from ._dict import frozendict
+from ._hamt import (
+    _absent,
+    diff,
+    diffItems,
+    )
+
+
+class VersionHistory(object):
+    """
+    A sequence of versions of a L{frozendict}, numbered from 0.
+
+    The most recent versions are kept as they are, so reading them is
+    instant.  As versions get older they are compacted: every
+    C{checkpoint_interval}th version is kept whole as a checkpoint, and the
+    rest are reduced to the changes from the version before, found by
+    comparing the two tries.  Reading a compacted version rebuilds it from
+    the checkpoint before it.
+
+    Unlike a list of frozendicts, which can hold on to many trie nodes that
+    later versions have replaced, the memory a long history uses is bounded
+    by the size of the changes made in it, plus a full copy for each
+    checkpoint.
+    """
+
+    def __init__(self, initial=_absent, keep_recent=16,
+                 checkpoint_interval=64):
+        """
+        @param initial: the contents of version 0.  Defaults to an empty
+            frozendict.
+        @param keep_recent: how many of the most recent versions to keep
+            whole.
+        @param checkpoint_interval: how often to keep a compacted version
+            whole.  Reading a compacted version applies the changes made
+            since the checkpoint before it, of which there are at most this
+            many sets.
+        """
+        if keep_recent < 1:
+            raise ValueError("keep_recent must be at least 1")
+        if checkpoint_interval < 1:
+            raise ValueError("checkpoint_interval must be at least 1")
+        self.keep_recent = keep_recent
+        self.checkpoint_interval = checkpoint_interval
+        self._lock = threading.Lock()
+        # Versions older than _first_recent are compacted: _checkpoints maps
+        # each checkpoint's number to its contents, and _deltas holds
+        # (updates, deletions) for each of the others, or None for the
+        # checkpoints.
+        self._checkpoints = {}
+        self._deltas = []
+        self._first_recent = 0
+        self._recent = deque([_frozen(initial)])
+        # The newest compacted version, which the next is compared with.
+        self._tail = None
+        # The version that at() rebuilt most recently, as (number, contents),
+        # so reading compacted versions in order needn't start from the
+        # checkpoint each time.
+        self._rebuilt = None
+
+
+    @property
+    def version(self):
+        """
+        The number of the most recent version.
+        """
+        return self._first_recent + len(self._recent) - 1
+
+
+    def __len__(self):
+        return self.version + 1
+
+
+    def latest(self):
+        """
+        Return the contents of the most recent version.
+        """
+        return self._recent[-1]
+
+
+    def append(self, snapshot):
+        """
+        Add C{snapshot}, a L{frozendict} or any other mapping, as the next
+        version.
+
+        @return: the number of the new version.
+        """
+        snapshot = _frozen(snapshot)
+        with self._lock:
+            self._recent.append(snapshot)
+            while len(self._recent) > self.keep_recent:
+                self._compact(self._recent.popleft())
+            return self.version
+
+
+    def at(self, version):
+        """
+        Return the contents of the history at C{version}.
+
+        Recent versions are returned as they were added.  Compacted ones are
+        rebuilt, and are equal to what was added but share less structure
+        with the versions around them.
+
+        @raise KeyError: if there is no such version.
+        """
+        with self._lock:
+            if version >= self._first_recent:
+                try:
+                    return self._recent[version - self._first_recent]
+                except IndexError:
+                    raise KeyError(version)
+            if version < 0:
+                raise KeyError(version)
+            start = version - version % self.checkpoint_interval
+            rebuilt = self._rebuilt
+            if rebuilt is not None and start <= rebuilt[0] <= version:
+                start, contents = rebuilt
+            else:
+                contents = self._checkpoints[start]
+            for i in xrange(start + 1, version + 1):
+                contents = _apply(contents, self._deltas[i])
+            self._rebuilt = (version, contents)
+            return contents
+
+
+    def changes(self, version):
+        """
+        Return the changes that C{version} made to the version before it.
+
+        @return: a tuple of a list of the C{(key, value)} pairs that were
+            added or changed, and a list of the keys that were removed.
+        @raise KeyError: if there is no such version, or if C{version} is 0.
+        """
+        if version < 1 or version > self.version:
+            raise KeyError(version)
+        with self._lock:
+            if version < self._first_recent:
+                delta = self._deltas[version]
+                if delta is not None:
+                    return list(delta[0]), list(delta[1])
+        return _diff(self.at(version - 1), self.at(version))
+
+
+    def _compact(self, contents):
+        version = self._first_recent
+        if version % self.checkpoint_interval == 0:
+            self._checkpoints[version] = contents
+            self._deltas.append(None)
+        else:
+            updates, deletions = _diff(self._tail, contents)
+            self._deltas.append((tuple(updates), tuple(deletions)))
+        self._tail = contents
+        self._first_recent += 1
+
+
+
+def _frozen(snapshot):
+    if isinstance(snapshot, frozendict):
+        return snapshot
+    if snapshot is _absent:
+        return frozendict()
+    return frozendict(snapshot)
+
+
+def _diff(old, new):
+    """
+    Return the changes that turn the frozendict C{old} into C{new}, as a
+    list of added or changed pairs and a list of removed keys.
+    """
+    updates = []
+    deletions = []
+    if old.root is None or new.root is None:
+        diffItems(old.iteritems(), new.iteritems(), updates, deletions)
+    else:
+        diff(old.root, new.root, updates, deletions)
+    return updates, deletions
+
+
+def _apply(contents, delta):
+    updates, deletions = delta
+    for key in deletions:
+        contents = contents.without(key)
+    return contents.merge(updates)
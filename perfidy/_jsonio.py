@@ -0,0 +1,150 @@
+"""Loading JSON straight into frozendicts."""
+
+import json
+import re
+
+from ._dict import from_pairs
+
+
+def loads_json(s, **kwargs):
+    """Decode the JSON document ``s`` into frozendicts and tuples.
+
+    Each JSON object is built directly into a frozendict from the pairs the
+    decoder reads, without first making a dict.  Arrays become tuples.  If
+    an object has the same key more than once, the last value wins, as with
+    ``json.loads``.
+
+    :param kwargs: Passed on to ``json.loads``, except for
+        ``object_hook`` and ``object_pairs_hook``.
+    """
+    return _freeze_arrays(
+        json.loads(s, object_pairs_hook=_object_from_pairs, **kwargs))
+
+
+def load_json(fp, **kwargs):
+    """Like ``loads_json``, but read the document from the file ``fp``."""
+    return loads_json(fp.read(), **kwargs)
+
+
+def iter_json_array(fp, chunksize=65536, **kwargs):
+    """Iterate over the items of a JSON array read from the file ``fp``.
+
+    Items are decoded as ``loads_json`` does and yielded one at a time, as
+    they are read, so the whole array never has to be in memory.
+
+    :param chunksize: How many characters to read from ``fp`` at a time.
+    :param kwargs: Passed on to ``json.JSONDecoder``.
+    :raises ValueError: If the document is not a JSON array, or is not
+        valid JSON.
+    """
+    decoder = json.JSONDecoder(object_pairs_hook=_object_from_pairs, **kwargs)
+    reader = _Reader(fp, chunksize)
+    if reader.next_char() != '[':
+        raise ValueError("Expected a JSON array")
+    reader.pos += 1
+    if reader.next_char() == ']':
+        reader.pos += 1
+        reader.expect_end()
+        return
+    while True:
+        yield _freeze_arrays(reader.decode(decoder))
+        c = reader.next_char()
+        reader.pos += 1
+        if c == ']':
+            reader.expect_end()
+            return
+        if c != ',':
+            raise ValueError(
+                "Expected ',' or ']' at character %d" % (reader.offset(),))
+
+
+def _object_from_pairs(pairs):
+    return from_pairs([(k, _freeze_arrays(v)) for k, v in pairs])
+
+
+def _freeze_arrays(obj):
+    # Objects have already had their arrays frozen by the time we see them,
+    # so only nested lists need visiting.
+    if type(obj) is list:
+        return tuple([_freeze_arrays(x) for x in obj])
+    return obj
+
+
+# What may be left in the buffer after a number that was cut off at its end.
+_maybe_cut = re.compile(r'(?:[.eE][-+]?)?\Z')
+
+
+class _Reader(object):
+    """
+    A buffer over a file that is refilled as decoding needs more of it.
+    """
+
+    def __init__(self, fp, chunksize):
+        self.fp = fp
+        self.chunksize = chunksize
+        self.buffer = ''
+        self.pos = 0
+        self.discarded = 0
+        self.eof = False
+
+    def offset(self):
+        return self.discarded + self.pos
+
+    def fill(self, size=None):
+        """
+        Read more of the file into the buffer, returning False at the end.
+        """
+        if self.eof:
+            return False
+        data = self.fp.read(size or self.chunksize)
+        if not data:
+            self.eof = True
+            return False
+        self.discarded += self.pos
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def next_char(self):
+        """
+        Skip whitespace and return the next character, or '' at the end.
+        """
+        while True:
+            while (self.pos < len(self.buffer)
+                   and self.buffer[self.pos] in ' \t\n\r'):
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ''
+
+    def decode(self, decoder):
+        """
+        Decode one value, reading more of the file until it is complete.
+        """
+        self.next_char()
+        size = self.chunksize
+        while True:
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+            except ValueError:
+                if not self.fill(size):
+                    raise
+            else:
+                # A number that runs up to the end of the buffer, or up to
+                # a "." or exponent at the end of it, may have been cut
+                # short: "12" could be the start of "123", and "1." of
+                # "1.5".  Anything else after a value means it is complete,
+                # or that the document is invalid however much more is read.
+                if (not _maybe_cut.match(self.buffer, end)
+                        or not self.fill(size)):
+                    self.pos = end
+                    return value
+            # Read more each time, so that a very large value doesn't take
+            # quadratic time to decode.
+            size *= 2
+
+    def expect_end(self):
+        if self.next_char():
+            raise ValueError(
+                "Extra data at character %d" % (self.offset(),))
@@ -0,0 +1,120 @@
+"""Caching the results of functions."""
+
+from collections import namedtuple, OrderedDict
+from functools import wraps
+import threading
+import time
+
+from ._dict import frozendict
+from ._freeze import deep_freeze
+
+
+CacheInfo = namedtuple('CacheInfo', 'hits misses maxsize currsize')
+
+
+_EMPTY = frozendict()
+
+
+def memoize(maxsize=128, ttl=None, thread_safe=False, clock=time.time):
+    """Cache the results of a function, keyed on its arguments.
+
+    Arguments are deep-frozen into a hashable key, so dicts, lists and sets
+    can be passed as well as hashable values: dicts become frozendicts,
+    lists become tuples and sets become frozensets.  That means a list and
+    a tuple with the same items make the same key, and so do equal values
+    of different types, such as ``1`` and ``1.0``.  Calls whose arguments
+    can't be frozen into something hashable are passed straight through to
+    the function.
+
+    Can be used as ``@memoize`` or ``@memoize(...)``.  The decorated
+    function has ``cache_info()`` and ``cache_clear()`` methods, as with
+    Python 3's ``functools.lru_cache``.
+
+    :param maxsize: The most results to keep.  When full, the least recently
+        used result is dropped.  If None, results are never dropped for
+        space.
+    :param ttl: If given, results older than this many seconds are
+        recalculated.
+    :param thread_safe: If true, guard the cache with a lock so the function
+        can be called from several threads.  The function itself runs
+        outside the lock, so concurrent calls with the same arguments may
+        each calculate the result.
+    :param clock: Returns the current time, in seconds; used for ``ttl``.
+    """
+    if callable(maxsize):
+        return memoize()(maxsize)
+    def decorate(f):
+        memo = _Memoized(f, maxsize, ttl, thread_safe, clock)
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            return memo.call(*args, **kwargs)
+        wrapper.cache_info = memo.cache_info
+        wrapper.cache_clear = memo.cache_clear
+        return wrapper
+    return decorate
+
+
+class _NoLock(object):
+
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+
+class _Memoized(object):
+
+    def __init__(self, f, maxsize, ttl, thread_safe, clock):
+        self.f = f
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self.lock = threading.Lock() if thread_safe else _NoLock()
+        self.cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+
+    def call(self, *args, **kwargs):
+        key = (deep_freeze(args), deep_freeze(kwargs) if kwargs else _EMPTY)
+        try:
+            hash(key)
+        except TypeError:
+            return self.f(*args, **kwargs)
+        cache = self.cache
+        with self.lock:
+            entry = cache.pop(key, None)
+            if entry is not None:
+                value, expires = entry
+                if expires is None or self.clock() < expires:
+                    # Reinsert to mark it most recently used.
+                    cache[key] = entry
+                    self.hits += 1
+                    return value
+            self.misses += 1
+        value = self.f(*args, **kwargs)
+        expires = None
+        if self.ttl is not None:
+            expires = self.clock() + self.ttl
+        with self.lock:
+            cache.pop(key, None)
+            cache[key] = (value, expires)
+            if self.maxsize is not None:
+                while len(cache) > self.maxsize:
+                    cache.popitem(last=False)
+        return value
+
+
+    def cache_info(self):
+        with self.lock:
+            return CacheInfo(
+                self.hits, self.misses, self.maxsize, len(self.cache))
+
+
+    def cache_clear(self):
+        with self.lock:
+            self.cache.clear()
+            self.hits = 0
+            self.misses = 0
@@ -0,0 +1,205 @@
+"""Immutable multimap implementation."""
+
+from ._dict import (
+    from_distinct,
+    frozendict,
+    )
+from ._hamt import _absent
+
+
+_NO_VALUES = frozendict()
+
+
+class frozenmultimap(object):
+    """
+    A mapping from keys to sets of values, that will not change.
+
+    Each key's values are held in a L{frozendict} of their own, mapping each
+    value to C{None}, inside a frozendict from keys to those.  Looking up a
+    key gives a set-like view of its values, which is empty for a key that
+    isn't there; a key whose last value is removed is removed with it.
+
+    Adding or removing a pair shares structure with the multimap it came
+    from, and merging two multimaps unions their value sets trie node by
+    trie node.
+    """
+
+    __slots__ = ('sets', 'total')
+
+    def __new__(cls, input=_absent):
+        """
+        @param input: a mapping from keys to iterables of values, or an
+            iterable of C{(key, value)} pairs.
+        """
+        f = super(frozenmultimap, cls).__new__(cls)
+        f.sets = frozendict()
+        f.total = 0
+        if input is _absent:
+            return f
+        if getattr(input, 'keys', None) is not None:
+            input = [(k, v) for k in input.keys() for v in input[k]]
+        return f.update(input)
+
+
+    def _make(self, sets, total):
+        if sets is self.sets:
+            return self
+        f = frozenmultimap()
+        f.sets = sets
+        f.total = total
+        return f
+
+
+    def __len__(self):
+        return self.sets.count
+
+
+    def __getitem__(self, key):
+        return self.sets.get(key, _NO_VALUES).keys()
+
+
+    def __contains__(self, key):
+        return key in self.sets
+
+
+    def __iter__(self):
+        return iter(self.sets)
+
+
+    def keys(self):
+        return self.sets.keys()
+
+
+    def pairs(self):
+        """
+        Iterate over every C{(key, value)} pair.
+        """
+        for k, values in self.sets.iteritems():
+            for v in values:
+                yield k, v
+
+
+    def add(self, key, value):
+        """
+        Return a new frozenmultimap with C{value} among the values of
+        C{key}.
+        """
+        values = self.sets.get(key, _NO_VALUES)
+        new = values.with_pair(value, None)
+        if new is values:
+            return self
+        return self._make(self.sets.with_pair(key, new), self.total + 1)
+
+
+    def remove(self, key, value):
+        """
+        Return a new frozenmultimap without C{value} among the values of
+        C{key}.  Nothing changes if it wasn't there.
+        """
+        values = self.sets.get(key, _NO_VALUES)
+        new = values.without(value)
+        if new is values:
+            return self
+        if new:
+            sets = self.sets.with_pair(key, new)
+        else:
+            sets = self.sets.without(key)
+        return self._make(sets, self.total - 1)
+
+
+    def without(self, key):
+        """
+        Return a new frozenmultimap without C{key} or any of its values.
+        """
+        return self._make(
+            self.sets.without(key),
+            self.total - len(self.sets.get(key, _NO_VALUES)))
+
+
+    def update(self, pairs):
+        """
+        Return a new frozenmultimap with the C{(key, value)} pairs of
+        C{pairs} added.
+
+        The pairs are grouped by key, and each key's value set is changed
+        once, in one batch of changes to the trie made with
+        L{frozendict.edit}.
+        """
+        grouped = {}
+        for k, v in pairs:
+            grouped.setdefault(k, []).append((v, None))
+        if not self.sets:
+            sets = []
+            total = 0
+            for k, values in grouped.iteritems():
+                values = frozendict(values)
+                sets.append((k, values))
+                total += len(values)
+            return self._make(from_distinct(sets), total)
+        editor = self.sets.edit()
+        total = self.total
+        for k, values in grouped.iteritems():
+            old = editor.get(k, _NO_VALUES)
+            new = old.merge(values)
+            if new is not old:
+                editor.set(k, new)
+                total += len(new) - len(old)
+        return self._make(editor.commit(), total)
+
+
+    def merge(self, other):
+        """
+        Return a new frozenmultimap holding the pairs of this one and of
+        the frozenmultimap C{other}.
+
+        Parts of either trie holding no keys of the other are shared with
+        the result rather than rebuilt, and so are value sets that are the
+        same object in both.
+        """
+        if other.sets is self.sets:
+            return self
+        # Pairs found in both, which union counts only once.
+        shared = [0]
+
+        def union(a, b):
+            if a is b:
+                shared[0] += len(a)
+                return a
+            result = a.merge_with(b, _first)
+            shared[0] += len(a) + len(b) - len(result)
+            return result
+
+        sets = self.sets.merge_with(other.sets, union)
+        return self._make(sets, self.total + other.total - shared[0])
+
+
+    def to_dict(self):
+        """
+        Return a C{dict} from each key to a C{frozenset} of its values.
+        """
+        return dict(
+            (k, frozenset(values)) for k, values in self.sets.iteritems())
+
+
+    def __eq__(self, other):
+        if not isinstance(other, frozenmultimap):
+            return False
+        return self.sets == other.sets
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+    def __hash__(self):
+        return hash(self.sets)
+
+
+    def __repr__(self):
+        return "frozenmultimap(%r)" % (
+            dict((k, list(values)) for k, values in self.sets.iteritems()),)
+
+
+
+def _first(a, b):
+    return a
@@ -0,0 +1,131 @@
+"""A mutable dict layered over a frozendict."""
+
+from collections import MutableMapping
+
+from ._dict import frozendict
+from ._hamt import _not_found
+
+
+# Marks a key deleted from the overlay.
+_deleted = object()
+
+
+class overlaydict(MutableMapping):
+    """
+    A mutable mapping that starts out with the contents of a L{frozendict}.
+
+    Reads fall through to the frozendict; writes and deletions are kept in a
+    small dict of changes on top of it.  Creating an overlay takes constant
+    time however large the frozendict is, and L{freeze} turns it back into a
+    frozendict in time proportional to the number of changes.
+    """
+
+    def __init__(self, base):
+        if not isinstance(base, frozendict):
+            base = frozendict(base)
+        self.base = base
+        self._changes = {}
+        self._count = len(base)
+
+
+    def __getitem__(self, key):
+        val = self._changes.get(key, _not_found)
+        if val is _not_found:
+            return self.base[key]
+        if val is _deleted:
+            raise KeyError(key)
+        return val
+
+
+    def get(self, key, default=None):
+        val = self._changes.get(key, _not_found)
+        if val is _not_found:
+            return self.base.get(key, default)
+        if val is _deleted:
+            return default
+        return val
+
+
+    def __contains__(self, key):
+        val = self._changes.get(key, _not_found)
+        if val is _not_found:
+            return key in self.base
+        return val is not _deleted
+
+
+    def __setitem__(self, key, value):
+        if key not in self:
+            self._count += 1
+        self._changes[key] = value
+
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self._count -= 1
+        self._changes[key] = _deleted
+
+
+    def __len__(self):
+        return self._count
+
+
+    def clear(self):
+        self.base = frozendict()
+        self._changes = {}
+        self._count = 0
+
+
+    def iteritems(self):
+        changes = self._changes
+        for k, v in self.base.items():
+            if k in changes:
+                v = changes[k]
+                if v is _deleted:
+                    continue
+            yield k, v
+        base = self.base
+        for k, v in changes.iteritems():
+            if v is not _deleted and k not in base:
+                yield k, v
+
+
+    def __iter__(self):
+        for k, v in self.iteritems():
+            yield k
+
+
+    def itervalues(self):
+        for k, v in self.iteritems():
+            yield v
+
+
+    def items(self):
+        return list(self.iteritems())
+
+
+    def values(self):
+        return list(self.itervalues())
+
+
+    def freeze(self):
+        """
+        Return a frozendict with the current contents of the overlay.
+
+        The changes are made to the base in one batch, with
+        L{frozendict.edit}, so nodes on the paths to several changed keys are
+        copied once.  If nothing has changed, the base itself is returned.
+        """
+        if not self._changes:
+            return self.base
+        editor = self.base.edit()
+        for k, v in self._changes.iteritems():
+            if v is _deleted:
+                editor.delete(k)
+            else:
+                editor.set(k, v)
+        return editor.commit()
+
+
+    def __repr__(self):
+        return "overlaydict(%r)" % (dict(self.iteritems()),)
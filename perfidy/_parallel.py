@@ -0,0 +1,119 @@
+"""Parallel versions of the mapping helpers."""
+
+from collections import deque
+from itertools import islice
+
+from ._dict import frozendict
+
+
+def parallel_map_values(f, d, workers=None, executor=None, chunksize=256,
+                        max_pending=None):
+    """Map ``f`` across the values of ``d`` in parallel.
+
+    Like ``map_values``, but items are split into chunks and ``f`` is called
+    on each chunk in a pool.  Use this when ``f`` is expensive enough to
+    outweigh the cost of handing work to another thread or process.
+
+    :param workers: Run ``f`` in a new pool of this many threads, closed
+        again before returning.
+    :param executor: Run ``f`` in this pool instead.  Either something with
+        a ``submit`` method, like a ``concurrent.futures`` executor, or with
+        an ``apply_async`` method, like a ``multiprocessing`` pool.  For
+        process pools ``f`` must be picklable, so it can't be a lambda.
+    :param chunksize: How many items to send to the pool at a time.
+    :param max_pending: How many chunks may be queued or running at once,
+        which bounds how much of ``d`` is in flight.  Defaults to twice
+        ``workers``, or 16 if an executor is given.
+    :raises: Whatever ``f`` raises, as soon as the chunk that raised is
+        reached; chunks not yet started are cancelled if the pool allows it.
+    :return: A dict, or a frozendict if ``d`` is one, where each key ``k``
+        maps to ``f(d[k])``.
+    """
+    return _parallel(
+        _map_values_chunk, f, d, workers, executor, chunksize, max_pending)
+
+
+def parallel_map_dict(f, d, workers=None, executor=None, chunksize=256,
+                      max_pending=None):
+    """Map ``f`` across the ``(key, value)`` pairs of ``d`` in parallel.
+
+    Like ``map_dict``; see ``parallel_map_values`` for the other arguments.
+    """
+    return _parallel(
+        _map_dict_chunk, f, d, workers, executor, chunksize, max_pending)
+
+
+def _map_values_chunk(f, chunk):
+    return [(k, f(v)) for k, v in chunk]
+
+
+def _map_dict_chunk(f, chunk):
+    return [f(item) for item in chunk]
+
+
+def _parallel(run_chunk, f, d, workers, executor, chunksize, max_pending):
+    if (workers is None) == (executor is None):
+        raise ValueError("Must specify exactly one of workers and executor")
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    result = frozendict() if isinstance(d, frozendict) else {}
+    if workers is None:
+        if max_pending is None:
+            max_pending = 16
+        pairs = _run_chunks(run_chunk, f, d.items(), executor, chunksize,
+                            max_pending)
+        return _collect(result, pairs)
+    from multiprocessing.pool import ThreadPool
+    pool = ThreadPool(workers)
+    try:
+        if max_pending is None:
+            max_pending = 2 * workers
+        pairs = _run_chunks(run_chunk, f, d.items(), pool, chunksize,
+                            max_pending)
+        return _collect(result, pairs)
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _collect(result, pairs):
+    if isinstance(result, frozendict):
+        return result.merge(pairs)
+    result.update(pairs)
+    return result
+
+
+def _run_chunks(run_chunk, f, items, executor, chunksize, max_pending):
+    """
+    Yield the results of ``run_chunk(f, chunk)`` for successive chunks of
+    ``items``, in order, with at most ``max_pending`` chunks in the pool.
+    """
+    submit = getattr(executor, 'submit', None)
+    if submit is None:
+        submit = lambda fn, *args: executor.apply_async(fn, args)
+    pending = deque()
+    items = iter(items)
+    try:
+        while True:
+            chunk = list(islice(items, chunksize))
+            if not chunk:
+                break
+            if len(pending) >= max(1, max_pending):
+                for pair in _result(pending.popleft()):
+                    yield pair
+            pending.append(submit(run_chunk, f, chunk))
+        while pending:
+            for pair in _result(pending.popleft()):
+                yield pair
+    finally:
+        for future in pending:
+            cancel = getattr(future, 'cancel', None)
+            if cancel is not None:
+                cancel()
+
+
+def _result(future):
+    result = getattr(future, 'result', None)
+    if result is None:
+        return future.get()
+    return result()
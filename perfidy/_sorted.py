@@ -0,0 +1,219 @@
+"""Immutable sorted dict implementation."""
+
+from itertools import izip
+from operator import itemgetter
+
+from . import _avl
+from ._hamt import (
+    _absent,
+    _not_found,
+    )
+
+
+class frozensorteddict(object):
+    """
+    A dictionary that will not change, and that keeps its keys in order.
+
+    Keys must be mutually orderable with C{<}, but need not be hashable
+    unless the frozensorteddict itself is hashed.  Lookups and updates take
+    O(log n) time; iterating over a range of k keys takes O(log n + k).
+    """
+
+    def __new__(cls, input=_absent):
+        f = super(frozensorteddict, cls).__new__(cls)
+        f.root = None
+        f.count = 0
+        f._hash = None
+        if input is _absent:
+            return f
+        else:
+            return f.merge(input)
+
+
+    @classmethod
+    def from_sorted(cls, pairs):
+        """
+        Build a frozensorteddict from C{(k, v)} pairs in strictly increasing
+        key order.
+
+        This takes linear time, rather than the O(n log n) of adding the
+        pairs one at a time, and creates no intermediate trees.
+
+        @raise ValueError: if the keys are not strictly increasing.
+        """
+        keys = []
+        values = []
+        for k, v in pairs:
+            if keys and not keys[-1] < k:
+                raise ValueError(
+                    "Keys not in strictly increasing order: %r, %r"
+                    % (keys[-1], k))
+            keys.append(k)
+            values.append(v)
+        f = cls()
+        f.root = _avl.from_sorted(keys, values)
+        f.count = len(keys)
+        return f
+
+
+    def merge(self, pairs):
+        """
+        Return a new frozensorteddict with the mappings in C{pairs}.
+
+        If C{pairs} has a C{keys()} attribute, then adds C{(k, pairs[k])} for
+        all C{k} in keys.  If not, then adds C{(k, v)} for all C{(k, v)} in
+        pairs.
+        """
+        keys = getattr(pairs, 'keys', None)
+        if keys is not None:
+            pairs = [(k, pairs[k]) for k in keys()]
+        if self.root is None:
+            return self.from_sorted(_sorted_unique(pairs))
+        result = self
+        for k, v in pairs:
+            result = result.with_pair(k, v)
+        return result
+
+
+    def __len__(self):
+        return self.count
+
+
+    def __getitem__(self, key):
+        val = _avl.find(self.root, key, _not_found)
+        if val is _not_found:
+            raise KeyError(key)
+        else:
+            return val
+
+
+    def get(self, key, default=None):
+        return _avl.find(self.root, key, default)
+
+
+    def __contains__(self, key):
+        return _avl.find(self.root, key, _not_found) is not _not_found
+
+
+    def __hash__(self):
+        if self._hash is not None:
+            return self._hash
+        # Same as frozendict, so that the hash is independent of order.
+        hashval = 0x3039
+        for k, v in self.items():
+            hashval += hash(k) ^ hash(v)
+        self._hash = hashval
+        return hashval
+
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        if not self.__class__ == other.__class__:
+            return False
+        if len(self) != len(other):
+            return False
+        for (k1, v1), (k2, v2) in izip(self.items(), other.items()):
+            if k1 != k2 or v1 != v2:
+                return False
+        return True
+
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+    def keys(self):
+        for (k, v) in self.items():
+            yield k
+
+
+    def values(self):
+        for (k, v) in self.items():
+            yield v
+
+
+    def items(self):
+        return _avl.iteritems(self.root)
+
+
+    def irange(self, start=_absent, stop=_absent, inclusive=False):
+        """
+        Iterate over the pairs with keys from C{start} up to C{stop}, in
+        order.
+
+        Either bound may be omitted to leave that end of the range open.
+
+        @param start: the least key to include.
+        @param stop: the key to stop at.  It is included only if
+            C{inclusive} is true.
+        """
+        return _avl.iteritems(self.root, start, stop, inclusive)
+
+
+    def floor_item(self, key):
+        """
+        Return the pair with the greatest key less than or equal to C{key}.
+
+        @raise KeyError: if every key is greater than C{key}.
+        """
+        node = _avl.floor(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        return node.key, node.value
+
+
+    def ceiling_item(self, key):
+        """
+        Return the pair with the least key greater than or equal to C{key}.
+
+        @raise KeyError: if every key is less than C{key}.
+        """
+        node = _avl.ceiling(self.root, key)
+        if node is None:
+            raise KeyError(key)
+        return node.key, node.value
+
+
+    def with_pair(self, k, v):
+        """
+        Return a new frozensorteddict that maps 'k' to 'v'.
+        """
+        newroot, added = _avl.assoc(self.root, k, v)
+        if newroot is self.root:
+            return self
+        newf = frozensorteddict()
+        newf.root = newroot
+        newf.count = self.count + 1 if added else self.count
+        return newf
+
+
+    def without(self, k):
+        """
+        Return a new frozensorteddict without key 'k'.
+        """
+        newroot = _avl.without(self.root, k)
+        if newroot is self.root:
+            return self
+        newf = frozensorteddict()
+        newf.root = newroot
+        newf.count = self.count - 1
+        return newf
+
+
+    def __repr__(self):
+        return "frozensorteddict(%r)" % (list(self.items()),)
+
+
+
+def _sorted_unique(pairs):
+    """
+    Sort C{pairs} by key, keeping only the last pair given for each key.
+    """
+    result = []
+    for k, v in sorted(pairs, key=itemgetter(0)):
+        if result and not result[-1][0] < k:
+            result[-1] = (result[-1][0], v)
+        else:
+            result.append((k, v))
+    return result
@@ -0,0 +1,220 @@
+"""An in-memory key-value store with multiple versions."""
+
+from collections import deque
+import logging
+import threading
+
+from ._dict import frozendict
+from ._hamt import _absent
+from ._sorted import frozensorteddict
+
+
+_log = logging.getLogger(__name__)
+
+
+class VersionedStore(object):
+    """
+    A store that keeps each committed version as a L{frozendict}.
+
+    Readers get whole versions, so they always see a consistent snapshot
+    and never wait for writers.  Versions share structure, so keeping many
+    of them costs roughly the size of the changes between them rather than
+    a copy each.
+
+    The store remembers the most recent C{max_versions} versions, plus any
+    that have been pinned.  Older versions are forgotten by the store,
+    although a reader that already has one can go on using it.
+    """
+
+    def __init__(self, initial=_absent, max_versions=None):
+        """
+        @param initial: the contents of version 0.  Defaults to an empty
+            frozendict.
+        @param max_versions: how many recent versions to keep, or C{None} to
+            keep them all.
+        """
+        if initial is _absent:
+            initial = frozendict()
+        elif not isinstance(initial, frozendict):
+            initial = frozendict(initial)
+        if max_versions is not None and max_versions < 1:
+            raise ValueError("max_versions must be at least 1")
+        self.max_versions = max_versions
+        self._lock = threading.Lock()
+        self._version = 0
+        self._latest = initial
+        # Replaced rather than mutated, so readers can look versions up
+        # without the lock.
+        self._versions = frozensorteddict({0: initial})
+        self._pins = {}
+        self._subscribers = []
+        # Commits subscribers haven't been told about yet, as (version,
+        # snapshot, subscribers), and whether a thread is telling them.
+        self._pending = deque()
+        self._notifying = False
+
+
+    @property
+    def version(self):
+        """
+        The number of the most recent version.
+        """
+        return self._version
+
+
+    def snapshot(self, version=None):
+        """
+        Return the contents of the store at C{version}.
+
+        @param version: a version number, or C{None} for the most recent.
+        @raise KeyError: if that version was never committed or has been
+            forgotten.
+        """
+        if version is None:
+            return self._latest
+        return self._versions[version]
+
+
+    def versions(self):
+        """
+        Return the numbers of the versions the store still has, oldest
+        first.
+        """
+        return list(self._versions.keys())
+
+
+    def commit(self, updates=(), deletions=()):
+        """
+        Create a new version by applying a batch of changes to the latest.
+
+        @param updates: a mapping or sequence of C{(key, value)} pairs to
+            set.
+        @param deletions: keys to remove.  Keys that aren't present are
+            ignored.
+        @return: the number of the new version.  If the changes leave the
+            store as it was, no version is created and the current number
+            is returned.
+        """
+        with self._lock:
+            old = self._latest
+            new = old.merge(updates)
+            for key in deletions:
+                new = new.without(key)
+            if new is old:
+                return self._version
+            self._version += 1
+            self._versions = self._versions.with_pair(self._version, new)
+            self._latest = new
+            self._collect()
+            version = self._version
+            if not self._subscribers:
+                return version
+            self._pending.append((version, new, list(self._subscribers)))
+            if self._notifying:
+                return version
+            self._notifying = True
+        self._notify()
+        return version
+
+
+    def _notify(self):
+        """
+        Tell subscribers about commits until none are left to tell them
+        about.
+
+        Only one thread does this at a time, so that subscribers hear about
+        commits in order, and commits made by a callback are told about
+        after the one it is being called for rather than in the middle of
+        it.  The store isn't locked while callbacks run, so they can use it.
+        """
+        try:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        self._notifying = False
+                        return
+                    version, snapshot, subscribers = self._pending.popleft()
+                for callback, loop in subscribers:
+                    try:
+                        if loop is None:
+                            callback(version, snapshot)
+                        else:
+                            loop.call_soon_threadsafe(
+                                callback, version, snapshot)
+                    except Exception:
+                        _log.exception(
+                            "Subscriber %r failed for version %d",
+                            callback, version)
+        except BaseException:
+            with self._lock:
+                self._notifying = False
+            raise
+
+
+    def subscribe(self, callback, loop=None):
+        """
+        Call C{callback(version, snapshot)} after every commit.
+
+        Callbacks are made in commit order, from the thread that committed
+        or, if another thread is already calling subscribers, from that
+        thread.  They may use the store, including to pin the version they
+        are told about or to commit, in which case they are told about the
+        new commit once every subscriber has heard of this one.  Exceptions
+        they raise are logged and don't stop the other subscribers from
+        being called.
+
+        @param loop: an event loop, such as an C{asyncio} loop.  If given,
+            callbacks are scheduled on it with C{call_soon_threadsafe}
+            rather than called directly.
+        @return: a function that cancels the subscription.
+        """
+        entry = (callback, loop)
+        with self._lock:
+            self._subscribers.append(entry)
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+
+    def pin(self, version):
+        """
+        Keep C{version} until it is unpinned, however old it gets.
+
+        Pins are counted, so each call must be matched by a call to
+        L{unpin}.
+
+        @raise KeyError: if the version has already been forgotten.
+        """
+        with self._lock:
+            if version not in self._versions:
+                raise KeyError(version)
+            self._pins[version] = self._pins.get(version, 0) + 1
+
+
+    def unpin(self, version):
+        """
+        Undo a call to L{pin}.
+        """
+        with self._lock:
+            count = self._pins[version] - 1
+            if count:
+                self._pins[version] = count
+            else:
+                del self._pins[version]
+                self._collect()
+
+
+    def _collect(self):
+        """
+        Forget versions outside the retention window that aren't pinned.
+        """
+        if self.max_versions is None:
+            return
+        oldest_kept = self._version - self.max_versions + 1
+        versions = self._versions
+        for version, _ in self._versions.irange(stop=oldest_kept):
+            if version not in self._pins:
+                versions = versions.without(version)
+        self._versions = versions
@@ -0,0 +1,88 @@
+from testtools import TestCase
+
+from .. import frozendict
+from .._async import (
+    afilter_keys,
+    afilter_values,
+    amap_keys,
+    amap_values,
+    asyncio,
+)
+
+
+class TestAsyncHelpers(TestCase):
+
+    def setUp(self):
+        super(TestAsyncHelpers, self).setUp()
+        if asyncio is None:
+            self.skipTest("Need asyncio or trollius")
+        self.loop = asyncio.new_event_loop()
+        self.addCleanup(self.loop.close)
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def later(self, f):
+        """Make an asynchronous version of ``f`` that tracks concurrency."""
+        def call(x):
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            future = asyncio.Future(loop=self.loop)
+            def finish():
+                self.in_flight -= 1
+                try:
+                    future.set_result(f(x))
+                except Exception as e:
+                    future.set_exception(e)
+            self.loop.call_later(0.001, finish)
+            return future
+        return call
+
+    def complete(self, future):
+        return self.loop.run_until_complete(future)
+
+    def test_amap_values(self):
+        d = dict(zip(range(20), range(20)))
+        result = self.complete(amap_values(
+            self.later(lambda v: v * 2), d, concurrency=3, loop=self.loop))
+        self.assertEqual(dict((k, k * 2) for k in range(20)), result)
+        self.assertEqual(3, self.max_in_flight)
+
+    def test_amap_keys(self):
+        result = self.complete(amap_keys(
+            self.later(str), {1: 'a', 2: 'b'}, loop=self.loop))
+        self.assertEqual({'1': 'a', '2': 'b'}, result)
+
+    def test_afilter(self):
+        d = dict(zip(range(10), range(10, 20)))
+        self.assertEqual(
+            {0: 10, 2: 12},
+            self.complete(afilter_values(
+                self.later(lambda v: v in (10, 12)), d, loop=self.loop)))
+        self.assertEqual(
+            {9: 19},
+            self.complete(afilter_keys(
+                self.later(lambda k: k == 9), d, loop=self.loop)))
+
+    def test_frozendict(self):
+        result = self.complete(amap_values(
+            self.later(lambda v: -v), frozendict({1: 1}), loop=self.loop))
+        self.assertEqual(frozendict({1: -1}), result)
+
+    def test_empty(self):
+        self.assertEqual({}, self.complete(amap_values(
+            self.later(lambda v: v), {}, loop=self.loop)))
+
+    def test_exception(self):
+        def fail_on_3(v):
+            if v == 3:
+                raise ValueError(v)
+            return v
+        future = amap_values(
+            self.later(fail_on_3), dict(zip(range(10), range(10))),
+            concurrency=2, loop=self.loop)
+        self.assertRaises(ValueError, self.complete, future)
+
+    def test_bad_concurrency(self):
+        self.assertRaises(
+            ValueError, amap_values, self.later(str), {}, concurrency=0,
+            loop=self.loop)
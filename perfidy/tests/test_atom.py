@@ -0,0 +1,101 @@
+import threading
+
+from .. import (
+    Atom,
+    frozendict,
+    )
+
+from testtools import TestCase
+
+
+def increment(d, key):
+    return d.with_pair(key, d.get(key, 0) + 1)
+
+
+def runThreads(n, target):
+    threads = [threading.Thread(target=target) for i in range(n)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+
+
+class AtomTests(TestCase):
+    """
+    Tests for L{Atom}.
+    """
+
+    def test_defaultValue(self):
+        """
+        An atom holds an empty frozendict unless given a value.
+        """
+        self.assertEqual(Atom().deref(), frozendict())
+        d = frozendict({'a': 1})
+        self.assertTrue(Atom(d).deref() is d)
+
+
+    def test_compareAndSet(self):
+        """
+        compare_and_set only replaces the value it was told to expect.
+        """
+        d = frozendict({'a': 1})
+        atom = Atom(d)
+        new = d.with_pair('a', 2)
+        self.assertFalse(atom.compare_and_set(frozendict({'a': 1}), new))
+        self.assertTrue(atom.deref() is d)
+        self.assertTrue(atom.compare_and_set(d, new))
+        self.assertTrue(atom.deref() is new)
+
+
+    def test_swapRetries(self):
+        """
+        swap calls the function again if the value changed underneath it.
+        """
+        atom = Atom()
+        calls = []
+        def f(d):
+            calls.append(d)
+            if len(calls) == 1:
+                atom.reset(frozendict({'other': 1}))
+            return d.with_pair('mine', 1)
+        result = atom.swap(f)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(result, frozendict({'other': 1, 'mine': 1}))
+        self.assertTrue(atom.deref() is result)
+
+
+    def test_concurrentSwap(self):
+        """
+        No updates are lost when many threads swap at once.
+        """
+        atom = Atom()
+        def work():
+            for i in range(200):
+                atom.swap(increment, i % 10)
+        runThreads(8, work)
+        self.assertEqual(atom.deref(), frozendict((i, 160) for i in range(10)))
+
+
+    def test_concurrentSwapBatched(self):
+        """
+        No updates are lost when many threads coalesce their swaps.
+        """
+        atom = Atom()
+        def work():
+            for i in range(200):
+                atom.swap_batched(increment, i % 10)
+        runThreads(8, work)
+        self.assertEqual(atom.deref(), frozendict((i, 160) for i in range(10)))
+
+
+    def test_swapBatchedError(self):
+        """
+        An exception from a batched update is raised in its caller and
+        leaves the value unchanged.
+        """
+        atom = Atom(frozendict({'a': 1}))
+        self.assertRaises(KeyError, atom.swap_batched, lambda d: d['missing'])
+        self.assertEqual(atom.deref(), frozendict({'a': 1}))
+        self.assertEqual(atom.swap_batched(increment, 'a'),
+                         frozendict({'a': 2}))
@@ -0,0 +1,127 @@
+from collections import Counter
+import random
+
+from .. import (
+    frozencounter,
+    frozendict,
+    )
+
+from testtools import TestCase
+
+from .test_mapping import HashTester
+
+
+class FrozenCounterTests(TestCase):
+    """
+    Tests for L{frozencounter}.
+    """
+
+    def test_empty(self):
+        c = frozencounter()
+        self.assertEqual(0, len(c))
+        self.assertEqual(0, c.total)
+        self.assertEqual(0, c['missing'])
+        self.assertFalse('missing' in c)
+
+
+    def test_construct(self):
+        """
+        A frozencounter can be made from an iterable of keys, or a mapping
+        of counts, in which counts of zero or less are dropped.
+        """
+        c = frozencounter('abracadabra')
+        self.assertEqual(dict(Counter('abracadabra')), c.to_dict())
+        self.assertEqual(11, c.total)
+        self.assertEqual(c, frozencounter({'a': 5, 'b': 2, 'r': 2, 'c': 1,
+                                           'd': 1, 'z': 0, 'y': -3}))
+
+
+    def test_increment(self):
+        """
+        increment and decrement change one count, and remove the key when
+        its count reaches zero.
+        """
+        c = frozencounter('aab')
+        self.assertEqual(3, c.increment('a')['a'])
+        self.assertEqual(5, c.increment('c', 5)['c'])
+        self.assertEqual(8, c.increment('c', 5).total)
+        self.assertEqual(1, c.decrement('a')['a'])
+        gone = c.decrement('a', 3)
+        self.assertFalse('a' in gone)
+        self.assertEqual(1, gone.total)
+        self.assertIs(c, c.decrement('missing'))
+        self.assertEqual(frozencounter('aab'), c)
+
+
+    def test_remove(self):
+        c = frozencounter('aab')
+        self.assertEqual(frozencounter('b'), c.remove('a'))
+        self.assertEqual(1, c.remove('a').total)
+        self.assertIs(c, c.remove('missing'))
+
+
+    def test_update(self):
+        """
+        update adds counts from keys or from a mapping, which may take them
+        away.
+        """
+        rng = random.Random(2)
+        keys = range(300) + [HashTester(i, i % 5 + 1) for i in range(20)]
+        for start in (0, 5, 300):
+            expected = Counter(rng.choice(keys) for i in range(start))
+            c = frozencounter(expected)
+            for trial in range(5):
+                added = [rng.choice(keys) for i in range(rng.randint(0, 200))]
+                changes = dict(
+                    (rng.choice(keys), rng.randint(-3, 3)) for i in range(50))
+                c = c.update(added).update(changes)
+                expected.update(added)
+                expected.update(changes)
+                expected = Counter(
+                    dict((k, n) for k, n in expected.items() if n > 0))
+                self.assertEqual(dict(expected), c.to_dict())
+                self.assertEqual(sum(expected.values()), c.total)
+
+
+    def test_merge(self):
+        """
+        Merging two counters sums their counts, and shares the parts of
+        either trie that the other has no keys in.
+        """
+        a = frozencounter(dict((i * 32, i + 1) for i in range(100)))
+        b = frozencounter(dict((i * 16, 2) for i in range(100)))
+        merged = a.merge(b)
+        expected = Counter(a.to_dict()) + Counter(b.to_dict())
+        self.assertEqual(dict(expected), merged.to_dict())
+        self.assertEqual(a.total + b.total, merged.total)
+        self.assertEqual(merged, a.update(b))
+        self.assertIs(a, a.merge(frozencounter()))
+        c = frozencounter(dict((i * 32 + 1, 1) for i in range(100)))
+        self.assertIs(
+            c.counts.root.array[1], a.merge(c).counts.root.array[3])
+
+
+    def test_mostCommon(self):
+        c = frozencounter('abracadabra')
+        self.assertEqual([('a', 5)], c.most_common(1))
+        self.assertEqual(Counter('abracadabra').most_common(),
+                         sorted(c.most_common(), key=lambda p: -p[1]))
+        self.assertEqual([5, 2, 2, 1, 1], [n for k, n in c.most_common()])
+
+
+    def test_elements(self):
+        self.assertEqual(sorted('abracadabra'),
+                         sorted(frozencounter('abracadabra').elements()))
+
+
+    def test_eqHash(self):
+        a = frozencounter('hello')
+        b = frozencounter('olleh')
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, frozencounter('hell'))
+        self.assertNotEqual(a, frozendict(a.items()))
+
+
+    def test_repr(self):
+        self.assertEqual("frozencounter({'a': 2})", repr(frozencounter('aa')))
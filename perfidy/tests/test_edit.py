@@ -0,0 +1,135 @@
+import random
+
+from .. import (
+    _dict,
+    frozendict,
+    )
+
+from testtools import TestCase
+
+from .test_mapping import (
+    checkSizes,
+    HashTester,
+    )
+
+
+class EditorTests(TestCase):
+    """
+    Tests for L{Editor}, from L{frozendict.edit}.
+    """
+
+    def test_edits(self):
+        """
+        Changes made through an editor appear in the committed frozendict,
+        and not in the original.
+        """
+        for n in (3, 100):
+            d = frozendict((i, i) for i in range(n))
+            e = d.edit()
+            e.set(0, 'zero')
+            e.set(n, 'new')
+            e.delete(1)
+            e.delete('missing')
+            self.assertEqual('zero', e.get(0))
+            self.assertFalse(1 in e)
+            self.assertEqual(n, len(e))
+            result = e.commit()
+            expected = d.with_pair(0, 'zero').with_pair(n, 'new').without(1)
+            self.assertEqual(expected, result)
+            self.assertEqual(frozendict((i, i) for i in range(n)), d)
+
+
+    def test_unchanged(self):
+        """
+        Committing without having changed anything returns the original.
+        """
+        d = frozendict((i, i) for i in range(100))
+        e = d.edit()
+        e.set(5, 5)
+        e.delete(100)
+        self.assertIs(d, e.commit())
+
+
+    def test_editAfterCommit(self):
+        """
+        Edits after a commit don't change what was committed.
+        """
+        d = frozendict((i, i) for i in range(100))
+        e = d.edit()
+        e.set(1, 'a')
+        first = e.commit()
+        e.set(1, 'b')
+        e.set(2, 'b')
+        e.delete(3)
+        second = e.commit()
+        self.assertEqual(d.with_pair(1, 'a'), first)
+        self.assertEqual(
+            d.with_pair(1, 'b').with_pair(2, 'b').without(3), second)
+
+
+    def test_sharesUntouched(self):
+        """
+        Parts of the trie that weren't changed are shared with the original.
+        """
+        d = frozendict((i, i) for i in range(1000))
+        e = d.edit()
+        e.set(0, 'zero')
+        e.set(32, 'thirty-two')
+        result = e.commit()
+        self.assertIsNot(d.root.array[0], result.root.array[0])
+        for i in range(1, 32):
+            self.assertIs(d.root.array[i], result.root.array[i])
+
+
+    def test_growsOutOfInline(self):
+        """
+        A small frozendict stays inline until it outgrows the threshold.
+        """
+        e = frozendict().edit()
+        for i in range(_dict._INLINE_THRESHOLD):
+            e.set(i, i)
+        self.assertIsNone(e.commit().root)
+        e.set('more', 1)
+        result = e.commit()
+        self.assertIsNotNone(result.root)
+        self.assertEqual(
+            frozendict(
+                [(i, i) for i in range(_dict._INLINE_THRESHOLD)]
+                + [('more', 1)]),
+            result)
+
+
+    def test_random(self):
+        """
+        Any series of edits gives the same result as with_pair and without,
+        including with hash collisions and as nodes fill and empty.
+        """
+        rng = random.Random(11)
+        for threshold in (0, _dict._INLINE_THRESHOLD):
+            self.patch(_dict, '_INLINE_THRESHOLD', threshold)
+            for trial in range(30):
+                n = rng.choice([0, 5, 40, 600])
+                keys = (range(n)
+                        + [HashTester(i, i % 7 + 1) for i in range(20)]
+                        + [i * 32 for i in range(50)])
+                d = frozendict((k, 0) for k in keys[:n])
+                e = d.edit()
+                expected = d
+                for step in range(rng.randint(0, 300)):
+                    k = rng.choice(keys)
+                    if rng.random() < 0.6:
+                        v = rng.randint(0, 3)
+                        e.set(k, v)
+                        expected = expected.with_pair(k, v)
+                    else:
+                        e.delete(k)
+                        expected = expected.without(k)
+                    self.assertEqual(len(expected), len(e))
+                    if rng.random() < 0.05:
+                        self.assertEqual(expected, e.commit())
+                result = e.commit()
+                self.assertEqual(expected, result)
+                for k in keys:
+                    self.assertEqual(expected.get(k), result.get(k))
+                if result.root is not None:
+                    checkSizes(result.root)
@@ -1,5 +1,7 @@
 # Copyright (c) 2010-2012 extras developers. See LICENSE for details.
 
+import sys
+
 from testtools import TestCase
 from testtools.matchers import (
     Equals,
@@ -7,7 +9,10 @@ from testtools.matchers import (
     Not,
     )
 
+from .. import _extras
 from .._extras import (
+    clear_import_cache,
+    ImportTrace,
     safe_hasattr,
     try_import,
     try_imports,
@@ -185,3 +190,203 @@ class TestTryImports(TestCase):
         check_error_callback(self, try_imports,
             ['os.path'],
             0, True)
+
+
+class NullFinder(object):
+    """An import hook that finds nothing."""
+
+    def find_module(self, fullname, path=None):
+        return None
+
+    def find_spec(self, fullname, path, target=None):
+        return None
+
+
+class TestImportCache(TestCase):
+
+    def setUp(self):
+        super(TestImportCache, self).setUp()
+        clear_import_cache()
+        self.addCleanup(clear_import_cache)
+        self.resolved = []
+        resolve = _extras._resolve
+        def counting_resolve(name, attempts=None):
+            self.resolved.append(name)
+            return resolve(name, attempts)
+        self.patch(_extras, '_resolve', counting_resolve)
+
+    def test_failure_cached(self):
+        marker = object()
+        self.assertThat(try_import('doesntexist', marker, cache=True),
+                        Is(marker))
+        self.assertThat(try_import('doesntexist', marker, cache=True),
+                        Is(marker))
+        self.assertEqual(['doesntexist'], self.resolved)
+
+    def test_success_cached(self):
+        import os
+        self.assertThat(try_import('os.path.join', cache=True),
+                        Is(os.path.join))
+        self.assertThat(try_import('os.path.join', cache=True),
+                        Is(os.path.join))
+        self.assertEqual(['os.path.join'], self.resolved)
+
+    def test_uncached_by_default(self):
+        try_import('doesntexist')
+        try_import('doesntexist')
+        self.assertEqual(['doesntexist', 'doesntexist'], self.resolved)
+
+    def test_error_callback_on_cached_failure(self):
+        try_import('doesntexist', cache=True)
+        check_error_callback(
+            self, lambda name, error_callback: try_import(
+                name, error_callback=error_callback, cache=True),
+            'doesntexist', 1, False)
+        self.assertEqual(['doesntexist'], self.resolved)
+
+    def test_path_change_invalidates(self):
+        try_import('doesntexist', cache=True)
+        self.patch(sys, 'path', sys.path + ['/nonexistent'])
+        try_import('doesntexist', cache=True)
+        self.assertEqual(['doesntexist', 'doesntexist'], self.resolved)
+
+    def test_meta_path_change_invalidates(self):
+        try_import('doesntexist', cache=True)
+        self.patch(sys, 'meta_path', sys.meta_path + [NullFinder()])
+        try_import('doesntexist', cache=True)
+        self.assertEqual(['doesntexist', 'doesntexist'], self.resolved)
+
+    def test_clear(self):
+        try_import('doesntexist', cache=True)
+        clear_import_cache()
+        try_import('doesntexist', cache=True)
+        self.assertEqual(['doesntexist', 'doesntexist'], self.resolved)
+
+    def test_try_imports(self):
+        import os
+        for i in range(2):
+            result = try_imports(['doesntexist', 'os'], cache=True)
+            self.assertThat(result, Is(os))
+        self.assertEqual(['doesntexist', 'os'], self.resolved)
+
+
+class TestLazyImport(TestCase):
+
+    def setUp(self):
+        super(TestLazyImport, self).setUp()
+        self.resolved = []
+        original = _extras._resolve
+        def resolve(name, attempts=None):
+            self.resolved.append(name)
+            return original(name, attempts)
+        self.patch(_extras, '_resolve', resolve)
+
+    def test_deferred_until_used(self):
+        import os
+        proxy = try_import('os.path', lazy=True)
+        self.assertEqual([], self.resolved)
+        self.assertEqual(os.path.join('a', 'b'), proxy.join('a', 'b'))
+        self.assertIs(os.path.sep, proxy.sep)
+        self.assertEqual(['os.path'], self.resolved)
+
+    def test_call(self):
+        proxy = try_import('os.path.join', lazy=True)
+        self.assertEqual('a/b', proxy('a', 'b'))
+
+    def test_truth(self):
+        self.assertTrue(try_import('os', lazy=True))
+        self.assertFalse(try_import('doesntexist', lazy=True))
+
+    def test_alternative(self):
+        proxy = try_import('doesntexist', {'x': 1}, lazy=True)
+        self.assertEqual([1], list(proxy.values()))
+
+    def test_error_callback_when_resolved(self):
+        errors = []
+        proxy = try_import(
+            'doesntexist', error_callback=errors.append, lazy=True)
+        self.assertEqual([], errors)
+        self.assertFalse(proxy)
+        self.assertFalse(proxy)
+        self.assertEqual(1, len(errors))
+
+    def test_cache(self):
+        for i in range(2):
+            self.assertTrue(try_import('doesntexist.a', 1, cache=True,
+                                       lazy=True))
+        self.assertEqual(['doesntexist.a'], self.resolved)
+
+    def test_repr(self):
+        import os
+        proxy = try_import('os', lazy=True)
+        self.assertEqual("<lazy import of 'os'>", repr(proxy))
+        proxy.sep
+        self.assertEqual(repr(os), repr(proxy))
+
+
+class TestImportTrace(TestCase):
+
+    def setUp(self):
+        super(TestImportTrace, self).setUp()
+        clear_import_cache()
+        self.addCleanup(clear_import_cache)
+
+    def test_records(self):
+        with ImportTrace() as trace:
+            try_import('os.path.doesntexist.x')
+            try_import('os')
+        [missing, found] = trace.records
+        self.assertEqual('os.path.doesntexist.x', missing.name)
+        self.assertEqual(
+            (('os.path.doesntexist.x', False),
+             ('os.path.doesntexist', False),
+             ('os.path', True)),
+            missing.attempts)
+        self.assertFalse(missing.found)
+        self.assertFalse(missing.cached)
+        self.assertTrue(missing.seconds >= 0)
+        self.assertEqual((('os', True),), found.attempts)
+        self.assertTrue(found.found)
+
+    def test_try_imports(self):
+        with ImportTrace() as trace:
+            try_imports(['doesntexist', 'os'])
+        self.assertEqual(
+            [('doesntexist', False), ('os', True)],
+            [(r.name, r.found) for r in trace.records])
+
+    def test_cached(self):
+        with ImportTrace() as trace:
+            try_import('doesntexist', cache=True)
+            try_import('doesntexist', cache=True)
+        self.assertEqual(
+            [False, True], [r.cached for r in trace.records])
+        self.assertEqual((), trace.records[1].attempts)
+
+    def test_lazy_recorded_when_resolved(self):
+        with ImportTrace() as trace:
+            proxy = try_import('os', lazy=True)
+            self.assertEqual([], trace.records)
+            proxy.sep
+        self.assertEqual(['os'], [r.name for r in trace.records])
+
+    def test_stopped(self):
+        trace = ImportTrace()
+        trace.start()
+        try_import('os')
+        trace.stop()
+        try_import('os')
+        self.assertEqual(1, len(trace.records))
+
+    def test_summary(self):
+        with ImportTrace() as trace:
+            try_import('doesntexist')
+            try_import('doesntexist')
+            try_import('os')
+        lines = trace.summary().splitlines()
+        self.assertEqual(3, len(lines))
+        self.assertIn(
+            '2 x  missing  doesntexist (could not import doesntexist)',
+            trace.summary())
+        self.assertIn('1 x  found    os', trace.summary())
+        self.assertTrue(lines[-1].endswith('3 x  total'))
@@ -0,0 +1,72 @@
+from testtools import TestCase
+
+from .. import (
+    deep_freeze,
+    frozendict,
+    thaw,
+    )
+
+
+class TestDeepFreeze(TestCase):
+
+    def test_nested(self):
+        data = {'a': [1, {'b': set([2])}], 'c': (3, [4])}
+        frozen = deep_freeze(data)
+        self.assertEqual(
+            frozendict({
+                'a': (1, frozendict({'b': frozenset([2])})),
+                'c': (3, (4,)),
+            }),
+            frozen)
+        hash(frozen)
+
+    def test_scalars(self):
+        x = object()
+        self.assertIs(x, deep_freeze(x))
+        self.assertEqual(u'x', deep_freeze(u'x'))
+
+    def test_frozen_parts_reused(self):
+        t = (1, 'a', (2, 3))
+        self.assertIs(t, deep_freeze(t))
+        fs = frozenset([1, 2])
+        self.assertIs(fs, deep_freeze(fs))
+        fd = frozendict({'a': (1,)})
+        self.assertIs(fd, deep_freeze(fd))
+        self.assertEqual(frozendict({'a': (1,)}),
+                         deep_freeze(frozendict({'a': [1]})))
+
+    def test_shared_converted_once(self):
+        shared = {'x': [1, 2]}
+        frozen = deep_freeze([shared, shared, {'y': shared}])
+        self.assertIs(frozen[0], frozen[1])
+        self.assertIs(frozen[0], frozen[2]['y'])
+
+    def test_large(self):
+        data = dict(('k%d' % i, [i]) for i in range(1000))
+        frozen = deep_freeze(data)
+        self.assertEqual(1000, len(frozen))
+        self.assertEqual((500,), frozen['k500'])
+
+    def test_intern_keys(self):
+        docs = [{''.join(['na', 'me']): i} for i in range(3)]
+        frozen = deep_freeze(docs, intern_keys=True)
+        keys = [list(d.keys())[0] for d in frozen]
+        self.assertIs(keys[0], keys[1])
+        self.assertIs(keys[0], keys[2])
+
+
+class TestThaw(TestCase):
+
+    def test_round_trip(self):
+        data = {'a': [1, {'b': [2, 3]}], 'c': {'d': set([4])}}
+        self.assertEqual(data, thaw(deep_freeze(data)))
+
+    def test_keys_and_set_members_stay_frozen(self):
+        frozen = frozendict({(1, 2): frozenset([frozendict({'a': 1})])})
+        thawed = thaw(frozen)
+        self.assertEqual({(1, 2): set([frozendict({'a': 1})])}, thawed)
+
+    def test_shared_thawed_once(self):
+        shared = frozendict({'x': 1})
+        thawed = thaw((shared, shared))
+        self.assertIs(thawed[0], thawed[1])
@@ -1,8 +1,20 @@
 from testtools import TestCase
 
 
+from .. import frozendict
 from .._func import (
+    compose,
+    decompose,
+    dichotomy,
+    filter_dict,
+    filter_keys,
+    filter_values,
     identity,
+    ilist_subtract,
+    list_subtract,
+    map_values,
+    pipeline,
+    wrap_result,
 )
 
 
@@ -11,3 +23,232 @@ class TestIdentity(TestCase):
     def test_identity(self):
         x = object()
         self.assertIs(x, identity(x))
+
+
+class TestCompose(TestCase):
+
+    def test_no_functions(self):
+        self.assertRaises(ValueError, compose)
+
+    def test_order(self):
+        inc = lambda x: x + 1
+        dbl = lambda x: x * 2
+        for n in range(1, 6):
+            fs = [inc, dbl] * 3
+            expected = 5
+            for f in reversed(fs[:n]):
+                expected = f(expected)
+            self.assertEqual(expected, compose(*fs[:n])(5))
+
+    def test_args(self):
+        self.assertEqual(
+            '3', compose(str, lambda a, b=0: a + b)(1, b=2))
+
+    def test_decompose(self):
+        f = lambda x: x
+        g = lambda x: x
+        h = lambda x: x
+        self.assertEqual((f,), decompose(f))
+        self.assertEqual((len,), decompose(len))
+        composed = compose(f, compose(g, h), compose(len))
+        self.assertEqual((f, g, h, len), decompose(composed))
+
+    def test_wraps_does_not_fool_decompose(self):
+        inner = compose(str, abs)
+        wrapped = wrap_result(str)(inner)
+        self.assertEqual((str, str, abs), decompose(wrapped))
+        self.assertEqual('3', wrapped(-3))
+
+
+def slow_list_subtract(a, b):
+    a_only = list(a)
+    for x in b:
+        if x in a_only:
+            a_only.remove(x)
+    return a_only
+
+
+class TestListSubtract(TestCase):
+
+    def test_multiset(self):
+        self.assertEqual([1, 3], list_subtract([1, 2, 1, 3], [1, 2]))
+        self.assertEqual([], list_subtract([1, 1], [1, 1, 1]))
+        self.assertEqual([1, 2], list_subtract([1, 2], []))
+
+    def test_removes_first_occurrence(self):
+        # 1 and 1.0 are equal, so it's the first of them that goes.
+        result = list_subtract([1, 1.0, 2], [1.0])
+        self.assertEqual([1.0, 2], result)
+        self.assertIs(float, type(result[0]))
+
+    def test_matches_quadratic_version(self):
+        import random
+        rng = random.Random(0)
+        for i in range(50):
+            a = [rng.randrange(10) for j in range(rng.randrange(30))]
+            b = [rng.randrange(10) for j in range(rng.randrange(30))]
+            self.assertEqual(slow_list_subtract(a, b), list_subtract(a, b))
+
+    def test_unhashable(self):
+        a = [[1], 2, [1], {3: 4}, set([5])]
+        b = [[1], {3: 4}, frozenset([5]), 2]
+        self.assertEqual(slow_list_subtract(a, b), list_subtract(a, b))
+        self.assertEqual([[1]], list_subtract(a, b))
+
+    def test_lazy(self):
+        def a():
+            yield 1
+            yield 2
+            raise AssertionError("read too far")
+        it = ilist_subtract(a(), [1])
+        self.assertEqual(2, next(it))
+
+
+class TestDichotomy(TestCase):
+
+    def test_split(self):
+        falses, trues = dichotomy(lambda x: x % 2, range(10))
+        self.assertEqual([1, 3, 5, 7, 9], list(trues))
+        self.assertEqual([0, 2, 4, 6, 8], list(falses))
+
+    def test_predicate_called_once(self):
+        calls = []
+        def p(x):
+            calls.append(x)
+            return x > 2
+        falses, trues = dichotomy(p, range(6))
+        self.assertEqual([3, 4, 5], list(trues))
+        self.assertEqual([0, 1, 2], list(falses))
+        self.assertEqual(range(6), calls)
+
+    def test_one_shot_iterator(self):
+        falses, trues = dichotomy(lambda x: x < 3, iter(range(6)))
+        self.assertEqual([0, 1, 2], list(trues))
+        self.assertEqual([3, 4, 5], list(falses))
+
+    def test_lockstep_is_lazy(self):
+        consumed = []
+        def xs():
+            for i in range(100):
+                consumed.append(i)
+                yield i
+        falses, trues = dichotomy(lambda x: x % 2, xs())
+        self.assertEqual((0, 1), (next(falses), next(trues)))
+        self.assertEqual((2, 3), (next(falses), next(trues)))
+        self.assertEqual(range(4), consumed)
+
+    def test_chunked(self):
+        calls = []
+        def p(chunk):
+            calls.append(list(chunk))
+            return [x >= 5 for x in chunk]
+        falses, trues = dichotomy(p, range(10), chunksize=4)
+        self.assertEqual([5, 6, 7, 8, 9], list(trues))
+        self.assertEqual([0, 1, 2, 3, 4], list(falses))
+        self.assertEqual([[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]], calls)
+
+    def test_chunked_wrong_length(self):
+        falses, trues = dichotomy(lambda chunk: [True], range(3), chunksize=2)
+        self.assertRaises(ValueError, list, trues)
+
+
+class TestFrozenDictHelpers(TestCase):
+
+    def setUp(self):
+        super(TestFrozenDictHelpers, self).setUp()
+        self.d = frozendict(zip(range(100), range(100)))
+
+    def test_map_values(self):
+        result = map_values(lambda v: v * 2, self.d)
+        self.assertIsInstance(result, frozendict)
+        self.assertEqual(result, frozendict((i, i * 2) for i in range(100)))
+
+    def test_map_values_identity_shares(self):
+        self.assertIs(self.d, map_values(identity, self.d))
+        result = map_values(lambda v: 'x' if v == 0 else v, self.d)
+        self.assertEqual(result[0], 'x')
+        self.assertIs(self.d.root.array[1], result.root.array[1])
+
+    def test_filter_values(self):
+        result = filter_values(lambda v: v % 3 == 0, self.d)
+        self.assertIsInstance(result, frozendict)
+        self.assertEqual(result, frozendict((i, i) for i in range(0, 100, 3)))
+        self.assertEqual(len(result), 34)
+
+    def test_filter_keys(self):
+        result = filter_keys(lambda k: k < 5, self.d)
+        self.assertEqual(result, frozendict((i, i) for i in range(5)))
+        self.assertIs(self.d, filter_keys(lambda k: True, self.d))
+        self.assertEqual(frozendict(), filter_keys(lambda k: False, self.d))
+
+    def test_filter_dict(self):
+        result = filter_dict(lambda (k, v): k + v == 10, self.d)
+        self.assertEqual(result, frozendict({5: 5}))
+
+    def test_plain_dicts_unchanged(self):
+        d = dict(zip(range(10), range(10)))
+        self.assertEqual(
+            dict((k, v + 1) for k, v in d.items()),
+            map_values(lambda v: v + 1, d))
+        self.assertEqual({1: 1}, filter_keys(lambda k: k == 1, d))
+
+
+class TestPipeline(TestCase):
+
+    def test_no_stages(self):
+        d = {1: 2, 3: 4}
+        self.assertEqual(d, pipeline(d).to_dict())
+        self.assertEqual(d, pipeline(d.items()).to_dict())
+
+    def test_matches_helpers(self):
+        d = dict(zip(range(20), range(20)))
+        result = (pipeline(d)
+                  .map_values(lambda v: v * 3)
+                  .filter_values(lambda v: v % 2 == 0)
+                  .map_keys(str)
+                  .filter_keys(lambda k: len(k) == 1)
+                  .to_dict())
+        self.assertEqual(
+            filter_keys(lambda k: len(k) == 1,
+                        dict((str(k), v) for k, v in filter_values(
+                            lambda v: v % 2 == 0,
+                            map_values(lambda v: v * 3, d)).items())),
+            result)
+
+    def test_item_stages(self):
+        d = {1: 'a', 2: 'b'}
+        result = (pipeline(d)
+                  .map_dict(lambda (k, v): (v, k))
+                  .filter_dict(lambda (k, v): v > 1)
+                  .to_dict())
+        self.assertEqual({'b': 2}, result)
+
+    def test_single_pass(self):
+        calls = []
+        def f(v):
+            calls.append(('f', v))
+            return v
+        def p(k):
+            calls.append(('p', k))
+            return True
+        list(pipeline([(1, 1), (2, 2)]).map_values(f).filter_keys(p))
+        self.assertEqual([('f', 1), ('p', 1), ('f', 2), ('p', 2)], calls)
+
+    def test_lazy(self):
+        calls = []
+        p = pipeline({1: 1}).map_values(calls.append)
+        self.assertEqual([], calls)
+        it = p.items()
+        self.assertEqual([], calls)
+        self.assertEqual([(1, None)], list(it))
+        self.assertEqual([1], calls)
+
+    def test_stages_are_immutable(self):
+        base = pipeline({1: 1, 2: 2})
+        base.filter_keys(lambda k: k == 1)
+        self.assertEqual({1: 1, 2: 2}, base.to_dict())
+
+    def test_to_frozendict(self):
+        d = frozendict({1: 1, 2: 2})
+        self.assertEqual(frozendict({1: 2, 2: 4}),
+                         pipeline(d).map_values(lambda v: v * 2).to_frozendict())
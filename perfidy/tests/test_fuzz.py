@@ -0,0 +1,350 @@
+from bisect import bisect_left
+from collections import defaultdict
+import gc
+import os
+import random
+from timeit import default_timer
+
+from .. import frozendict
+from .. import _dict
+
+from testtools import TestCase
+
+from .test_mapping import (
+    checkSizes,
+    HashTester,
+    )
+
+
+# Set these to replay a failure, or to fuzz for longer.
+SEED = int(os.environ.get('PERFIDY_FUZZ_SEED', 1729))
+STEPS = int(os.environ.get('PERFIDY_FUZZ_STEPS', 6000))
+
+# The latency each operation must stay within at the given percentile, as
+# (percentile, seconds).  These are far above the usual latencies, so that
+# only a cliff, such as a lookup that has become linear, goes over them.
+BUDGETS = {
+    'with_pair': (99, 2e-3),
+    'without': (99, 2e-3),
+    'get': (99, 1e-3),
+    'merge': (99, 1e-2),
+    }
+
+# Budgets are only applied to operations timed at least this many times at a
+# size, since with fewer a high percentile is just the slowest one, and a
+# single stall of the machine would go over budget.
+MIN_SAMPLES = 100
+
+# Keys with hashes that collide, and that share their low bits, as well as
+# ordinary ones.
+KEYS = (range(3000)
+        + [i * 32 ** 2 for i in range(200)]
+        + [HashTester(i, i % 4 + 1) for i in range(60)])
+
+
+class LatencyHistogram(object):
+    """
+    Counts of latencies, in buckets that double in width.
+    """
+
+    def __init__(self, smallest=1e-6, buckets=24):
+        """
+        @param smallest: the upper bound of the first bucket, in seconds.
+        @param buckets: how many buckets there are.  Latencies above the
+            last bucket's bound are counted in the last bucket.
+        """
+        self.bounds = [smallest * 2 ** i for i in range(buckets)]
+        self.counts = [0] * buckets
+        self.total = 0
+
+
+    def __len__(self):
+        return self.total
+
+
+    def record(self, seconds):
+        i = min(bisect_left(self.bounds, seconds), len(self.counts) - 1)
+        self.counts[i] += 1
+        self.total += 1
+
+
+    def percentile(self, p):
+        """
+        Return the upper bound of the bucket holding the C{p}th percentile
+        latency, or 0 if none have been recorded.
+        """
+        if not self.total:
+            return 0
+        rank = p / 100.0 * self.total
+        seen = 0
+        for bound, count in zip(self.bounds, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return self.bounds[-1]
+
+
+
+def sizeClass(n):
+    """
+    Return the size class of a map with C{n} pairs: the smallest power of 8,
+    from 8 up, that is at least C{n}.
+    """
+    limit = 8
+    while n > limit:
+        limit *= 8
+    return limit
+
+
+
+class DifferentialFuzzer(object):
+    """
+    Drive a L{frozendict} and a C{dict} through the same random operations,
+    checking they agree and timing each operation on the frozendict.
+
+    The map grows and shrinks in turn, so that nodes are promoted to array
+    nodes and packed back into bitmap nodes, and the frozendict moves
+    between its inline and trie representations.
+    """
+
+    def __init__(self, test, seed):
+        """
+        @param test: the L{TestCase} to make the checks with.
+        @param seed: the seed for the random choice of operations.
+        """
+        self.test = test
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.keys = KEYS
+        self.fd = frozendict()
+        self.reference = {}
+        self.steps = 0
+        # (operation, size class) -> LatencyHistogram
+        self.histograms = defaultdict(LatencyHistogram)
+        # Earlier versions, with their contents then, to check that later
+        # changes haven't altered them.
+        self.snapshots = []
+
+
+    def run(self, steps):
+        """
+        Make C{steps} random operations, checking the result of each.
+        """
+        rng = self.rng
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            for i in xrange(steps):
+                # Steer the size up to 800 pairs and back to none every
+                # 3000 steps.
+                target = 800 - abs(self.steps % 3000 - 1500) * 8 // 15
+                if len(self.fd) < target:
+                    adding, merging = 0.75, 0.05
+                else:
+                    adding, merging = 0.32, 0.005
+                r = rng.random()
+                if r < 0.3:
+                    self._get(rng.choice(self.keys))
+                elif r < adding:
+                    self._withPair(rng.choice(self.keys), rng.randint(0, 9))
+                elif r < 1 - merging:
+                    self._without(self._existingKey())
+                else:
+                    self._merge([(rng.choice(self.keys), rng.randint(0, 9))
+                                 for j in range(rng.randint(0, 20))])
+                self.steps += 1
+                if self.steps % 500 == 0:
+                    self.check()
+                    self.snapshots.append((self.fd, dict(self.reference)))
+        finally:
+            if enabled:
+                gc.enable()
+        self.check()
+
+
+    def _existingKey(self):
+        if self.reference and self.rng.random() < 0.9:
+            return self.fd.nth_item(self.rng.randrange(len(self.fd)))[0]
+        return self.rng.choice(self.keys)
+
+
+    def _time(self, op, f, *args):
+        size = len(self.fd)
+        start = default_timer()
+        result = f(*args)
+        self.histograms[op, sizeClass(size)].record(default_timer() - start)
+        return result
+
+
+    def _where(self):
+        return 'seed %d, step %d' % (self.seed, self.steps)
+
+
+    def _get(self, k):
+        result = self._time('get', self.fd.get, k)
+        self.test.assertEqual(self.reference.get(k), result, self._where())
+
+
+    def _withPair(self, k, v):
+        self.fd = self._time('with_pair', self.fd.with_pair, k, v)
+        self.reference[k] = v
+        self.test.assertEqual(len(self.reference), len(self.fd), self._where())
+
+
+    def _without(self, k):
+        self.fd = self._time('without', self.fd.without, k)
+        self.reference.pop(k, None)
+        self.test.assertEqual(len(self.reference), len(self.fd), self._where())
+
+
+    def _merge(self, pairs):
+        self.fd = self._time('merge', self.fd.merge, pairs)
+        self.reference.update(pairs)
+        self.test.assertEqual(len(self.reference), len(self.fd), self._where())
+
+
+    def check(self):
+        """
+        Check the frozendict has the same pairs as the reference, that its
+        trie's sizes are right, and that earlier versions are unchanged.
+        """
+        self.test.assertEqual(self.reference, self.fd.to_dict(), self._where())
+        if self.fd.root is not None:
+            checkSizes(self.fd.root)
+        for old, contents in self.snapshots:
+            self.test.assertEqual(contents, old.to_dict(), self._where())
+
+
+    def overBudget(self, budgets, min_samples=MIN_SAMPLES):
+        """
+        Return a list of C{(operation, size class, observed, budget)} for
+        each operation and size whose latency at the budget's percentile is
+        over budget.
+
+        @param min_samples: ignore operations and sizes with fewer than this
+            many latencies recorded.
+        """
+        over = []
+        for (op, size), histogram in sorted(self.histograms.items()):
+            if len(histogram) < min_samples:
+                continue
+            p, budget = budgets[op]
+            observed = histogram.percentile(p)
+            if observed > budget:
+                over.append((op, size, observed, budget))
+        return over
+
+
+    def report(self):
+        """
+        Return a table of the 50th, 99th and 100th percentile latencies, in
+        microseconds, for each operation and size class.
+        """
+        lines = ['seed %d, %d steps' % (self.seed, self.steps),
+                 '%-10s %6s %7s %8s %8s %8s' % (
+                     'operation', 'size', 'count', 'p50', 'p99', 'max')]
+        for (op, size), histogram in sorted(self.histograms.items()):
+            lines.append('%-10s %6d %7d %8.1f %8.1f %8.1f' % (
+                (op, size, len(histogram))
+                + tuple(histogram.percentile(p) * 1e6
+                        for p in (50, 99, 100))))
+        return '\n'.join(lines)
+
+
+
+class LatencyHistogramTests(TestCase):
+    """
+    Tests for L{LatencyHistogram}.
+    """
+
+    def test_percentile(self):
+        histogram = LatencyHistogram(smallest=1.0, buckets=4)
+        self.assertEqual(0, histogram.percentile(50))
+        for seconds in [0.5] * 90 + [3] * 9 + [100]:
+            histogram.record(seconds)
+        self.assertEqual(100, len(histogram))
+        self.assertEqual(1.0, histogram.percentile(50))
+        self.assertEqual(1.0, histogram.percentile(90))
+        self.assertEqual(4.0, histogram.percentile(99))
+        self.assertEqual(8.0, histogram.percentile(100))
+
+
+    def test_sizeClass(self):
+        self.assertEqual([8, 8, 64, 64, 512],
+                         map(sizeClass, [0, 8, 9, 64, 65]))
+
+
+
+class DifferentialFuzzTests(TestCase):
+    """
+    Random sequences of operations on a L{frozendict}, checked against a
+    C{dict}.
+    """
+
+    def test_agreesWithDict(self):
+        """
+        The frozendict and the dict agree throughout, including for
+        frozendicts that never stay inline.
+        """
+        for threshold in (0, _dict._INLINE_THRESHOLD):
+            self.patch(_dict, '_INLINE_THRESHOLD', threshold)
+            fuzzer = DifferentialFuzzer(self, SEED)
+            fuzzer.run(STEPS)
+            self.assertNotEqual(0, len(fuzzer.snapshots))
+
+
+    def test_wrongResultsFail(self):
+        """
+        The fuzzer fails when the frozendict gives a wrong answer.
+        """
+        self.patch(frozendict, 'get', lambda self, k, default=None: 'WRONG')
+        fuzzer = DifferentialFuzzer(self, SEED)
+        self.assertRaises(AssertionError, fuzzer.run, 300)
+
+
+    def test_withinBudget(self):
+        """
+        Each operation's latency stays within its budget at every size.
+        """
+        fuzzer = DifferentialFuzzer(self, SEED)
+        fuzzer.run(STEPS)
+        self.assertEqual(
+            [], fuzzer.overBudget(BUDGETS), '\n' + fuzzer.report())
+
+
+    def test_overBudgetReported(self):
+        """
+        Latencies over a budget are reported.
+        """
+        fuzzer = DifferentialFuzzer(self, SEED)
+        fuzzer.run(200)
+        budgets = dict((op, (100, 0)) for op in BUDGETS)
+        self.assertEqual(len(fuzzer.histograms),
+                         len(fuzzer.overBudget(budgets, min_samples=1)))
+
+
+    def test_fewSamplesIgnored(self):
+        """
+        Operations timed too few times at a size aren't held to a budget.
+        """
+        fuzzer = DifferentialFuzzer(self, SEED)
+        for i in range(MIN_SAMPLES - 1):
+            fuzzer.histograms['get', 8].record(1e-6)
+        fuzzer.histograms['with_pair', 8].record(1.0)
+        for i in range(MIN_SAMPLES):
+            fuzzer.histograms['without', 8].record(1.0)
+        observed = fuzzer.histograms['without', 8].percentile(99)
+        self.assertEqual([('without', 8, observed, 2e-3)],
+                         fuzzer.overBudget(BUDGETS))
+
+
+    def test_reproducible(self):
+        """
+        The same seed gives the same sequence of operations.
+        """
+        first = DifferentialFuzzer(self, SEED + 1)
+        first.run(1000)
+        second = DifferentialFuzzer(self, SEED + 1)
+        second.run(1000)
+        self.assertEqual(first.reference, second.reference)
+        self.assertEqual(first.fd, second.fd)
@@ -0,0 +1,227 @@
+import gc
+import random
+import weakref
+
+from .. import (
+    frozendict,
+    VersionHistory,
+    )
+from .._history import _diff
+
+from testtools import TestCase
+
+
+class Collider(object):
+    """
+    A key whose hash is chosen, to force collisions.
+    """
+
+    def __init__(self, name, hashval):
+        self.name = name
+        self.hashval = hashval
+
+
+    def __hash__(self):
+        return self.hashval
+
+
+    def __eq__(self, other):
+        return isinstance(other, Collider) and self.name == other.name
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+    def __repr__(self):
+        return 'Collider(%r)' % (self.name,)
+
+
+
+class Watched(object):
+    """
+    A value that records when it is compared.
+    """
+
+    comparisons = 0
+
+    def __eq__(self, other):
+        Watched.comparisons += 1
+        return self is other
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+
+def churn(rng, keys, steps, start=frozendict()):
+    """
+    Return a list of C{steps} frozendicts, each made from the one before by
+    adding, changing and removing a few random keys.
+    """
+    versions = [start]
+    d = start
+    for i in range(steps):
+        for j in range(rng.randint(0, 5)):
+            d = d.with_pair(rng.choice(keys), rng.randint(0, 3))
+        for j in range(rng.randint(0, 3)):
+            d = d.without(rng.choice(keys))
+        versions.append(d)
+    return versions
+
+
+
+class DiffTests(TestCase):
+    """
+    Tests for comparing frozendicts to find the changes between them.
+    """
+
+    def assertDiff(self, old, new):
+        updates, deletions = _diff(old, new)
+        self.assertEqual(len(deletions), len(set(deletions)))
+        rebuilt = old
+        for k in deletions:
+            rebuilt = rebuilt.without(k)
+        self.assertEqual(new, rebuilt.merge(updates))
+        for k, v in updates:
+            self.assertFalse(k in old and old[k] == v)
+        return updates, deletions
+
+
+    def test_random(self):
+        """
+        The changes found between any two versions turn one into the
+        other, including across hash collisions and changes of node type.
+        """
+        rng = random.Random(3)
+        keys = range(200) + [Collider(i, i % 5) for i in range(20)]
+        versions = churn(rng, keys, 300)
+        for i in range(0, len(versions) - 1):
+            self.assertDiff(versions[i], versions[i + 1])
+        for i in range(50):
+            self.assertDiff(rng.choice(versions), rng.choice(versions))
+
+
+    def test_exact(self):
+        """
+        Only real changes are reported.
+        """
+        d = frozendict((i, i) for i in range(100))
+        new = d.with_pair(3, 'x').with_pair(100, 100).without(7)
+        updates, deletions = self.assertDiff(d, new)
+        self.assertEqual([(3, 'x'), (100, 100)], sorted(updates))
+        self.assertEqual([7], deletions)
+        self.assertEqual(([], []), _diff(d, d))
+
+
+    def test_sharedSubtreesSkipped(self):
+        """
+        Values in parts of the tries the two versions share are not
+        compared.
+        """
+        d = frozendict((i, Watched()) for i in range(1000))
+        new = d.with_pair(5, Watched())
+        Watched.comparisons = 0
+        self.assertEqual(([(5, new[5])], []), _diff(d, new))
+        self.assertTrue(Watched.comparisons <= 1, Watched.comparisons)
+
+
+
+class VersionHistoryTests(TestCase):
+    """
+    Tests for L{VersionHistory}.
+    """
+
+    def test_initial(self):
+        """
+        A new history has an empty version 0.
+        """
+        history = VersionHistory()
+        self.assertEqual(0, history.version)
+        self.assertEqual(1, len(history))
+        self.assertEqual(frozendict(), history.at(0))
+        self.assertEqual(frozendict(), history.latest())
+
+
+    def test_append(self):
+        """
+        Each snapshot appended becomes the next version.
+        """
+        history = VersionHistory({'a': 1})
+        self.assertEqual(1, history.append({'a': 2}))
+        self.assertEqual(frozendict({'a': 1}), history.at(0))
+        self.assertEqual(frozendict({'a': 2}), history.at(1))
+        self.assertEqual(frozendict({'a': 2}), history.latest())
+        self.assertRaises(KeyError, history.at, 2)
+        self.assertRaises(KeyError, history.at, -1)
+
+
+    def test_recentKept(self):
+        """
+        Recent versions are returned as they were appended.
+        """
+        history = VersionHistory(keep_recent=3)
+        versions = churn(random.Random(1), range(50), 10)
+        for v in versions[1:]:
+            history.append(v)
+        for i in range(8, 11):
+            self.assertIs(versions[i], history.at(i))
+
+
+    def test_compactedVersions(self):
+        """
+        Every version can still be read after it has been compacted, in
+        any order.
+        """
+        rng = random.Random(5)
+        keys = range(300) + [Collider(i, i % 7) for i in range(30)]
+        versions = churn(rng, keys, 400)
+        history = VersionHistory(
+            versions[0], keep_recent=10, checkpoint_interval=16)
+        for v in versions[1:]:
+            history.append(v)
+        self.assertEqual(400, history.version)
+        for i in range(len(versions)):
+            self.assertEqual(versions[i], history.at(i))
+        for i in [rng.randrange(len(versions)) for j in range(100)]:
+            self.assertEqual(versions[i], history.at(i))
+
+
+    def test_changes(self):
+        """
+        changes() gives what each version added, changed and removed.
+        """
+        history = VersionHistory({'a': 1, 'b': 2}, keep_recent=1)
+        history.append({'a': 1, 'b': 3, 'c': 4})
+        history.append({'c': 4})
+        self.assertEqual(
+            [('b', 3), ('c', 4)], sorted(history.changes(1)[0]))
+        self.assertEqual([], history.changes(1)[1])
+        self.assertEqual(([], ['a', 'b']),
+                         (history.changes(2)[0], sorted(history.changes(2)[1])))
+        self.assertRaises(KeyError, history.changes, 0)
+        self.assertRaises(KeyError, history.changes, 3)
+
+
+    def test_oldVersionsReleased(self):
+        """
+        Once compacted, versions that aren't checkpoints are not kept.
+        """
+        history = VersionHistory(keep_recent=2, checkpoint_interval=4)
+        d = frozendict((i, i) for i in range(100))
+        refs = []
+        for i in range(10):
+            d = d.with_pair(i, -i)
+            refs.append(weakref.ref(d))
+            history.append(d)
+        del d
+        gc.collect()
+        # Versions 4 and 8 are checkpoints, and 9 and 10 are recent.
+        alive = [i + 1 for i, ref in enumerate(refs) if ref() is not None]
+        self.assertEqual([4, 8, 9, 10], alive)
+
+
+    def test_badArguments(self):
+        self.assertRaises(ValueError, VersionHistory, keep_recent=0)
+        self.assertRaises(ValueError, VersionHistory, checkpoint_interval=0)
@@ -0,0 +1,98 @@
+from StringIO import StringIO
+import json
+
+from testtools import TestCase
+
+from .. import (
+    deep_freeze,
+    frozendict,
+    iter_json_array,
+    load_json,
+    loads_json,
+    )
+
+
+DOCUMENT = {
+    'name': 'perfidy',
+    'tags': ['a', 'b', ['c', {'d': [1, 2]}]],
+    'nested': {'x': 1.5, 'y': None, 'z': True},
+    'many': dict(('k%d' % i, i) for i in range(50)),
+}
+
+
+class TestLoadJson(TestCase):
+
+    def test_loads(self):
+        result = loads_json(json.dumps(DOCUMENT))
+        self.assertEqual(deep_freeze(DOCUMENT), result)
+        self.assertIsInstance(result['nested'], frozendict)
+        self.assertIsInstance(result['tags'][2], tuple)
+
+    def test_load(self):
+        self.assertEqual(
+            deep_freeze(DOCUMENT), load_json(StringIO(json.dumps(DOCUMENT))))
+
+    def test_top_level_array(self):
+        self.assertEqual(((1, 2), frozendict({'a': ()})),
+                         loads_json('[[1, 2], {"a": []}]'))
+
+    def test_duplicate_keys(self):
+        self.assertEqual(frozendict({'a': 2}), loads_json('{"a": 1, "a": 2}'))
+        pairs = ', '.join('"k%d": %d' % (i % 30, i) for i in range(100))
+        self.assertEqual(
+            frozendict(dict(('k%d' % (i % 30), i) for i in range(100))),
+            loads_json('{%s}' % (pairs,)))
+
+    def test_kwargs(self):
+        self.assertEqual(
+            frozendict({'a': '1.5'}), loads_json('{"a": 1.5}', parse_float=str))
+
+
+class TestIterJsonArray(TestCase):
+
+    def items(self, text, chunksize=3):
+        return list(iter_json_array(StringIO(text), chunksize=chunksize))
+
+    def test_items(self):
+        items = [1, 'two', [3], {'four': [4]}, None, 123456789, 1.25, DOCUMENT]
+        text = json.dumps(items)
+        expected = [deep_freeze(x) for x in items]
+        for chunksize in (1, 2, 7, 1000):
+            self.assertEqual(expected, self.items(text, chunksize))
+
+    def test_numbersSplitAcrossChunks(self):
+        """
+        Numbers are decoded whole wherever a chunk ends inside them,
+        including just after a decimal point or exponent marker.
+        """
+        text = '[1.25, -2.5e-3, 1E+10, 7, 1.5e3, 0.5]'
+        for chunksize in range(1, len(text) + 1):
+            self.assertEqual(json.loads(text), self.items(text, chunksize))
+
+    def test_manyFloats(self):
+        """
+        Floats cut off at the default chunk size are decoded whole.
+        """
+        text = ' ' * 4 + json.dumps([i + 0.25 for i in range(20000)])
+        self.assertEqual(json.loads(text),
+                         list(iter_json_array(StringIO(text))))
+
+    def test_whitespace(self):
+        self.assertEqual([1, 2], self.items(' \n[ 1 ,\n 2 ] \n'))
+
+    def test_empty(self):
+        self.assertEqual([], self.items('[]'))
+        self.assertEqual([], self.items('  [  ]  '))
+
+    def test_lazy(self):
+        it = iter_json_array(StringIO('[1, 2, oops]'), chunksize=1)
+        self.assertEqual(1, next(it))
+        self.assertEqual(2, next(it))
+        self.assertRaises(ValueError, next, it)
+
+    def test_errors(self):
+        self.assertRaises(ValueError, self.items, '{"a": 1}')
+        self.assertRaises(ValueError, self.items, '[1 2]')
+        self.assertRaises(ValueError, self.items, '[1, 2')
+        self.assertRaises(ValueError, self.items, '[1] x')
+        self.assertRaises(ValueError, self.items, '')
@@ -1,11 +1,19 @@
 import ast
+from collections import Mapping
+from decimal import Decimal
+import gc
 import itertools
+import operator
+import random
 
 from .. import frozendict
+from .. import _dict
 from .._hamt import (
+    _absent,
     bitcount,
     bitpos,
     index,
+    NodeTable,
 )
 
 from testtools import TestCase
@@ -27,6 +35,66 @@ class HashTester(object):
 
 
 
+class EqualTo(object):
+    """
+    A key equal to any other with the same name, whatever their hashes.
+    """
+
+    def __init__(self, name, hashval):
+        self.name = name
+        self.hashval = hashval
+
+
+    def __hash__(self):
+        return self.hashval
+
+
+    def __eq__(self, other):
+        return isinstance(other, EqualTo) and self.name == other.name
+
+
+    def __ne__(self, other):
+        return not self == other
+
+
+
+def nodeShape(node):
+    """
+    Return a nested structure describing a trie node, for comparing shapes.
+    """
+    if node is None:
+        return None
+    array = [nodeShape(x) if getattr(x, 'kind', None) else x
+             for x in node.array]
+    return (node.kind, getattr(node, 'bitmap', None),
+            getattr(node, 'count', None), array)
+
+
+
+def checkSizes(node):
+    """
+    Check that each node in a trie records the number of pairs beneath it,
+    and return that number.
+    """
+    if node.kind == 'HashCollisionNode':
+        size = len(node.array) // 2
+    elif node.kind == 'ArrayNode':
+        size = sum(checkSizes(child) for child in node.array
+                   if child is not _absent)
+    else:
+        size = 0
+        for i in range(0, len(node.array), 2):
+            if node.array[i] is _absent:
+                size += checkSizes(node.array[i + 1])
+            else:
+                size += 1
+    if node.size != size:
+        raise AssertionError(
+            "%s records %d pairs but holds %d" % (node.kind, node.size, size))
+    return size
+
+
+
 class FrozenDictTests(TestCase):
     """
     Tests for L{frozendict}.
@@ -111,6 +179,7 @@ class FrozenDictTests(TestCase):
         Furthermore, only one bit is set in the bitmap, it's in the rightmost
         region, and is correctly positioned for the key's hash.
         """
+        self.patch(_dict, '_INLINE_THRESHOLD', 0)
         k, v = ('stuff', 42)
         d = frozendict()
         d2 = d.with_pair(k, v)
@@ -122,6 +191,93 @@ class FrozenDictTests(TestCase):
         self.assertEqual(d2.root.array[2*i+1], v)
 
 
+    def test_smallMapsAreInline(self):
+        """
+        Maps with no more than C{_INLINE_THRESHOLD} entries keep their pairs
+        in parallel tuples instead of a trie.
+        """
+        d = frozendict()
+        for i in range(_dict._INLINE_THRESHOLD):
+            d = d.with_pair(i, str(i))
+        self.assertEqual(d.root, None)
+        self.assertEqual(d._keys, tuple(range(_dict._INLINE_THRESHOLD)))
+        self.assertEqual(d._values, tuple(map(str, d._keys)))
+        self.assertEqual(d[3], '3')
+        self.assertEqual(d.get('missing', 'x'), 'x')
+        self.assertTrue(3 in d)
+        self.assertFalse('missing' in d)
+
+
+    def test_inlineUpgradesToTrie(self):
+        """
+        Adding a pair to a full inline map converts it into a trie holding
+        every pair.
+        """
+        n = _dict._INLINE_THRESHOLD + 1
+        d = frozendict(zip(range(n), range(n)))
+        self.assertEqual(d.root.kind, 'BitmapIndexedNode')
+        self.assertEqual(len(d), n)
+        self.assertEqual(set(d.items()), set(zip(range(n), range(n))))
+        self.assertEqual(d.without(0).root.kind, 'BitmapIndexedNode')
+
+
+    def test_inlineReplaceAndWithout(self):
+        """
+        Inline maps support replacing values and removing keys without
+        disturbing the other pairs.
+        """
+        d = frozendict([('a', 1), ('b', 2), ('c', 3)])
+        d2 = d.with_pair('b', 20)
+        self.assertEqual(list(d2.items()), [('a', 1), ('b', 20), ('c', 3)])
+        self.assertEqual(d['b'], 2)
+        d3 = d.without('b')
+        self.assertEqual(list(d3.items()), [('a', 1), ('c', 3)])
+        self.assertEqual(len(d3), 2)
+        self.assertTrue(d.without('z') is d)
+        self.assertEqual(d3.without('a').without('c'), frozendict())
+
+
+    def test_inlineUnhashableKeys(self):
+        """
+        Inline maps reject unhashable keys, as tries and dicts do.
+        """
+        d = frozendict({'a': 1})
+        self.assertRaises(TypeError, d.with_pair, [1], 2)
+        self.assertRaises(TypeError, d.without, [1])
+        self.assertRaises(TypeError, d.get, [1])
+        self.assertRaises(TypeError, d.__contains__, [1])
+        self.assertRaises(TypeError, frozendict, [([1], 2)])
+
+
+    def test_inlineMatchesOnHash(self):
+        """
+        A key equal to a stored key but with a different hash is not found,
+        whether the map is inline or a trie.
+        """
+        for n in (1, _dict._INLINE_THRESHOLD + 1):
+            d = frozendict([(EqualTo(0, 1), 'stored')]
+                           + [(i, i) for i in range(1, n)])
+            self.assertEqual('stored', d.get(EqualTo(0, 1)))
+            self.assertEqual(None, d.get(EqualTo(0, 2)))
+            self.assertFalse(EqualTo(0, 2) in d)
+            self.assertEqual(n + 1, len(d.with_pair(EqualTo(0, 2), 'new')))
+
+
+    def test_inlineEqualsTrie(self):
+        """
+        An inline map and a trie map with the same pairs are equal and hash
+        the same.
+        """
+        pairs = [(HashTester(i), i) for i in range(3)]
+        inline = frozendict(pairs)
+        self.patch(_dict, '_INLINE_THRESHOLD', 0)
+        trie = frozendict(pairs)
+        self.assertEqual(inline.root, None)
+        self.assertEqual(trie.root.kind, 'BitmapIndexedNode')
+        self.assertEqual(inline, trie)
+        self.assertEqual(hash(inline), hash(trie))
+
+
     def test_nearlyFullNode(self):
         """
         Up to 15 entries can go into a single bitmap-indexed node.
@@ -251,6 +407,7 @@ class FrozenDictTests(TestCase):
         """
         Keys that collide within a node's 5-bit window result in the creation of a new BitmapIndexedNode.
         """
+        self.patch(_dict, '_INLINE_THRESHOLD', 0)
         k1, v1 = HashTester("stuff", 0x17), 42
         k2, v2 = HashTester("morestuff", 0x37), 43
         d = frozendict().with_pair(k1, v1).with_pair(k2, v2)
@@ -384,6 +541,127 @@ class FrozenDictTests(TestCase):
         self.assertEqual(d, frozendict(zip(itertools.count(10), list("klmnopq"))))
 
 
+    def test_select(self):
+        """
+        select keeps only the pairs matching the predicate, including those
+        in collision nodes, and repacks sparse array nodes.
+        """
+        k1, k2 = HashTester(0), HashTester(0)
+        d = frozendict(zip(range(40), range(40)))
+        d = d.with_pair(k1, 'a').with_pair(k2, 'b')
+        evens = d.select(
+            lambda k, v: v == 'b' or (v != 'a' and v % 2 == 0))
+        self.assertEqual(len(evens), 21)
+        self.assertEqual(set(evens.items()),
+                         set([(k2, 'b')] + [(i, i) for i in range(0, 40, 2)]))
+        self.assertFalse(k1 in evens)
+        few = d.select(lambda k, v: v in (1, 2, 3))
+        self.assertEqual(few.root.kind, 'BitmapIndexedNode')
+        self.assertEqual(few, frozendict({1: 1, 2: 2, 3: 3}))
+        self.assertEqual(few.with_pair(4, 4).without(1),
+                         frozendict({2: 2, 3: 3, 4: 4}))
+        self.assertTrue(d.select(lambda k, v: True) is d)
+
+
+    def test_mapValues(self):
+        """
+        map_values keeps every key, including those in collision nodes.
+        """
+        k1, k2 = HashTester(0), HashTester(0)
+        d = frozendict(zip(range(40), range(40)))
+        d = d.with_pair(k1, 100).with_pair(k2, 200)
+        doubled = d.map_values(lambda v: v * 2)
+        self.assertEqual(len(doubled), 42)
+        self.assertEqual(doubled[k2], 400)
+        self.assertEqual(doubled[39], 78)
+        small = frozendict({'a': 1})
+        self.assertTrue(small.map_values(lambda v: v) is small)
+        self.assertEqual(small.map_values(str), frozendict({'a': '1'}))
+
+
+    def test_bulkBuildShape(self):
+        """
+        Building a frozendict from many pairs at once gives the same trie as
+        adding them one at a time.
+        """
+        rng = random.Random(3)
+        for n in (9, 17, 40, 500, 3000):
+            pairs = [(HashTester(i, rng.randrange(-2 ** 40, 2 ** 40)), i)
+                     for i in range(n)]
+            incremental = frozendict()
+            for k, v in pairs:
+                incremental = incremental.with_pair(k, v)
+            bulk = frozendict(pairs)
+            self.assertEqual(nodeShape(bulk.root),
+                             nodeShape(incremental.root))
+            self.assertEqual(len(bulk), n)
+
+
+    def test_bulkBuildCollisions(self):
+        """
+        Bulk-built frozendicts handle keys whose hashes collide.
+
+        Their shape can differ from one built incrementally, which moves
+        existing collision nodes straight into array nodes when promoting a
+        bitmap node, but both are valid tries.
+        """
+        rng = random.Random(4)
+        pairs = []
+        for i in range(2000):
+            h = rng.randrange(-2 ** 40, 2 ** 40)
+            if pairs and rng.random() < 0.1:
+                h = hash(pairs[-1][0])
+            pairs.append((HashTester(i, h), i))
+        bulk = frozendict(pairs)
+        self.assertEqual(len(bulk), 2000)
+        self.assertEqual(bulk, reduce(lambda d, (k, v): d.with_pair(k, v),
+                                      pairs, frozendict()))
+        for k, v in pairs:
+            self.assertEqual(bulk[k], v)
+            self.assertTrue(bulk.with_pair(k, v) is bulk)
+        for k, v in pairs[::2]:
+            bulk = bulk.without(k)
+        self.assertEqual(set(bulk.items()), set(pairs[1::2]))
+
+
+    def test_mergeDuplicates(self):
+        """
+        When the same key appears more than once, the last value wins but
+        the first key object is kept.
+        """
+        k1, k2 = (1,), (1,)
+        d = frozendict([(k1, 'a'), (2, 'b'), (k2, 'c')])
+        self.assertEqual(len(d), 2)
+        self.assertEqual(d[k1], 'c')
+        self.assertTrue(list(d.keys())[0] is k1)
+        big = frozendict([(i % 20, i) for i in range(100)])
+        self.assertEqual(big, frozendict((i, 80 + i) for i in range(20)))
+
+
+    def test_bulkBuildDuplicates(self):
+        """
+        Bulk-building from pairs with repeated keys, including keys whose
+        hashes collide, gives the same trie as adding them one at a time.
+        """
+        rng = random.Random(6)
+        keys = ([HashTester(i, rng.randrange(-2 ** 40, 2 ** 40))
+                 for i in range(300)]
+                + [HashTester(i, i % 3) for i in range(10)])
+        for n in (9, 40, 2000):
+            pairs = [(rng.choice(keys), i) for i in range(n)]
+            incremental = frozendict()
+            for k, v in pairs:
+                incremental = incremental.with_pair(k, v)
+            bulk = frozendict(iter(pairs))
+            self.assertEqual(incremental, bulk)
+            self.assertEqual(len(incremental), len(bulk))
+            self.assertEqual(nodeShape(incremental.root), nodeShape(bulk.root))
+            checkSizes(bulk.root)
+        same = frozendict(iter([('a', i) for i in range(100)]))
+        self.assertEqual(frozendict({'a': 99}), same)
+        self.assertEqual(1, same.root.size)
+
+
     def test_merge(self):
         """
         frozendicts can be constructed from other mappings and sequences.
@@ -395,6 +673,15 @@ class FrozenDictTests(TestCase):
         self.assertEqual(f, frozendict().merge({1: 2}))
 
 
+    def test_mergeNothing(self):
+        """
+        Merging nothing into a frozendict returns the same frozendict.
+        """
+        for d in (frozendict(), frozendict({1: 2})):
+            for empty in ({}, [], (), iter([]), frozendict()):
+                self.assertIs(d, d.merge(empty))
+
+
     def test_repr(self):
         """
         repr() for frozendicts is congruent to repr() for dicts.
@@ -407,3 +694,309 @@ class FrozenDictTests(TestCase):
         self.assertTrue(fr.startswith("frozendict("))
         self.assertTrue(fr.endswith(")"))
         self.assertTrue(ast.literal_eval(fr[11:-1]), md)
+
+
+    def test_mappingProtocol(self):
+        """
+        frozendicts are Mappings, and iterate over their keys.
+        """
+        for n in (3, 100):
+            fd = frozendict((i, str(i)) for i in range(n))
+            self.assertTrue(isinstance(fd, Mapping))
+            self.assertEqual(sorted(fd), range(n))
+            self.assertEqual(sorted(fd.iterkeys()), range(n))
+            self.assertEqual(sorted(fd.itervalues()),
+                             sorted(str(i) for i in range(n)))
+            self.assertEqual(dict(fd.iteritems()),
+                             dict((i, str(i)) for i in range(n)))
+
+
+    def test_views(self):
+        """
+        keys(), values() and items() return views with a length and
+        membership tests.
+        """
+        for n in (3, 100):
+            fd = frozendict((i, str(i)) for i in range(n))
+            keys, values, items = fd.keys(), fd.values(), fd.items()
+            self.assertEqual([n, n, n], map(len, [keys, values, items]))
+            self.assertIn(2, keys)
+            self.assertNotIn(n, keys)
+            self.assertIn('2', values)
+            self.assertIn((2, '2'), items)
+            self.assertNotIn((2, 2), items)
+            self.assertNotIn((n, '2'), items)
+            self.assertEqual(set([1, 2]), keys & set([1, 2, -1]))
+            self.assertEqual(list(fd), list(keys))
+            self.assertEqual(list(fd.itervalues()), list(values))
+            self.assertEqual(list(fd.iteritems()), list(items))
+
+
+    def test_toDict(self):
+        """
+        to_dict() makes an equal dict, for inline and trie frozendicts,
+        including ones with hash collisions.
+        """
+        pairs = [(HashTester(i, i % 7), i) for i in range(50)]
+        for n in (0, 5, 50):
+            fd = frozendict(pairs[:n])
+            d = fd.to_dict()
+            self.assertEqual(type(d), dict)
+            self.assertEqual(dict(pairs[:n]), d)
+            self.assertEqual(d, dict(fd))
+
+
+
+class MergeWithTests(TestCase):
+    """
+    Tests for L{frozendict.merge_with}.
+    """
+
+    def test_random(self):
+        """
+        merge_with gives the same pairs as merging dicts, calling C{f} with
+        this frozendict's value first, including with hash collisions and
+        between inline frozendicts and tries.
+        """
+        rng = random.Random(4)
+        keys = (range(500) + [HashTester(i, i % 9 + 1) for i in range(30)]
+                + [i * 32 for i in range(40)])
+        for trial in range(60):
+            a = dict((k, rng.randint(0, 9))
+                     for k in rng.sample(keys, rng.choice([0, 4, 50, 400])))
+            b = dict((k, rng.randint(0, 9))
+                     for k in rng.sample(keys, rng.choice([0, 4, 50, 400])))
+            expected = dict(a)
+            for k, v in b.iteritems():
+                expected[k] = a[k] - v if k in a else v
+            result = frozendict(a).merge_with(frozendict(b), operator.sub)
+            self.assertEqual(frozendict(expected), result)
+            self.assertEqual(len(expected), len(result))
+            if result.root is not None:
+                checkSizes(result.root)
+
+
+    def test_sharesUntouched(self):
+        """
+        Parts of either trie with no keys of the other are shared with the
+        result.
+        """
+        a = frozendict((i * 32, i) for i in range(100))
+        b = frozendict((i * 32 + 1, i) for i in range(100))
+        result = a.merge_with(b, operator.add)
+        self.assertIs(a.root.array[1], result.root.array[1])
+        self.assertIs(b.root.array[1], result.root.array[3])
+        self.assertIs(a, a.merge_with(frozendict(), operator.add))
+        self.assertIs(b, frozendict().merge_with(b, operator.add))
+
+
+
+class RankTests(TestCase):
+    """
+    Tests for the methods of L{frozendict} that work by position.
+    """
+
+    def makePairs(self, n):
+        # Some hash collisions, and some keys that only collide in part.
+        return [(HashTester(i, i % 40 + (i % 3) * 2 ** 20), i)
+                for i in range(n)]
+
+
+    def test_sizesMaintained(self):
+        """
+        Every trie node knows how many pairs are beneath it, however the
+        trie was made.
+        """
+        self.patch(_dict, '_INLINE_THRESHOLD', 0)
+        rng = random.Random(7)
+        pairs = self.makePairs(300)
+        d = frozendict()
+        for k, v in pairs:
+            d = d.with_pair(k, v)
+            d = d.with_pair(k, v + 1)
+        checkSizes(d.root)
+        self.assertEqual(300, d.root.size)
+        checkSizes(frozendict(pairs).root)
+        for k, v in rng.sample(pairs, 150):
+            d = d.without(k)
+        checkSizes(d.root)
+        self.assertEqual(150, d.root.size)
+        checkSizes(d.select(lambda k, v: v % 3).root)
+        checkSizes(d.map_values(str).root)
+        checkSizes(d.interned(NodeTable()).root)
+
+
+    def test_nthItem(self):
+        """
+        nth_item(i) is the ith pair in iteration order.
+        """
+        for n in (5, 300):
+            d = frozendict(self.makePairs(n))
+            self.assertEqual(list(d.iteritems()),
+                             [d.nth_item(i) for i in range(n)])
+            self.assertEqual(d.nth_item(n - 1), d.nth_item(-1))
+            self.assertRaises(IndexError, d.nth_item, n)
+            self.assertRaises(IndexError, d.nth_item, -n - 1)
+        self.assertRaises(IndexError, frozendict().nth_item, 0)
+
+
+    def test_sample(self):
+        """
+        sample() picks the keys that random.sample would from a list of
+        them.
+        """
+        for n in (5, 300):
+            d = frozendict(self.makePairs(n))
+            expected = random.Random(n).sample(list(d), 5)
+            self.assertEqual(expected, d.sample(5, random.Random(n)))
+        self.assertEqual(3, len(set(d.sample(3))))
+        self.assertRaises(ValueError, frozendict().sample, 1)
+
+
+    def test_split(self):
+        """
+        split(i) divides the pairs at position i, and both halves work as
+        ordinary frozendicts.
+        """
+        for n in (5, 300):
+            pairs = self.makePairs(n)
+            d = frozendict(pairs)
+            items = list(d.iteritems())
+            for i in range(-1, n + 2):
+                first, rest = d.split(i)
+                self.assertEqual(items[:i], list(first.iteritems()))
+                self.assertEqual(items[i:], list(rest.iteritems()))
+                self.assertEqual(len(items[:i]), len(first))
+                for half in (first, rest):
+                    if half.root is not None:
+                        checkSizes(half.root)
+            first, rest = d.split(n // 2)
+            for k, v in pairs:
+                self.assertEqual(d[k], first.get(k, rest.get(k)))
+                self.assertTrue((k in first) != (k in rest))
+            k, v = rest.nth_item(0)
+            self.assertEqual(d, first.merge(rest))
+            self.assertEqual(len(first) + 1, len(first.with_pair(k, v)))
+            self.assertEqual(len(rest) - 1, len(rest.without(k)))
+
+
+    def test_splitShares(self):
+        """
+        Subtrees that fall wholly on one side of a split are shared.
+        """
+        d = frozendict((i, i) for i in range(1000))
+        first, rest = d.split(500)
+        self.assertTrue(first.root.array[0] is d.root.array[0])
+        self.assertTrue(rest.root.array[-1] is d.root.array[-1])
+
+
+
+class InternTests(TestCase):
+    """
+    Tests for L{frozendict.interned}.
+    """
+
+    def test_equalMapsShareRoot(self):
+        """
+        Equal frozendicts built separately have the same root once interned,
+        and equality is decided by it.
+        """
+        table = NodeTable()
+        a = frozendict(zip(range(100), range(100))).interned(table)
+        b = frozendict(zip(reversed(range(100)), reversed(range(100))))
+        b = b.interned(table)
+        self.assertTrue(a.root is b.root)
+        self.assertEqual(a, b)
+        self.assertTrue(a.interned(table) is a)
+
+
+    def test_similarMapsShareSubtrees(self):
+        """
+        Frozendicts that differ in one key share every subtree that doesn't
+        contain it.
+        """
+        table = NodeTable()
+        pairs = zip(range(1000), range(1000))
+        a = frozendict(pairs).interned(table)
+        b = frozendict(pairs).with_pair(0, 'changed').interned(table)
+        self.assertFalse(a.root is b.root)
+        self.assertEqual(a.root.kind, 'ArrayNode')
+        shared = [x is y for x, y in zip(a.root.array, b.root.array)]
+        self.assertEqual(shared.count(False), 1)
+        self.assertEqual(b[0], 'changed')
+
+
+    def test_typesNotConflated(self):
+        """
+        Nodes whose values are equal but of different types are not shared.
+        """
+        table = NodeTable()
+        n = 20
+        a = frozendict((i, 1) for i in range(n)).interned(table)
+        b = frozendict((i, True) for i in range(n)).interned(table)
+        self.assertFalse(a.root is b.root)
+        self.assertTrue(b[0] is True)
+        self.assertEqual(type(a[0]), int)
+
+
+    def test_nestedTypesNotConflated(self):
+        """
+        Values are never replaced by different but equal ones, such as
+        C{(1,)} for C{(True,)}, C{0.0} for C{-0.0} or C{Decimal('1.0')} for
+        C{Decimal('1.00')}.
+        """
+        n = 20
+        pairs = [
+            ((1,), (True,)),
+            (((1, 'a'),), ((True, 'a'),)),
+            (0.0, -0.0),
+            (Decimal('1.0'), Decimal('1.00')),
+            ]
+        for first, second in pairs:
+            table = NodeTable()
+            a = frozendict((i, first) for i in range(n)).interned(table)
+            b = frozendict((i, second) for i in range(n)).interned(table)
+            self.assertFalse(a.root is b.root)
+            for i in range(n):
+                self.assertTrue(a[i] is first)
+                self.assertTrue(b[i] is second)
+
+
+    def test_equalTuplesShared(self):
+        """
+        Nodes holding equal tuples of strings and numbers are shared.
+        """
+        table = NodeTable()
+        a = frozendict((i, (i, 'x')) for i in range(100)).interned(table)
+        b = frozendict((i, (i, 'x')) for i in range(100)).interned(table)
+        self.assertTrue(a.root is b.root)
+
+
+    def test_unhashableValues(self):
+        """
+        Nodes holding unhashable values are left alone.
+        """
+        table = NodeTable()
+        d = frozendict((i, [i]) for i in range(20))
+        self.assertEqual(d.interned(table), d)
+        self.assertTrue(d.interned(table).root is d.root)
+
+
+    def test_weak(self):
+        """
+        Nodes leave the table once no frozendict uses them.
+        """
+        table = NodeTable()
+        d = frozendict(zip(range(100), range(100))).interned(table)
+        self.assertNotEqual(len(table), 0)
+        del d
+        gc.collect()
+        self.assertEqual(len(table), 0)
+
+
+    def test_smallMapsUnchanged(self):
+        """
+        Inline frozendicts have no nodes to intern.
+        """
+        d = frozendict({'a': 1})
+        self.assertTrue(d.interned() is d)
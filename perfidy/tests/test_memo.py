@@ -0,0 +1,98 @@
+import threading
+
+from testtools import TestCase
+
+from .._memo import memoize
+
+
+class FakeClock(object):
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestMemoize(TestCase):
+
+    def setUp(self):
+        super(TestMemoize, self).setUp()
+        self.calls = []
+
+    def record(self, *args, **kwargs):
+        self.calls.append((args, kwargs))
+        return len(self.calls)
+
+    def test_caches(self):
+        f = memoize(self.record)
+        self.assertEqual(1, f(1, 2))
+        self.assertEqual(1, f(1, 2))
+        self.assertEqual(2, f(1, 3))
+        self.assertEqual(2, len(self.calls))
+        info = f.cache_info()
+        self.assertEqual((1, 2, 128, 2), tuple(info))
+        self.assertEqual(1, info.hits)
+
+    def test_wraps(self):
+        def documented(x):
+            """Docs."""
+        f = memoize()(documented)
+        self.assertEqual('documented', f.__name__)
+        self.assertEqual('Docs.', f.__doc__)
+
+    def test_unhashable_arguments(self):
+        f = memoize()(self.record)
+        self.assertEqual(1, f({'a': [1, 2]}, opts={'x': set([1])}))
+        self.assertEqual(1, f({'a': [1, 2]}, opts={'x': set([1])}))
+        self.assertEqual(2, f({'a': [1, 3]}, opts={'x': set([1])}))
+
+    def test_uncacheable_arguments(self):
+        class Unhashable(object):
+            __hash__ = None
+        f = memoize()(self.record)
+        x = Unhashable()
+        self.assertEqual(1, f(x))
+        self.assertEqual(2, f(x))
+        self.assertEqual(0, f.cache_info().currsize)
+
+    def test_lru(self):
+        f = memoize(maxsize=2)(self.record)
+        f(1)
+        f(2)
+        f(1)
+        f(3)
+        self.assertEqual(2, f.cache_info().currsize)
+        self.assertEqual(1, f(1))
+        self.assertEqual(4, f(2))
+
+    def test_ttl(self):
+        clock = FakeClock()
+        f = memoize(ttl=10, clock=clock)(self.record)
+        self.assertEqual(1, f('x'))
+        clock.now = 9
+        self.assertEqual(1, f('x'))
+        clock.now = 10
+        self.assertEqual(2, f('x'))
+        self.assertEqual(2, f('x'))
+
+    def test_cache_clear(self):
+        f = memoize()(self.record)
+        f(1)
+        f.cache_clear()
+        self.assertEqual((0, 0, 128, 0), tuple(f.cache_info()))
+        self.assertEqual(2, f(1))
+
+    def test_thread_safe(self):
+        f = memoize(maxsize=10, thread_safe=True)(lambda x: x * 2)
+        def work():
+            for i in range(500):
+                self.assertEqual((i % 20) * 2, f(i % 20))
+        threads = [threading.Thread(target=work) for i in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        info = f.cache_info()
+        self.assertEqual(2000, info.hits + info.misses)
+        self.assertEqual(10, info.currsize)
@@ -0,0 +1,119 @@
+import random
+
+from .. import frozenmultimap
+
+from testtools import TestCase
+
+from .test_mapping import HashTester
+
+
+def asDict(pairs):
+    d = {}
+    for k, v in pairs:
+        d.setdefault(k, set()).add(v)
+    return d
+
+
+
+class FrozenMultimapTests(TestCase):
+    """
+    Tests for L{frozenmultimap}.
+    """
+
+    def test_empty(self):
+        m = frozenmultimap()
+        self.assertEqual(0, len(m))
+        self.assertEqual(0, m.total)
+        self.assertEqual(set(), set(m['missing']))
+        self.assertFalse('missing' in m)
+
+
+    def test_construct(self):
+        """
+        A frozenmultimap can be made from pairs, or a mapping of keys to
+        values.
+        """
+        m = frozenmultimap([(1, 'a'), (1, 'b'), (2, 'a'), (1, 'a')])
+        self.assertEqual({1: frozenset('ab'), 2: frozenset('a')}, m.to_dict())
+        self.assertEqual(3, m.total)
+        self.assertEqual(2, len(m))
+        self.assertEqual(m, frozenmultimap({1: 'ab', 2: ['a']}))
+        self.assertIn('b', m[1])
+        self.assertEqual(2, len(m[1]))
+
+
+    def test_addRemove(self):
+        m = frozenmultimap([(1, 'a')])
+        added = m.add(1, 'b').add(2, 'c')
+        self.assertEqual({1: set('ab'), 2: set('c')}, asDict(added.pairs()))
+        self.assertEqual(3, added.total)
+        self.assertIs(m, m.add(1, 'a'))
+        removed = added.remove(1, 'a').remove(2, 'c')
+        self.assertEqual({1: set('b')}, asDict(removed.pairs()))
+        self.assertFalse(2 in removed)
+        self.assertEqual(1, removed.total)
+        self.assertIs(added, added.remove(1, 'z'))
+        self.assertIs(added, added.remove(3, 'a'))
+        self.assertEqual(frozenmultimap([(2, 'c')]), added.without(1))
+        self.assertEqual(1, added.without(1).total)
+
+
+    def test_update(self):
+        """
+        update adds a batch of pairs, to a multimap of any size and with
+        hash collisions among keys and values.
+        """
+        rng = random.Random(8)
+        keys = range(200) + [HashTester(i, i % 5 + 1) for i in range(20)]
+        values = range(20) + [HashTester(i, 1) for i in range(5)]
+
+        def pairs(n):
+            return [(rng.choice(keys), rng.choice(values)) for i in range(n)]
+
+        for start in (0, 5, 500):
+            initial = pairs(start)
+            m = frozenmultimap(initial)
+            expected = asDict(initial)
+            for trial in range(5):
+                batch = pairs(rng.randint(0, 300))
+                m = m.update(batch)
+                for k, v in batch:
+                    expected.setdefault(k, set()).add(v)
+                self.assertEqual(expected, asDict(m.pairs()))
+                self.assertEqual(sum(map(len, expected.values())), m.total)
+
+
+    def test_merge(self):
+        """
+        Merging two multimaps unions their values, and shares value sets
+        and trie nodes that only one of them has.
+        """
+        rng = random.Random(9)
+        a = frozenmultimap(
+            (rng.randrange(300), rng.randrange(10)) for i in range(600))
+        b = frozenmultimap(
+            (rng.randrange(300), rng.randrange(10)) for i in range(600))
+        merged = a.merge(b)
+        expected = asDict(list(a.pairs()) + list(b.pairs()))
+        self.assertEqual(expected, asDict(merged.pairs()))
+        self.assertEqual(sum(map(len, expected.values())), merged.total)
+        self.assertEqual(merged, a.update(b.pairs()))
+        self.assertIs(a, a.merge(frozenmultimap()))
+        self.assertIs(a, a.merge(a))
+        c = a.add(1000, 'x')
+        self.assertEqual(a.total + 1, a.merge(c).total)
+        for k in a:
+            self.assertIs(a.sets[k], a.merge(c).sets[k])
+
+
+    def test_eqHash(self):
+        a = frozenmultimap([(1, 'a'), (1, 'b')])
+        b = frozenmultimap([(1, 'b'), (1, 'a')])
+        self.assertEqual(a, b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertNotEqual(a, a.add(1, 'c'))
+
+
+    def test_repr(self):
+        self.assertEqual("frozenmultimap({1: ['a']})",
+                         repr(frozenmultimap([(1, 'a')])))
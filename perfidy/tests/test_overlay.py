@@ -0,0 +1,118 @@
+from .. import (
+    frozendict,
+    overlaydict,
+    )
+
+from testtools import TestCase
+
+
+class OverlayDictTests(TestCase):
+    """
+    Tests for L{overlaydict}.
+    """
+
+    def setUp(self):
+        super(OverlayDictTests, self).setUp()
+        self.base = frozendict(zip(range(50), range(50)))
+
+
+    def test_readsThrough(self):
+        """
+        An untouched overlay has the contents of its base.
+        """
+        o = overlaydict(self.base)
+        self.assertEqual(len(o), 50)
+        self.assertEqual(o[10], 10)
+        self.assertEqual(o.get(99, 'x'), 'x')
+        self.assertTrue(10 in o)
+        self.assertEqual(dict(o), dict(self.base.items()))
+        self.assertTrue(o.freeze() is self.base)
+
+
+    def test_writes(self):
+        """
+        Writes and deletions are visible in the overlay and leave the base
+        alone.
+        """
+        o = overlaydict(self.base)
+        o[0] = 'zero'
+        o['new'] = 'value'
+        del o[1]
+        self.assertEqual(len(o), 50)
+        self.assertEqual(o[0], 'zero')
+        self.assertEqual(o['new'], 'value')
+        self.assertFalse(1 in o)
+        self.assertRaises(KeyError, lambda: o[1])
+        self.assertEqual(o.get(1, 'gone'), 'gone')
+        self.assertEqual(self.base[0], 0)
+        self.assertTrue(1 in self.base)
+        expected = dict(self.base.items())
+        expected.update({0: 'zero', 'new': 'value'})
+        del expected[1]
+        self.assertEqual(dict(o.items()), expected)
+        self.assertEqual(sorted(o, key=str), sorted(expected, key=str))
+
+
+    def test_deleteThenSet(self):
+        """
+        A deleted key can be set again, and deleting a missing key fails.
+        """
+        o = overlaydict(self.base)
+        del o[5]
+        o[5] = 'back'
+        self.assertEqual(len(o), 50)
+        self.assertEqual(o[5], 'back')
+        self.assertRaises(KeyError, o.__delitem__, 'missing')
+        o['added'] = 1
+        del o['added']
+        self.assertEqual(len(o), 50)
+        self.assertFalse('added' in o)
+
+
+    def test_freeze(self):
+        """
+        freeze returns a frozendict of the overlay's contents.
+        """
+        o = overlaydict(self.base)
+        o[0] = 'zero'
+        o['new'] = 'value'
+        del o[1]
+        frozen = o.freeze()
+        self.assertEqual(
+            frozen,
+            self.base.with_pair(0, 'zero').with_pair('new', 'value').without(1))
+
+
+    def test_freezeBatch(self):
+        """
+        freeze applies many changes at once, returns the base if nothing
+        has changed, and shares the parts of the base that haven't.
+        """
+        base = frozendict((i, i) for i in range(1000))
+        o = overlaydict(base)
+        self.assertIs(base, o.freeze())
+        o[0] = 'set'
+        o[1] = 1
+        del o[1]
+        o[1] = 'back'
+        expected = base.with_pair(0, 'set').with_pair(1, 'back')
+        for i in range(0, 1000, 64):
+            o[i] = -i
+            expected = expected.with_pair(i, -i)
+        frozen = o.freeze()
+        self.assertEqual(expected, frozen)
+        self.assertIs(base.root.array[2], frozen.root.array[2])
+
+
+    def test_mutableMappingMethods(self):
+        """
+        The usual dict methods work.
+        """
+        o = overlaydict({'a': 1})
+        o.update({'b': 2})
+        self.assertEqual(o.pop('a'), 1)
+        self.assertEqual(o.setdefault('c', 3), 3)
+        self.assertEqual(dict(o), {'b': 2, 'c': 3})
+        o.clear()
+        self.assertEqual(len(o), 0)
+        self.assertEqual(o.freeze(), frozendict())
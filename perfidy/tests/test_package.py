@@ -0,0 +1,39 @@
+import os
+import subprocess
+import sys
+
+from testtools import TestCase
+
+import perfidy
+
+
+class TestLazyPackage(TestCase):
+
+    def run_python(self, source):
+        root = os.path.dirname(os.path.abspath(perfidy.__path__[0]))
+        env = dict(os.environ, PYTHONPATH=root)
+        return subprocess.check_output(
+            [sys.executable, '-c', source], env=env).split()
+
+    def test_submodules_loaded_on_demand(self):
+        output = self.run_python(
+            "import sys, perfidy\n"
+            "print('perfidy._dict' in sys.modules)\n"
+            "perfidy.frozendict\n"
+            "print('perfidy._dict' in sys.modules)\n"
+            "print('perfidy._async' in sys.modules)\n")
+        self.assertEqual(['False', 'True', 'False'], output)
+
+    def test_all_names_available(self):
+        for name in perfidy.__all__:
+            self.assertTrue(hasattr(perfidy, name), name)
+        names = dir(perfidy)
+        self.assertEqual([], [n for n in perfidy.__all__ if n not in names])
+
+    def test_from_import(self):
+        from perfidy import frozendict
+        from perfidy._dict import frozendict as original
+        self.assertIs(original, frozendict)
+
+    def test_missing_name(self):
+        self.assertRaises(AttributeError, getattr, perfidy, 'doesntexist')
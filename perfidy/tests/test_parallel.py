@@ -0,0 +1,177 @@
+import multiprocessing.pool
+from multiprocessing import Pool
+from multiprocessing.pool import ThreadPool
+import threading
+
+from testtools import TestCase
+
+from .. import frozendict
+from .._parallel import (
+    parallel_map_dict,
+    parallel_map_values,
+)
+
+
+def square(x):
+    return x * x
+
+
+def fails_on_13(x):
+    if x == 13:
+        raise ValueError(x)
+    return x
+
+
+class RecordingExecutor(object):
+    """A futures-style executor that runs work immediately."""
+
+    def __init__(self):
+        self.submitted = 0
+
+    def submit(self, fn, *args):
+        self.submitted += 1
+        return ImmediateFuture(fn(*args))
+
+
+class ImmediateFuture(object):
+
+    def __init__(self, value):
+        self.value = value
+
+    def result(self):
+        return self.value
+
+
+class DeferredExecutor(object):
+    """
+    An executor that runs each piece of work only when its result is asked
+    for, recording how many pieces have been submitted but not collected.
+    """
+
+    def __init__(self, workers=None):
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def submit(self, fn, *args):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        return DeferredFuture(self, fn, args)
+
+    def apply_async(self, fn, args):
+        return self.submit(fn, *args)
+
+    def terminate(self):
+        pass
+
+    def join(self):
+        pass
+
+
+class DeferredFuture(object):
+
+    def __init__(self, executor, fn, args):
+        self.executor = executor
+        self.fn = fn
+        self.args = args
+
+    def result(self):
+        self.executor.in_flight -= 1
+        return self.fn(*self.args)
+
+    get = result
+
+
+class TestParallelMapValues(TestCase):
+
+    def setUp(self):
+        super(TestParallelMapValues, self).setUp()
+        self.d = dict(zip(range(100), range(100)))
+        self.expected = dict((k, k * k) for k in range(100))
+
+    def test_workers(self):
+        threads = set()
+        def f(v):
+            threads.add(threading.current_thread())
+            return square(v)
+        self.assertEqual(
+            self.expected,
+            parallel_map_values(f, self.d, workers=4, chunksize=3))
+        self.assertNotIn(threading.current_thread(), threads)
+
+    def test_thread_pool(self):
+        pool = ThreadPool(2)
+        self.addCleanup(pool.terminate)
+        self.assertEqual(
+            self.expected,
+            parallel_map_values(square, self.d, executor=pool, chunksize=7))
+
+    def test_process_pool(self):
+        pool = Pool(2)
+        self.addCleanup(pool.terminate)
+        self.assertEqual(
+            self.expected,
+            parallel_map_values(square, self.d, executor=pool, chunksize=30))
+
+    def test_submit_executor(self):
+        executor = RecordingExecutor()
+        self.assertEqual(
+            self.expected,
+            parallel_map_values(square, self.d, executor=executor,
+                                chunksize=10))
+        self.assertEqual(10, executor.submitted)
+
+    def test_max_pending(self):
+        """
+        No more than max_pending chunks are in the pool at once.
+        """
+        for max_pending in (1, 3, 16):
+            executor = DeferredExecutor()
+            self.assertEqual(self.expected, parallel_map_values(
+                square, self.d, executor=executor, chunksize=1,
+                max_pending=max_pending))
+            self.assertEqual(max_pending, executor.max_in_flight)
+            self.assertEqual(0, executor.in_flight)
+
+    def test_max_pending_default(self):
+        """
+        By default, 16 chunks may be in an executor at once, or twice the
+        number of workers in a pool made for the call.
+        """
+        executor = DeferredExecutor()
+        parallel_map_values(square, self.d, executor=executor, chunksize=1)
+        self.assertEqual(16, executor.max_in_flight)
+        pools = []
+        def make_pool(workers):
+            pools.append(DeferredExecutor(workers))
+            return pools[-1]
+        self.patch(multiprocessing.pool, 'ThreadPool', make_pool)
+        self.assertEqual(
+            self.expected,
+            parallel_map_values(square, self.d, workers=3, chunksize=1))
+        self.assertEqual(6, pools[0].max_in_flight)
+
+    def test_frozendict(self):
+        result = parallel_map_values(
+            square, frozendict(self.d), workers=2, chunksize=10)
+        self.assertEqual(frozendict(self.expected), result)
+
+    def test_exception(self):
+        self.assertRaises(
+            ValueError,
+            parallel_map_values, fails_on_13, self.d, workers=2, chunksize=5)
+
+    def test_workers_or_executor(self):
+        self.assertRaises(ValueError, parallel_map_values, square, self.d)
+        self.assertRaises(
+            ValueError, parallel_map_values, square, self.d, workers=2,
+            executor=RecordingExecutor())
+
+
+class TestParallelMapDict(TestCase):
+
+    def test_map_dict(self):
+        d = dict(zip(range(50), range(50)))
+        self.assertEqual(
+            dict((str(k), -v) for k, v in d.items()),
+            parallel_map_dict(lambda (k, v): (str(k), -v), d, workers=3,
+                              chunksize=4))
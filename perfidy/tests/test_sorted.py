@@ -0,0 +1,198 @@
+import random
+
+from .. import frozensorteddict
+from .. import _avl
+
+from testtools import TestCase
+
+
+def checkBalanced(test, node):
+    """
+    Assert that the tree under C{node} is ordered and AVL-balanced, and
+    return its height.
+    """
+    if node is None:
+        return 0
+    hl = checkBalanced(test, node.left)
+    hr = checkBalanced(test, node.right)
+    test.assertTrue(abs(hl - hr) <= 1)
+    test.assertEqual(node.height, max(hl, hr) + 1)
+    if node.left is not None:
+        test.assertTrue(node.left.key < node.key)
+    if node.right is not None:
+        test.assertTrue(node.key < node.right.key)
+    return node.height
+
+
+
+class FrozenSortedDictTests(TestCase):
+    """
+    Tests for L{frozensorteddict}.
+    """
+
+    def test_empty(self):
+        """
+        The empty frozensorteddict is of length 0 and has no keys or values.
+        """
+        d = frozensorteddict()
+        self.assertEqual(len(d), 0)
+        self.assertEqual(tuple(d.items()), ())
+        self.assertRaises(KeyError, lambda: d['a'])
+        self.assertEqual(d.get('a', 'b'), 'b')
+        self.assertFalse('a' in d)
+        self.assertEqual(d.root, None)
+
+
+    def test_itemsInOrder(self):
+        """
+        Keys are iterated in sorted order regardless of insertion order.
+        """
+        keys = range(100)
+        random.Random(0).shuffle(keys)
+        d = frozensorteddict()
+        for k in keys:
+            d = d.with_pair(k, str(k))
+        self.assertEqual(list(d.keys()), range(100))
+        self.assertEqual(list(d.values()), map(str, range(100)))
+        self.assertEqual(len(d), 100)
+        self.assertEqual(d[42], '42')
+        checkBalanced(self, d.root)
+
+
+    def test_withPairSharesUnchanged(self):
+        """
+        Updates copy only the path to the changed key, leave the original
+        untouched, and return the same map if nothing changes.
+        """
+        d = frozensorteddict(zip(range(100), range(100)))
+        d2 = d.with_pair(0, 'zero')
+        self.assertEqual(d[0], 0)
+        self.assertEqual(d2[0], 'zero')
+        self.assertEqual(len(d2), 100)
+        self.assertTrue(d2.root.right is d.root.right)
+        self.assertTrue(d.with_pair(5, 5) is d)
+
+
+    def test_without(self):
+        """
+        Removing keys keeps the tree balanced, and removing a missing key
+        returns the same map.
+        """
+        rng = random.Random(1)
+        keys = range(200)
+        d = frozensorteddict(zip(keys, keys))
+        rng.shuffle(keys)
+        for i, k in enumerate(keys):
+            d = d.without(k)
+            self.assertFalse(k in d)
+            self.assertEqual(len(d), 199 - i)
+            checkBalanced(self, d.root)
+        self.assertEqual(d, frozensorteddict())
+        d = frozensorteddict({1: 2})
+        self.assertTrue(d.without(3) is d)
+
+
+    def test_irange(self):
+        """
+        irange yields pairs from the start key up to the stop key.
+        """
+        d = frozensorteddict(zip(range(0, 100, 2), range(50)))
+        self.assertEqual(list(d.irange(10, 20)),
+                         [(10, 5), (12, 6), (14, 7), (16, 8), (18, 9)])
+        self.assertEqual([k for k, v in d.irange(11, 20, inclusive=True)],
+                         [12, 14, 16, 18, 20])
+        self.assertEqual([k for k, v in d.irange(stop=5)], [0, 2, 4])
+        self.assertEqual([k for k, v in d.irange(95)], [96, 98])
+        self.assertEqual(list(d.irange(200)), [])
+        self.assertEqual(list(d.irange(30, 30)), [])
+
+
+    def test_floorCeiling(self):
+        """
+        floor_item and ceiling_item find the nearest pair at or on either
+        side of a key.
+        """
+        d = frozensorteddict({10: 'a', 20: 'b', 30: 'c'})
+        self.assertEqual(d.floor_item(20), (20, 'b'))
+        self.assertEqual(d.floor_item(25), (20, 'b'))
+        self.assertEqual(d.ceiling_item(25), (30, 'c'))
+        self.assertEqual(d.ceiling_item(5), (10, 'a'))
+        self.assertRaises(KeyError, d.floor_item, 5)
+        self.assertRaises(KeyError, d.ceiling_item, 35)
+
+
+    def test_fromSorted(self):
+        """
+        from_sorted builds a balanced tree directly and rejects unsorted
+        input.
+        """
+        d = frozensorteddict.from_sorted((i, -i) for i in range(1000))
+        self.assertEqual(len(d), 1000)
+        self.assertEqual(d[500], -500)
+        checkBalanced(self, d.root)
+        self.assertRaises(ValueError, frozensorteddict.from_sorted,
+                          [(1, 1), (1, 2)])
+        self.assertRaises(ValueError, frozensorteddict.from_sorted,
+                          [(2, 1), (1, 2)])
+
+
+    def test_merge(self):
+        """
+        frozensorteddicts can be constructed from mappings and sequences,
+        with later pairs winning.
+        """
+        d = frozensorteddict([(3, 'a'), (1, 'b'), (3, 'c')])
+        self.assertEqual(list(d.items()), [(1, 'b'), (3, 'c')])
+        self.assertEqual(d, frozensorteddict({1: 'b', 3: 'c'}))
+        self.assertEqual(d.merge({2: 'x', 3: 'y'}),
+                         frozensorteddict({1: 'b', 2: 'x', 3: 'y'}))
+
+
+    def test_hashEq(self):
+        """
+        Equal frozensorteddicts compare and hash equal.
+        """
+        a = frozensorteddict(zip(range(50), range(50)))
+        b = frozensorteddict()
+        for i in reversed(range(50)):
+            b = b.with_pair(i, i)
+        self.assertTrue(a == b)
+        self.assertFalse(a != b)
+        self.assertEqual(hash(a), hash(b))
+        self.assertTrue(a != b.with_pair(0, 'x'))
+        self.assertNotEqual(a, dict(zip(range(50), range(50))))
+
+
+    def test_repr(self):
+        """
+        repr() shows the pairs in order.
+        """
+        self.assertEqual(repr(frozensorteddict({2: 'b', 1: 'a'})),
+                         "frozensorteddict([(1, 'a'), (2, 'b')])")
+
+
+
+class AVLTests(TestCase):
+    """
+    Tests for the tree functions in L{perfidy._avl}.
+    """
+
+    def test_randomOperations(self):
+        """
+        Random inserts and removals agree with a dict and keep the tree
+        balanced.
+        """
+        rng = random.Random(2)
+        root = None
+        reference = {}
+        for i in range(2000):
+            k = rng.randrange(300)
+            if rng.random() < 0.6:
+                root, added = _avl.assoc(root, k, i)
+                self.assertEqual(added, k not in reference)
+                reference[k] = i
+            else:
+                root = _avl.without(root, k)
+                reference.pop(k, None)
+        checkBalanced(self, root)
+        self.assertEqual(list(_avl.iteritems(root)), sorted(reference.items()))
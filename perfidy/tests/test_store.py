@@ -0,0 +1,169 @@
+from fixtures import FakeLogger
+
+from .. import (
+    frozendict,
+    VersionedStore,
+    )
+
+from testtools import TestCase
+
+
+class FakeLoop(object):
+
+    def __init__(self):
+        self.scheduled = []
+
+
+    def call_soon_threadsafe(self, callback, *args):
+        self.scheduled.append((callback, args))
+
+
+
+class VersionedStoreTests(TestCase):
+    """
+    Tests for L{VersionedStore}.
+    """
+
+    def test_initial(self):
+        """
+        A new store has an empty version 0.
+        """
+        store = VersionedStore()
+        self.assertEqual(store.version, 0)
+        self.assertEqual(store.snapshot(), frozendict())
+        self.assertEqual(store.versions(), [0])
+
+
+    def test_commit(self):
+        """
+        Each commit creates a new version; old versions are unchanged.
+        """
+        store = VersionedStore({'a': 1})
+        v1 = store.commit({'b': 2})
+        v2 = store.commit([('a', 10)], deletions=['b'])
+        self.assertEqual((v1, v2), (1, 2))
+        self.assertEqual(store.snapshot(0), frozendict({'a': 1}))
+        self.assertEqual(store.snapshot(1), frozendict({'a': 1, 'b': 2}))
+        self.assertEqual(store.snapshot(), frozendict({'a': 10}))
+        self.assertRaises(KeyError, store.snapshot, 3)
+
+
+    def test_noopCommit(self):
+        """
+        Committing changes that leave the store as it is doesn't create a
+        version.
+        """
+        store = VersionedStore({'a': 1})
+        self.assertEqual(store.commit({'a': 1}, deletions=['z']), 0)
+        self.assertEqual(store.versions(), [0])
+
+
+    def test_noopCommitEmpty(self):
+        """
+        Committing no changes to an empty store doesn't create a version.
+        """
+        store = VersionedStore()
+        self.assertEqual(0, store.commit())
+        self.assertEqual(0, store.commit({}))
+        self.assertEqual(0, store.commit([], deletions=['z']))
+        self.assertEqual(0, store.commit(frozendict()))
+        self.assertEqual([0], store.versions())
+
+
+    def test_retention(self):
+        """
+        Only the most recent max_versions versions are kept.
+        """
+        store = VersionedStore(max_versions=3)
+        for i in range(5):
+            store.commit({i: i})
+        self.assertEqual(store.versions(), [3, 4, 5])
+        self.assertRaises(KeyError, store.snapshot, 1)
+
+
+    def test_pin(self):
+        """
+        Pinned versions are kept until unpinned.
+        """
+        store = VersionedStore(max_versions=1)
+        store.commit({'a': 1})
+        store.pin(1)
+        store.commit({'a': 2})
+        store.commit({'a': 3})
+        self.assertEqual(store.versions(), [1, 3])
+        self.assertEqual(store.snapshot(1), frozendict({'a': 1}))
+        store.unpin(1)
+        self.assertEqual(store.versions(), [3])
+        self.assertRaises(KeyError, store.pin, 1)
+
+
+    def test_subscribe(self):
+        """
+        Subscribers are told about each commit until they unsubscribe.
+        """
+        store = VersionedStore()
+        seen = []
+        unsubscribe = store.subscribe(lambda v, s: seen.append((v, s)))
+        store.commit({'a': 1})
+        unsubscribe()
+        store.commit({'a': 2})
+        self.assertEqual(seen, [(1, frozendict({'a': 1}))])
+
+
+    def test_subscribeWithLoop(self):
+        """
+        Subscribers with a loop have their callbacks scheduled on it.
+        """
+        store = VersionedStore()
+        loop = FakeLoop()
+        callback = lambda v, s: None
+        store.subscribe(callback, loop)
+        store.commit({'a': 1})
+        self.assertEqual(loop.scheduled,
+                         [(callback, (1, frozendict({'a': 1})))])
+
+
+    def test_subscriberUsesStore(self):
+        """
+        Subscribers can pin the version they are told about, and commit.
+        Commits they make are reported after the one they were told about.
+        """
+        store = VersionedStore(max_versions=1)
+        seen = []
+
+        def pinner(version, snapshot):
+            store.pin(version)
+            seen.append(('pinner', version))
+
+        def committer(version, snapshot):
+            seen.append(('committer', version))
+            if version == 1:
+                self.assertEqual(2, store.commit({'b': 2}))
+
+        store.subscribe(pinner)
+        store.subscribe(committer)
+        self.assertEqual(1, store.commit({'a': 1}))
+        self.assertEqual([('pinner', 1), ('committer', 1),
+                          ('pinner', 2), ('committer', 2)], seen)
+        self.assertEqual([1, 2], store.versions())
+
+
+    def test_subscriberErrors(self):
+        """
+        An exception from a subscriber is logged, and doesn't stop the
+        commit or the other subscribers.
+        """
+        logger = self.useFixture(FakeLogger())
+        store = VersionedStore()
+        seen = []
+
+        def broken(version, snapshot):
+            raise RuntimeError("broken subscriber")
+
+        store.subscribe(broken)
+        store.subscribe(lambda v, s: seen.append(v))
+        self.assertEqual(1, store.commit({'a': 1}))
+        self.assertEqual(2, store.commit({'a': 2}))
+        self.assertEqual([1, 2], seen)
+        self.assertIn("broken subscriber", logger.output)
+        self.assertIn("for version 2", logger.output)